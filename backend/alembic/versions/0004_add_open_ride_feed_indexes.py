@@ -0,0 +1,44 @@
+"""Add indexes for the geo-filtered open ride feed.
+
+Revision ID: 0004_add_open_ride_feed_indexes
+Revises: 0003_add_donation_system
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0004_add_open_ride_feed_indexes"
+down_revision = "0003_add_donation_system"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create GiST and partial indexes used by /rides/open."""
+    # GeoAlchemy normally creates this alongside the table; make sure it exists.
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ride_requests_pickup_location "
+        "ON ride_requests USING gist (pickup_location)"
+    )
+    op.create_index(
+        "ix_ride_requests_pending_pickup",
+        "ride_requests",
+        ["pickup_location"],
+        postgresql_using="gist",
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.create_index(
+        "ix_ride_requests_pending_requested",
+        "ride_requests",
+        ["requested_datetime", "id"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Drop open ride feed indexes."""
+    op.drop_index("ix_ride_requests_pending_requested", table_name="ride_requests")
+    op.drop_index("ix_ride_requests_pending_pickup", table_name="ride_requests")
@@ -0,0 +1,37 @@
+"""Add indexes for nearest-available-driver search.
+
+Revision ID: 0005_add_driver_search_indexes
+Revises: 0004_add_open_ride_feed_indexes
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0005_add_driver_search_indexes"
+down_revision = "0004_add_open_ride_feed_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create the GiST index on user locations and the available-driver partial index."""
+    # 0001 added last_known_location via add_column, which does not create a spatial index.
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_last_known_location "
+        "ON users USING gist (last_known_location)"
+    )
+    op.create_index(
+        "ix_driver_profiles_available",
+        "driver_profiles",
+        ["user_id", "vehicle_capacity"],
+        postgresql_where=sa.text("is_available"),
+    )
+
+
+def downgrade() -> None:
+    """Drop driver search indexes."""
+    op.drop_index("ix_driver_profiles_available", table_name="driver_profiles")
+    op.execute("DROP INDEX IF EXISTS idx_users_last_known_location")
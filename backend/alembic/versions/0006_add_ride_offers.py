@@ -0,0 +1,53 @@
+"""Add ride offers issued by the matching engine.
+
+Revision ID: 0006_add_ride_offers
+Revises: 0005_add_driver_search_indexes
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0006_add_ride_offers"
+down_revision = "0005_add_driver_search_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create ride_offers table."""
+    op.create_table(
+        "ride_offers",
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column(
+            "ride_request_id",
+            sa.Integer(),
+            sa.ForeignKey("ride_requests.id"),
+            nullable=False,
+            index=True,
+        ),
+        sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("pending", "accepted", "declined", "expired", name="rideofferstatus"),
+            nullable=False,
+            server_default="pending",
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("responded_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("ride_request_id", "driver_id", name="uq_ride_offers_request_driver"),
+    )
+    op.create_index("idx_driver_offers", "ride_offers", ["driver_id", "status", "expires_at"])
+
+
+def downgrade() -> None:
+    """Drop ride_offers table."""
+    op.drop_index("idx_driver_offers", table_name="ride_offers")
+    op.drop_table("ride_offers")
+
+    # Drop enum to allow clean rollback
+    op.execute("DROP TYPE IF EXISTS rideofferstatus")
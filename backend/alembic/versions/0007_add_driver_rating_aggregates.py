@@ -0,0 +1,61 @@
+"""Add running rating aggregates to driver profiles.
+
+Revision ID: 0007_add_driver_rating_aggregates
+Revises: 0006_add_ride_offers
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0007_add_driver_rating_aggregates"
+down_revision = "0006_add_ride_offers"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add rating_sum/rating_count and backfill them (plus total_rides)."""
+    op.add_column(
+        "driver_profiles",
+        sa.Column("rating_sum", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "driver_profiles",
+        sa.Column("rating_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        """
+        UPDATE driver_profiles AS dp
+        SET rating_sum = r.rating_sum,
+            rating_count = r.rating_count,
+            average_rating = r.rating_sum::float / r.rating_count
+        FROM (
+            SELECT reviewee_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+            FROM ride_reviews
+            GROUP BY reviewee_id
+        ) AS r
+        WHERE dp.user_id = r.reviewee_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE driver_profiles AS dp
+        SET total_rides = c.total_rides
+        FROM (
+            SELECT driver_id, COUNT(*) AS total_rides
+            FROM rides
+            WHERE status = 'completed'
+            GROUP BY driver_id
+        ) AS c
+        WHERE dp.user_id = c.driver_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Drop the rating aggregates."""
+    op.drop_column("driver_profiles", "rating_count")
+    op.drop_column("driver_profiles", "rating_sum")
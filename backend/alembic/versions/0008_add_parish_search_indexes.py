@@ -0,0 +1,41 @@
+"""Add trigram and spatial indexes for parish search.
+
+Revision ID: 0008_add_parish_search_indexes
+Revises: 0007_add_driver_rating_aggregates
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0008_add_parish_search_indexes"
+down_revision = "0007_add_driver_rating_aggregates"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Enable pg_trgm and index parish names, cities and locations."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_parishes_name_trgm",
+        "parishes",
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_parishes_city_trgm",
+        "parishes",
+        ["city"],
+        postgresql_using="gin",
+        postgresql_ops={"city": "gin_trgm_ops"},
+    )
+    # GeoAlchemy normally creates this alongside the table; make sure it exists.
+    op.execute("CREATE INDEX IF NOT EXISTS idx_parishes_location ON parishes USING gist (location)")
+
+
+def downgrade() -> None:
+    """Drop parish search indexes (pg_trgm is left installed)."""
+    op.drop_index("ix_parishes_city_trgm", table_name="parishes")
+    op.drop_index("ix_parishes_name_trgm", table_name="parishes")
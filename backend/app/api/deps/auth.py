@@ -1,29 +1,25 @@
 """Authentication dependencies."""
 
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.models.user import User, UserRole
 from app.schemas.token import TokenPayload
+from app.services.user_principal import UserPrincipal, get_user_principal
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
-) -> User:
-    """Get current authenticated user."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
+def get_user_id_from_token(token: str) -> Optional[int]:
+    """Return the user ID from a valid access token, or None if it is invalid/expired."""
     try:
         payload = jwt.decode(
             token,
@@ -31,14 +27,73 @@ def get_current_user(
             algorithms=[settings.ALGORITHM],
         )
         token_data = TokenPayload(**payload)
+    except (JWTError, ValidationError):
+        return None
+    return token_data.sub
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def get_current_principal(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme),
+) -> UserPrincipal:
+    """Get the cached id/role/status of the authenticated user.
+
+    Prefer this over `get_current_user` in endpoints that do not modify the user
+    or read profile fields; it usually avoids the database entirely and never
+    occupies a threadpool thread.
+    """
+    user_id = get_user_id_from_token(token)
+    if user_id is None:
+        raise _credentials_exception()
+
+    principal = await get_user_principal(db, user_id)
+    if principal is None:
+        raise _credentials_exception()
+
+    return principal
+
+
+async def get_current_active_principal(
+    principal: UserPrincipal = Depends(get_current_principal),
+) -> UserPrincipal:
+    """Get the principal of the current active user."""
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+
+async def get_current_verified_principal(
+    principal: UserPrincipal = Depends(get_current_active_principal),
+) -> UserPrincipal:
+    """Get the principal of the current active and email-verified user."""
+    if not principal.is_verified:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Email verification required",
+        )
+    return principal
+
 
-        if token_data.sub is None:
-            raise credentials_exception
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+) -> User:
+    """Get current authenticated user (full ORM object)."""
+    credentials_exception = _credentials_exception()
 
-    except JWTError:
+    user_id = get_user_id_from_token(token)
+    if user_id is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == token_data.sub).first()
+    user = db.query(User).filter(User.id == user_id).first()
 
     if user is None:
         raise credentials_exception
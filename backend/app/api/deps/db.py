@@ -0,0 +1,47 @@
+"""Database session dependencies with read-replica routing."""
+
+from typing import AsyncIterator, Iterator, Optional
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.api.deps.auth import get_user_id_from_token
+from app.db import replica
+from app.db.session import (
+    ReadSessionLocal,
+    SessionLocal,
+    get_async_read_sessionmaker,
+    get_async_sessionmaker,
+)
+
+
+def request_user_id(request: Request) -> Optional[int]:
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return get_user_id_from_token(token)
+
+
+def get_read_db(request: Request) -> Iterator[Session]:
+    """Session for read-only endpoints: the replica when safe, else the primary.
+
+    A plain generator like `get_db`, so the replica check and the close both run
+    on the threadpool rather than the event loop.
+    """
+    use_replica = replica.replica_configured() and replica.use_replica(request_user_id(request))
+    db = (ReadSessionLocal if use_replica else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """Async variant of `get_read_db`."""
+    use_replica = replica.replica_configured() and await replica.use_replica_async(
+        request_user_id(request)
+    )
+    sessionmaker = get_async_read_sessionmaker() if use_replica else get_async_sessionmaker()
+    async with sessionmaker() as db:
+        yield db
@@ -1,18 +1,20 @@
 """Authentication endpoints."""
 
 from datetime import timedelta
+from typing import Awaitable, Callable, Optional, TypeVar
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.security import (
-    create_access_token,
-    create_refresh_token,
-    get_password_hash,
-    verify_password,
+from app.core.password_pool import (
+    PasswordHashingBusyError,
+    hash_password_async,
+    verify_and_update_password_async,
 )
+from app.core.security import create_access_token, create_refresh_token
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.auth import (
@@ -26,22 +28,70 @@
 from app.schemas.token import Token
 from app.schemas.user import UserCreate, UserResponse
 from app.services import auth_email
-from app.services.rate_limit import check_rate_limit
+from app.services.rate_limit import RateLimit, check_rate_limit
+from app.services.user_principal import invalidate_user_principal
 
 router = APIRouter()
 
+T = TypeVar("T")
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+
+async def _run_hashing(fn: Callable[..., Awaitable[T]], *args: str) -> T:
+    """Await a password-hashing call, mapping pool saturation to a retryable 503."""
+    try:
+        return await fn(*args)
+    except (PasswordHashingBusyError, TimeoutError):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please try again shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+
+def _get_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _create_user(db: Session, db_user: User) -> User:
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+
+    # Send verification email (best-effort; failures should not break registration)
+    try:
+        auth_email.send_verification_email(db_user)
+    except Exception:
+        # In production, log this exception; for now we silently ignore.
+        pass
+
+    return db_user
+
+
+def _store_password_hash(db: Session, user: User, password_hash: str) -> None:
+    user.password_hash = password_hash
+    db.commit()
+
+
+# register, login and reset-password are async so that waiting on bcrypt in the
+# hashing pool holds no threadpool thread; their blocking DB and Redis calls
+# are handed to the threadpool one step at a time instead.
+@router.post(
+    "/register",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit("register_ip", limit=20, window_seconds=60 * 10))],
+)
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user and send verification email."""
-    check_rate_limit(
+    await run_in_threadpool(
+        check_rate_limit,
         key=f"register:{user_data.email.lower()}",
         limit=5,
         window_seconds=60 * 10,
         error_message="Too many registration attempts. Please try again later.",
     )
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await run_in_threadpool(_get_user_by_email, db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -49,7 +99,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await _run_hashing(hash_password_async, user_data.password)
     db_user = User(
         email=user_data.email,
         phone=user_data.phone,
@@ -58,51 +108,57 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         last_name=user_data.last_name,
         role=user_data.role,
     )
+    return await run_in_threadpool(_create_user, db, db_user)
 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-
-    # Send verification email (best-effort; failures should not break registration)
-    try:
-        auth_email.send_verification_email(db_user)
-    except Exception:
-        # In production, log this exception; for now we silently ignore.
-        pass
 
-    return db_user
-
-
-@router.post("/login", response_model=Token)
-def login(
+@router.post(
+    "/login",
+    response_model=Token,
+    dependencies=[Depends(RateLimit("login_ip", limit=50, window_seconds=60 * 5))],
+)
+async def login(
     db: Session = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
     """Login and get access token."""
-    check_rate_limit(
+    await run_in_threadpool(
+        check_rate_limit,
         key=f"login:{form_data.username.lower()}",
         limit=10,
         window_seconds=60 * 5,
         error_message="Too many login attempts. Please wait and try again.",
     )
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await run_in_threadpool(_get_user_by_email, db, form_data.username)
 
-    if not user or not verify_password(form_data.password, user.password_hash):
+    valid, new_hash = (
+        await _run_hashing(verify_and_update_password_async, form_data.password, user.password_hash)
+        if user
+        else (False, None)
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not user.is_active:
+    # Read these before any commit expires them (a reload would hit the DB on the loop).
+    user_id, is_active = user.id, user.is_active
+
+    if new_hash:
+        # The hashing cost changed since this password was stored; upgrade it now
+        # while we have the plaintext.
+        await run_in_threadpool(_store_password_hash, db, user, new_hash)
+
+    if not is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user",
         )
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(subject=str(user.id), expires_delta=access_token_expires)
-    refresh_token = create_refresh_token(subject=str(user.id))
+    access_token = create_access_token(subject=str(user_id), expires_delta=access_token_expires)
+    refresh_token = create_refresh_token(subject=str(user_id))
 
     return {
         "access_token": access_token,
@@ -138,6 +194,7 @@ def verify_email(payload: EmailVerificationRequest, db: Session = Depends(get_db
 
     user.is_verified = True
     db.commit()
+    invalidate_user_principal(user.id)
 
     return MessageResponse(message="Email successfully verified")
 
@@ -215,29 +272,18 @@ def validate_reset_token(payload: ValidateResetTokenRequest):
     return MessageResponse(message="Token is valid")
 
 
-@router.post("/reset-password", response_model=MessageResponse)
-def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db)):
-    """Reset password using a valid token."""
-    user_id = auth_email.get_user_id_from_reset_token(payload.token)
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid or expired token",
-        )
+def _get_user_by_id(db: Session, user_id: int) -> Optional[User]:
+    return db.query(User).filter(User.id == user_id).first()
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid or expired token",
-        )
 
-    user.password_hash = get_password_hash(payload.new_password)
+def _apply_password_reset(db: Session, user: User, token: str, password_hash: str) -> None:
+    user_id = user.id
+    user.password_hash = password_hash
 
     # Invalidate the token before committing the password change so it
     # cannot be reused if token invalidation fails.
     try:
-        auth_email.invalidate_reset_token(payload.token)
+        auth_email.invalidate_reset_token(token)
     except Exception:
         db.rollback()
         raise HTTPException(
@@ -252,7 +298,7 @@ def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db))
     except Exception:
         db.rollback()
         try:
-            auth_email.store_password_reset_token(user, payload.token)
+            auth_email.store_password_reset_token(user, token)
         except Exception:
             # Best-effort restoration; if this fails, the user will need
             # to initiate a new password reset.
@@ -263,4 +309,26 @@ def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db))
             detail="Could not complete password reset. Please try again.",
         )
 
+    invalidate_user_principal(user_id)
+
+
+@router.post("/reset-password", response_model=MessageResponse)
+async def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db)):
+    """Reset password using a valid token."""
+    user_id = await run_in_threadpool(auth_email.get_user_id_from_reset_token, payload.token)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired token",
+        )
+
+    user = await run_in_threadpool(_get_user_by_id, db, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired token",
+        )
+
+    password_hash = await _run_hashing(hash_password_async, payload.new_password)
+    await run_in_threadpool(_apply_password_reset, db, user, payload.token, password_hash)
     return MessageResponse(message="Password has been reset successfully")
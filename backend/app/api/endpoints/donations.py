@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
+import logging
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from redis.exceptions import RedisError
 from sqlalchemy.orm import Session
 
-from app.api.deps.auth import get_current_verified_user
+from app.api.deps.auth import get_current_verified_principal, get_current_verified_user
+from app.api.deps.db import get_read_db
 from app.db.session import get_db
 from app.models.donation import Donation
 from app.models.ride import Ride, RideStatus
@@ -22,7 +26,11 @@
     RideReviewCreate,
     RideReviewResponse,
 )
+from app.services import driver_stats, stripe_events
 from app.services.payment import PaymentService, StripeNotConfiguredError
+from app.services.user_principal import UserPrincipal
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -119,8 +127,8 @@ def update_my_donation_preferences(
 
 @router.get("/users/me/donations", response_model=list[DonationResponse])
 def list_my_donations(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_verified_user),
+    db: Session = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
 ):
     """List donations made by the current user."""
     donations = (
@@ -251,6 +259,7 @@ def submit_review_and_optional_donation(
         created_at=datetime.utcnow(),
     )
     db.add(review)
+    driver_stats.record_review(db, ride.driver_id, payload.rating)
     db.commit()
     db.refresh(review)
 
@@ -269,7 +278,7 @@ def submit_review_and_optional_donation(
 def get_latest_donation_intent_for_ride(
     ride_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_verified_user),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
 ):
     """Fetch the most recent donation PaymentIntent (client_secret) for a ride."""
     donation = (
@@ -297,13 +306,17 @@ async def stripe_webhook(
     stripe_signature: str = Header(default="", alias="Stripe-Signature"),
     db: Session = Depends(get_db),
 ):
-    """Handle Stripe webhook events."""
+    """Handle Stripe webhook events.
+
+    Verified events are queued for batch processing so Stripe gets a fast
+    acknowledgement; duplicates of already-queued events are acknowledged and
+    dropped.
+    """
     payload = await request.body()
 
     try:
         payment = PaymentService()
         event = payment.verify_and_construct_event(payload=payload, sig_header=stripe_signature)
-        payment.handle_webhook_event(db, event=event)
     except StripeNotConfiguredError as exc:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)
@@ -314,4 +327,10 @@ async def stripe_webhook(
     except Exception as exc:  # pragma: no cover - defensive
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
+    try:
+        stripe_events.enqueue_event(event)
+    except RedisError:
+        logger.warning("Stripe event queue unavailable; applying %s inline", event.get("id"))
+        await run_in_threadpool(payment.handle_webhook_event, db, event=event)
+
     return {"received": True}
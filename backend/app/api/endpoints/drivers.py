@@ -1,22 +1,91 @@
 """Driver endpoints."""
 
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.api.deps.auth import get_current_active_user
+from app.api.deps.auth import get_current_active_principal, get_current_active_user
 from app.db.session import get_db
 from app.models.user import User
+from app.schemas.driver import AvailableDriverResponse
+from app.services.driver_search import find_nearest_available_drivers, find_nearest_live_drivers
+from app.services.user_principal import UserPrincipal
+from app.utils.geo import METERS_PER_MILE
 
 router = APIRouter()
 
 
-@router.get("/available")
+@router.get("/available", response_model=list[AvailableDriverResponse])
 def get_available_drivers(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+    latitude: Optional[float] = Query(default=None, ge=-90, le=90),
+    longitude: Optional[float] = Query(default=None, ge=-180, le=180),
+    radius_miles: Optional[float] = Query(default=None, gt=0),
+    passenger_count: int = Query(default=1, ge=1, le=6),
+    limit: int = Query(default=10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_principal),
 ):
-    """Get available drivers nearby."""
-    # TODO: Implement driver discovery
-    return {"message": "Available drivers endpoint - to be implemented"}
+    """Get the nearest available drivers around a point.
+
+    Uses the explicit latitude/longitude, searched in the Redis live index, or,
+    failing that, the caller's last known location. Drivers with stale
+    locations or too few seats are skipped.
+    """
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="latitude and longitude must be provided together",
+        )
+
+    if latitude is not None and longitude is not None:
+        candidates = find_nearest_live_drivers(
+            db,
+            longitude=longitude,
+            latitude=latitude,
+            limit=limit,
+            radius_miles=radius_miles,
+            min_capacity=passenger_count,
+            exclude_user_ids={current_user.id},
+        )
+    else:
+        origin = (
+            select(User.last_known_location).where(User.id == current_user.id).scalar_subquery()
+        )
+        candidates = find_nearest_available_drivers(
+            db,
+            origin=origin,
+            limit=limit,
+            radius_miles=radius_miles,
+            min_capacity=passenger_count,
+            exclude_user_ids={current_user.id},
+        )
+        # A NULL origin matches nothing; only an empty result needs telling apart.
+        if not candidates and not db.scalar(
+            select(User.last_known_location.isnot(None)).where(User.id == current_user.id)
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A location is required to search for drivers",
+            )
+
+    return [
+        AvailableDriverResponse(
+            user_id=c.user.id,
+            first_name=c.user.first_name,
+            profile_photo_url=c.user.profile_photo_url,
+            vehicle_make=c.profile.vehicle_make,
+            vehicle_model=c.profile.vehicle_model,
+            vehicle_color=c.profile.vehicle_color,
+            vehicle_capacity=c.profile.vehicle_capacity,
+            average_rating=c.profile.average_rating,
+            total_rides=c.profile.total_rides,
+            distance_miles=round(c.distance_meters / METERS_PER_MILE, 2),
+            last_location_updated_at=c.located_at,
+        )
+        for c in candidates
+    ]
 
 
 @router.post("/profile")
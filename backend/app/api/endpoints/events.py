@@ -0,0 +1,137 @@
+"""Real-time event push over WebSocket, fanned out through Redis pub/sub.
+
+Every API worker publishes ride and user events to Redis channels, and every
+WebSocket connection subscribes to the channels it cares about. A client
+connected to any worker therefore sees events produced by any other worker.
+
+Protocol (JSON text frames):
+    client -> server: {"action": "subscribe", "ride_id": 12}
+                      {"action": "unsubscribe", "ride_id": 12}
+    server -> client: {"event": "ride_status", "ride_id": 12, "status": "arrived", ...}
+                      {"event": "subscribed", "ride_id": 12}
+                      {"event": "error", "detail": "..."}
+
+On connect the socket is subscribed to the user's own channel and to every
+ride the user is currently part of.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from redis.asyncio import Redis as AsyncRedis
+from sqlalchemy import or_
+
+from app.api.deps.auth import get_user_id_from_token
+from app.core.redis import get_async_redis_client
+from app.db.session import SessionLocal
+from app.models.ride import Ride, RideStatus
+from app.models.user import User
+from app.services.notifications import ride_channel, user_channel
+
+router = APIRouter()
+
+ACTIVE_RIDE_STATUSES = [
+    RideStatus.ACCEPTED,
+    RideStatus.DRIVER_ENROUTE,
+    RideStatus.ARRIVED,
+    RideStatus.PICKED_UP,
+    RideStatus.IN_PROGRESS,
+]
+
+
+def _get_async_redis() -> AsyncRedis:
+    return get_async_redis_client()
+
+
+def _load_active_ride_ids(user_id: int) -> list[int] | None:
+    """Return the user's active ride IDs, or None if the user may not connect."""
+    db = SessionLocal()
+    try:
+        user = db.query(User.is_active).filter(User.id == user_id).first()
+        if not user or not user.is_active:
+            return None
+        rows = db.query(Ride.id).filter(
+            or_(Ride.rider_id == user_id, Ride.driver_id == user_id),
+            Ride.status.in_(ACTIVE_RIDE_STATUSES),
+        )
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+
+def _is_ride_participant(user_id: int, ride_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return (
+            db.query(Ride.id)
+            .filter(
+                Ride.id == ride_id,
+                or_(Ride.rider_id == user_id, Ride.driver_id == user_id),
+            )
+            .first()
+            is not None
+        )
+    finally:
+        db.close()
+
+
+@router.websocket("/ws")
+async def events_websocket(websocket: WebSocket, token: str = Query(...)):
+    """Push ride status and user events to the connected client."""
+    user_id = get_user_id_from_token(token)
+    ride_ids = await run_in_threadpool(_load_active_ride_ids, user_id) if user_id else None
+    if user_id is None or ride_ids is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+
+    pubsub = _get_async_redis().pubsub()
+    await pubsub.subscribe(user_channel(user_id), *[ride_channel(r) for r in ride_ids])
+
+    async def relay() -> None:
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message and message.get("type") == "message":
+                await websocket.send_text(message["data"])
+
+    async def receive() -> None:
+        while True:
+            try:
+                request = json.loads(await websocket.receive_text())
+                action = request.get("action")
+                ride_id = int(request["ride_id"])
+            except (ValueError, KeyError, TypeError, AttributeError):
+                await websocket.send_json({"event": "error", "detail": "Invalid message"})
+                continue
+
+            if action == "subscribe":
+                if not await run_in_threadpool(_is_ride_participant, user_id, ride_id):
+                    await websocket.send_json({"event": "error", "detail": "Not your ride"})
+                    continue
+                await pubsub.subscribe(ride_channel(ride_id))
+                await websocket.send_json({"event": "subscribed", "ride_id": ride_id})
+            elif action == "unsubscribe":
+                await pubsub.unsubscribe(ride_channel(ride_id))
+                await websocket.send_json({"event": "unsubscribed", "ride_id": ride_id})
+            else:
+                await websocket.send_json({"event": "error", "detail": "Unknown action"})
+
+    tasks = [asyncio.create_task(relay()), asyncio.create_task(receive())]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            exc = task.exception()
+            if exc and not isinstance(exc, WebSocketDisconnect):
+                raise exc
+    finally:
+        for task in tasks:
+            task.cancel()
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
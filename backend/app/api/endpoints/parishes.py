@@ -4,29 +4,92 @@
 
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.api.deps.db import get_read_db
 from app.models.parish import Parish
-from app.schemas.parish import ParishResponse
+from app.schemas.parish import ParishResponse, ParishSuggestion
+from app.services import parish_cache, parish_search
+from app.utils.geo import to_geography
+from app.utils.pagination import InvalidCursorError
 
 router = APIRouter()
 
+_parish_list = TypeAdapter(list[ParishResponse])
+
 
 @router.get("/", response_model=list[ParishResponse])
-def list_parishes(db: Session = Depends(get_db), q: Optional[str] = None):
-    """List all parishes, optionally filtered by name."""
-    query = db.query(Parish).order_by(Parish.name.asc())
-    if q:
-        query = query.filter(Parish.name.ilike(f"%{q}%"))
-    return query.all()
+def list_parishes(
+    request: Request,
+    q: Optional[str] = Query(default=None, min_length=1, max_length=100),
+    latitude: Optional[float] = Query(default=None, ge=-90, le=90),
+    longitude: Optional[float] = Query(default=None, ge=-180, le=180),
+    radius_miles: Optional[float] = Query(default=None, gt=0, le=100),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Search parishes by name/city and/or proximity, one page at a time.
+
+    With latitude/longitude, parishes within `radius_miles` are returned nearest
+    first; otherwise a `q` search is ranked by relevance, and a plain listing is
+    ordered by name. The cursor for the next page is in the X-Next-Cursor header.
+    Responses carry an ETag; send it back in If-None-Match to get a 304.
+    """
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="latitude and longitude must be provided together",
+        )
+    origin = None
+    if latitude is not None and longitude is not None:
+        origin = to_geography(longitude=longitude, latitude=latitude)
+
+    def build(session: Session) -> parish_cache.CachedResponse:
+        try:
+            page = parish_search.search_parishes(
+                session, q=q, origin=origin, radius_miles=radius_miles, limit=limit, cursor=cursor
+            )
+        except InvalidCursorError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        return parish_cache.build_response(
+            _parish_list.dump_json(_parish_list.validate_python(page.parishes)),
+            last_modified=max((p.updated_at for p in page.parishes), default=None),
+            next_cursor=page.next_cursor,
+        )
+
+    if origin is not None:
+        # Coordinates make the key space unbounded; skip Redis and the shared edge cache.
+        return parish_cache.to_response(request, build(db), public=False)
+
+    params = {"q": q, "limit": limit, "cursor": cursor}
+    return parish_cache.to_response(request, parish_cache.get_or_build("list", params, build, db))
+
+
+@router.get("/autocomplete", response_model=list[ParishSuggestion])
+def autocomplete_parishes(
+    prefix: str = Query(..., min_length=1, max_length=50),
+    db: Session = Depends(get_read_db),
+):
+    """Search-as-you-type parish suggestions matching the start of a name or word."""
+    return parish_search.autocomplete(db, prefix)
 
 
 @router.get("/{parish_id}", response_model=ParishResponse)
-def get_parish(parish_id: int, db: Session = Depends(get_db)):
+def get_parish(parish_id: int, request: Request, db: Session = Depends(get_read_db)):
     """Get parish by ID."""
-    parish = db.query(Parish).filter(Parish.id == parish_id).first()
-    if not parish:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Parish not found")
-    return parish
+
+    def build(session: Session) -> parish_cache.CachedResponse:
+        parish = session.query(Parish).filter(Parish.id == parish_id).first()
+        if not parish:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Parish not found")
+        return parish_cache.build_response(
+            ParishResponse.model_validate(parish).model_dump_json().encode(),
+            last_modified=parish.updated_at,
+        )
+
+    return parish_cache.to_response(
+        request, parish_cache.get_or_build("detail", {"id": parish_id}, build, db)
+    )
@@ -2,35 +2,108 @@
 
 from __future__ import annotations
 
+import logging
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from geoalchemy2 import WKTElement
+from redis.exceptions import RedisError
+from sqlalchemy import and_, case, func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps.auth import get_current_verified_user
-from app.db.session import get_db
+from app.api.deps.auth import get_current_verified_principal
+from app.api.deps.db import get_async_read_db, get_read_db
+from app.celery_app import create_auto_donation, match_ride_request
+from app.core.config import settings
+from app.db.session import get_async_db, get_db
 from app.models.ride import Ride, RideStatus
+from app.models.ride_offer import RideOffer, RideOfferStatus
 from app.models.ride_request import RideRequest, RideRequestStatus
 from app.models.user import User, UserRole
-from app.schemas.donation import DonationIntentResponse
 from app.schemas.ride import (
+    LocationSample,
+    OpenRideOrder,
     RideAcceptResponse,
+    RideLocationBatch,
+    RideLocationBatchResponse,
+    RideOfferResponse,
     RideRequestCreate,
     RideRequestResponse,
     RideStatusUpdate,
 )
-from app.services.payment import PaymentService, StripeNotConfiguredError
+from app.services import driver_stats, ride_state, ride_tracking
+from app.services.notifications import publish_ride_event, publish_to_user
+from app.services.user_principal import UserPrincipal
+from app.utils.geo import METERS_PER_MILE, to_geography, to_point
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Ride statuses during which the driver app streams its position.
+TRACKED_RIDE_STATUSES = {
+    RideStatus.DRIVER_ENROUTE,
+    RideStatus.ARRIVED,
+    RideStatus.PICKED_UP,
+    RideStatus.IN_PROGRESS,
+}
+
 
 def _to_point(longitude: float, latitude: float) -> WKTElement:
     """Convert lat/long to PostGIS-compatible POINT."""
-    return WKTElement(f"POINT({longitude} {latitude})", srid=4326)
+    return to_point(longitude=longitude, latitude=latitude)
+
+
+def _enqueue_matching(ride_request_id: int) -> None:
+    """Kick off driver matching; the open ride feed still works if the broker is down."""
+    try:
+        match_ride_request.delay(ride_request_id)
+    except Exception as exc:
+        logger.warning("Could not enqueue matching for ride request %s: %s", ride_request_id, exc)
 
 
-def _ensure_driver(current_user: User) -> None:
+def _enqueue_auto_donation(ride_id: int) -> None:
+    """Queue the rider's auto-donation for a completed ride."""
+    try:
+        create_auto_donation.delay(ride_id)
+    except Exception:
+        logger.exception("Failed to enqueue auto-donation for ride %s", ride_id)
+
+
+def _offer_to_response(offer: RideOffer, ride_request: RideRequest) -> RideOfferResponse:
+    return RideOfferResponse.model_validate(
+        {
+            "id": offer.id,
+            "ride_request_id": offer.ride_request_id,
+            "score": offer.score,
+            "status": offer.status,
+            "created_at": offer.created_at,
+            "expires_at": offer.expires_at,
+            "ride_request": RideRequestResponse.model_validate(ride_request),
+        }
+    )
+
+
+def _compact_ride_trail(ride_id: int) -> tuple[Optional[WKTElement], Optional[WKTElement]]:
+    """The buffered location trail's `(pickup, dropoff)` points, if there is one."""
+    try:
+        pickup, dropoff = ride_tracking.compact_trail(ride_id)
+    except RedisError:
+        logger.warning("Failed to read location trail for ride %s", ride_id)
+        return None, None
+    return (
+        _to_point(pickup.longitude, pickup.latitude) if pickup else None,
+        _to_point(dropoff.longitude, dropoff.latitude) if dropoff else None,
+    )
+
+
+def _ensure_driver(current_user: UserPrincipal) -> None:
     if current_user.role not in {UserRole.DRIVER, UserRole.BOTH, UserRole.ADMIN}:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -39,18 +112,18 @@ def _ensure_driver(current_user: User) -> None:
 
 
 @router.get("/mine", response_model=list[RideRequestResponse])
-def list_my_ride_requests(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_verified_user),
+async def list_my_ride_requests(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
 ):
     """List ride requests created by the current user."""
-    rows = (
-        db.query(RideRequest, Ride.id.label("ride_id"))
+    result = await db.execute(
+        select(RideRequest, Ride.id.label("ride_id"))
         .outerjoin(Ride, Ride.ride_request_id == RideRequest.id)
-        .filter(RideRequest.rider_id == current_user.id)
+        .where(RideRequest.rider_id == current_user.id)
         .order_by(RideRequest.created_at.desc())
-        .all()
     )
+    rows = result.all()
     results: list[RideRequest] = []
     for ride_request, ride_id in rows:
         setattr(ride_request, "ride_id", ride_id)
@@ -59,29 +132,117 @@ def list_my_ride_requests(
 
 
 @router.get("/open", response_model=list[RideRequestResponse])
-def list_open_requests_for_drivers(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_verified_user),
+async def list_open_requests_for_drivers(
+    response: Response,
+    latitude: Optional[float] = Query(default=None, ge=-90, le=90),
+    longitude: Optional[float] = Query(default=None, ge=-180, le=180),
+    radius_miles: Optional[float] = Query(default=None, gt=0),
+    order_by: Optional[OpenRideOrder] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
 ):
-    """List pending ride requests available for drivers to accept."""
+    """List pending ride requests near the driver, one page at a time.
+
+    Requests are limited to MAX_DRIVER_DISTANCE_MILES around the explicit
+    latitude/longitude or, failing that, the driver's last known location. A driver
+    with neither gets a 409 asking for a location update rather than every open
+    request. The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     _ensure_driver(current_user)
 
-    return (
-        db.query(RideRequest)
-        .filter(
-            RideRequest.status == RideRequestStatus.PENDING,
-            RideRequest.rider_id != current_user.id,
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="latitude and longitude must be provided together",
         )
-        .order_by(RideRequest.created_at.desc())
-        .all()
+
+    radius_meters = (
+        min(radius_miles or settings.MAX_DRIVER_DISTANCE_MILES, settings.MAX_DRIVER_DISTANCE_MILES)
+        * METERS_PER_MILE
     )
+    me = None
+    if latitude is not None and longitude is not None:
+        origin = to_geography(longitude=longitude, latitude=latitude)
+        nearby = func.ST_DWithin(RideRequest.pickup_location, origin, radius_meters)
+    else:
+        # Resolve the stored point inside the feed query so it never round-trips through
+        # Python. The feed is outer-joined to it, so even an empty page tells whether the
+        # driver has a location; without one ST_DWithin matches nothing.
+        me = (
+            select(User.last_known_location.label("origin"))
+            .where(User.id == current_user.id)
+            .subquery("me")
+        )
+        origin = me.c.origin
+        nearby = func.ST_DWithin(RideRequest.pickup_location, origin, radius_meters)
+
+    distance = func.ST_Distance(RideRequest.pickup_location, origin)
+    by_distance = order_by != OpenRideOrder.REQUESTED_DATETIME
+    sort_keys = [RideRequest.requested_datetime, RideRequest.id]
+    if by_distance:
+        sort_keys.insert(0, distance)
+
+    conditions = [
+        RideRequest.status == RideRequestStatus.PENDING,
+        RideRequest.rider_id != current_user.id,
+        nearby,
+    ]
+    if cursor:
+        try:
+            last_keys = decode_cursor(cursor, len(sort_keys))
+            last_keys[-2] = datetime.fromisoformat(last_keys[-2])
+            last_keys[-1] = int(last_keys[-1])
+            if by_distance:
+                last_keys[0] = float(last_keys[0])
+        except (InvalidCursorError, TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        conditions.append(tuple_(*sort_keys) > tuple_(*last_keys))
+
+    columns = [RideRequest, distance.label("distance_meters")]
+    if me is None:
+        query = select(*columns).where(*conditions)
+    else:
+        query = (
+            select(*columns, origin.is_(None).label("unlocated"))
+            .select_from(me)
+            .outerjoin(RideRequest, and_(*conditions))
+        )
+    result = await db.execute(query.order_by(*sort_keys).limit(limit + 1))
+    rows = result.all()
+
+    if me is not None:
+        if rows[0].unlocated:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Send a location update or pass latitude and longitude to see open requests",
+            )
+        # With no pending request in range, the join yields the driver's row alone.
+        rows = [row for row in rows if row[0] is not None]
+
+    results: list[RideRequest] = []
+    for row in rows[:limit]:
+        ride_request, meters = row[0], row[1]
+        if meters is not None:
+            setattr(ride_request, "distance_miles", round(meters / METERS_PER_MILE, 2))
+        results.append(ride_request)
+
+    if len(rows) > limit:
+        last, meters = rows[limit - 1][0], rows[limit - 1][1]
+        last_keys = [last.requested_datetime.isoformat(), last.id]
+        if by_distance:
+            last_keys.insert(0, meters)
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*last_keys)
+
+    return results
 
 
 @router.post("/", response_model=RideRequestResponse, status_code=status.HTTP_201_CREATED)
 def create_ride_request(
     payload: RideRequestCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_verified_user),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
 ):
     """Create a new ride request."""
     ride_request = RideRequest(
@@ -104,9 +265,69 @@ def create_ride_request(
     db.commit()
     db.refresh(ride_request)
 
+    _enqueue_matching(ride_request.id)
+
     return ride_request
 
 
+@router.get("/offers", response_model=list[RideOfferResponse])
+def list_my_ride_offers(
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
+):
+    """List live ride offers the matching engine has sent to the current driver."""
+    _ensure_driver(current_user)
+
+    rows = (
+        db.query(RideOffer, RideRequest)
+        .join(RideRequest, RideRequest.id == RideOffer.ride_request_id)
+        .filter(
+            RideOffer.driver_id == current_user.id,
+            RideOffer.status == RideOfferStatus.PENDING,
+            RideOffer.expires_at > datetime.utcnow(),
+            RideRequest.status == RideRequestStatus.PENDING,
+        )
+        .order_by(RideOffer.expires_at.asc())
+        .all()
+    )
+    return [_offer_to_response(offer, ride_request) for offer, ride_request in rows]
+
+
+@router.post("/offers/{offer_id}/decline", response_model=RideOfferResponse)
+def decline_ride_offer(
+    offer_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
+):
+    """Decline a ride offer so the request can be offered to the next driver."""
+    _ensure_driver(current_user)
+
+    row = (
+        db.query(RideOffer, RideRequest)
+        .join(RideRequest, RideRequest.id == RideOffer.ride_request_id)
+        .filter(RideOffer.id == offer_id, RideOffer.driver_id == current_user.id)
+        .first()
+    )
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ride offer not found")
+
+    offer, ride_request = row
+    if offer.status != RideOfferStatus.PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ride offer is no longer open",
+        )
+
+    offer.status = RideOfferStatus.DECLINED
+    offer.responded_at = datetime.utcnow()
+    db.commit()
+
+    if ride_request.status == RideRequestStatus.PENDING:
+        _enqueue_matching(ride_request.id)
+
+    return _offer_to_response(offer, ride_request)
+
+
 @router.post(
     "/{ride_request_id}/accept",
     response_model=RideAcceptResponse,
@@ -115,55 +336,99 @@ def create_ride_request(
 def accept_ride_request(
     ride_request_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_verified_user),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
 ):
-    """Allow a driver to accept a pending ride request."""
-    _ensure_driver(current_user)
+    """Allow a driver to accept a pending ride request.
 
-    ride_request = db.query(RideRequest).filter(RideRequest.id == ride_request_id).first()
-    if not ride_request:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ride request not found")
+    The request is claimed with a conditional UPDATE ... WHERE status = 'pending'
+    RETURNING, so when several drivers accept at once exactly one wins and the
+    others get a 409 without ever reaching the rides.ride_request_id constraint.
+    """
+    _ensure_driver(current_user)
 
-    if ride_request.rider_id == current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot accept your own ride request",
+    now = datetime.utcnow()
+    claimed = db.execute(
+        update(RideRequest)
+        .where(
+            RideRequest.id == ride_request_id,
+            RideRequest.status == RideRequestStatus.PENDING,
+            RideRequest.rider_id != current_user.id,
         )
-
-    if ride_request.status != RideRequestStatus.PENDING:
+        .values(status=RideRequestStatus.ACCEPTED, updated_at=now)
+        .returning(RideRequest.rider_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if claimed is None:
+        # Only the losing path pays for a second lookup to explain the failure.
+        existing = db.query(RideRequest.rider_id).filter(RideRequest.id == ride_request_id).first()
+        db.rollback()
+        if not existing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Ride request not found"
+            )
+        if existing.rider_id == current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot accept your own ride request",
+            )
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=status.HTTP_409_CONFLICT,
             detail="Ride request is no longer available",
         )
 
-    existing_ride = db.query(Ride).filter(Ride.ride_request_id == ride_request.id).first()
-    if existing_ride:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Ride request already accepted",
-        )
-
     ride = Ride(
-        ride_request_id=ride_request.id,
+        ride_request_id=ride_request_id,
         driver_id=current_user.id,
-        rider_id=ride_request.rider_id,
+        rider_id=claimed.rider_id,
         status=RideStatus.ACCEPTED,
-        accepted_at=datetime.utcnow(),
+        accepted_at=now,
     )
+    db.add(ride)
 
-    ride_request.status = RideRequestStatus.ACCEPTED
+    # Close out any offers the matching engine sent for this request.
+    db.query(RideOffer).filter(
+        RideOffer.ride_request_id == ride_request_id,
+        RideOffer.status == RideOfferStatus.PENDING,
+    ).update(
+        {
+            RideOffer.status: case(
+                (RideOffer.driver_id == current_user.id, RideOfferStatus.ACCEPTED.value),
+                else_=RideOfferStatus.EXPIRED.value,
+            ),
+            RideOffer.responded_at: now,
+        },
+        synchronize_session=False,
+    )
 
-    db.add(ride)
-    db.commit()
-    db.refresh(ride)
+    try:
+        db.flush()
+        response = RideAcceptResponse.model_validate(ride)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ride request already accepted",
+        )
+
+    event = {
+        "ride_id": response.id,
+        "ride_request_id": response.ride_request_id,
+        "driver_id": response.driver_id,
+        "status": response.status,
+        "accepted_at": response.accepted_at,
+    }
+    publish_to_user(response.rider_id, "ride_accepted", event)
+    publish_ride_event(response.id, "ride_status", {"status": response.status})
 
-    return ride
+    return response
 
 
 @router.get("/assigned", response_model=list[RideAcceptResponse])
 def list_assigned_rides(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_verified_user),
+    db: Session = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
 ):
     """List rides assigned to the current driver."""
     _ensure_driver(current_user)
@@ -183,102 +448,160 @@ def update_ride_status(
     ride_id: int,
     payload: RideStatusUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_verified_user),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
 ):
-    """Update the status of an accepted ride (driver only)."""
-    _ensure_driver(current_user)
+    """Update the status of an accepted ride (driver only).
 
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
-    if not ride:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ride not found")
-
-    if ride.driver_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your ride")
+    Moves are validated by `app.services.ride_state`; re-sending the ride's
+    current status is a no-op, so a retried request is safe.
+    """
+    _ensure_driver(current_user)
 
-    ride.status = payload.status
+    pickup = dropoff = None
+    if payload.status == RideStatus.COMPLETED:
+        pickup, dropoff = _compact_ride_trail(ride_id)
 
-    ride_request = db.query(RideRequest).filter(RideRequest.id == ride.ride_request_id).first()
-    if ride_request:
-        if payload.status in {RideStatus.DRIVER_ENROUTE, RideStatus.ARRIVED, RideStatus.PICKED_UP}:
-            ride_request.status = RideRequestStatus.ACCEPTED
-        elif payload.status == RideStatus.IN_PROGRESS:
-            ride_request.status = RideRequestStatus.IN_PROGRESS
-        elif payload.status == RideStatus.COMPLETED:
-            ride_request.status = RideRequestStatus.COMPLETED
-        elif payload.status == RideStatus.CANCELLED:
-            ride_request.status = RideRequestStatus.CANCELLED
+    changed = ride_state.transition(
+        db,
+        ride_id=ride_id,
+        driver_id=current_user.id,
+        target=payload.status,
+        actual_pickup=pickup,
+        actual_dropoff=dropoff,
+    )
 
-    if payload.status == RideStatus.COMPLETED:
-        ride.completed_at = datetime.utcnow()
+    if changed is None:
+        # Only a rejected move pays for a second lookup to explain the failure.
+        ride = (
+            db.query(
+                Ride.id,
+                Ride.ride_request_id,
+                Ride.driver_id,
+                Ride.rider_id,
+                Ride.status,
+                Ride.accepted_at,
+            )
+            .filter(Ride.id == ride_id)
+            .first()
+        )
+        db.rollback()
+        if not ride:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ride not found")
+        if ride.driver_id != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your ride")
+        if ride.status != payload.status:
+            try:
+                ride_state.check_transition(ride.status, payload.status)
+            except ride_state.InvalidTransitionError as exc:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+            # Allowed but not applied: the ride moved concurrently.
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Ride status changed concurrently; retry",
+            )
+        return RideAcceptResponse.model_validate(ride._asdict())
+
+    if changed.status == RideStatus.COMPLETED:
+        # COMPLETED is terminal, so a successful move there happens once per ride.
+        driver_stats.record_completed_ride(db, changed.driver_id)
 
     db.commit()
-    db.refresh(ride)
 
-    auto_donation_intent: DonationIntentResponse | None = None
+    if changed.finished:
+        try:
+            ride_tracking.discard_trail(changed.ride_id)
+        except RedisError:
+            logger.warning("Failed to discard location trail for ride %s", changed.ride_id)
 
-    # Auto-donation is based on the rider's preference, so we create the PaymentIntent
-    # and persist the client_secret on the Donation record for the rider app to confirm.
-    if payload.status == RideStatus.COMPLETED:
-        rider = db.query(User).filter(User.id == ride.rider_id).first()
-        if rider and rider.auto_donation_enabled:
-            amount_cents: int | None = None
-            if rider.auto_donation_type == "fixed":
-                amount_cents = rider.auto_donation_amount_cents or None
-            else:
-                try:
-                    payment = PaymentService()
-                    distance_miles = payment.get_ride_distance_miles(db, ride_id=ride.id) or 0.0
-                    multiplier = rider.auto_donation_multiplier or 0.5  # USD per mile
-                    amount = 5.0 + (distance_miles * multiplier)
-                    amount_cents = max(100, min(100_000, int(round(amount * 100))))
-                    intent = payment.create_donation_payment_intent(
-                        db,
-                        amount_cents=amount_cents,
-                        donor=rider,
-                        ride_id=ride.id,
-                        driver_id=ride.driver_id,
-                    )
-                    auto_donation_intent = DonationIntentResponse(
-                        payment_intent_id=intent.payment_intent_id,
-                        client_secret=intent.client_secret,
-                        amount=intent.amount_cents / 100.0,
-                        currency="USD",
-                    )
-                except StripeNotConfiguredError:
-                    auto_donation_intent = None
-                except Exception:
-                    # Don't block ride completion if donations fail.
-                    auto_donation_intent = None
-
-            if amount_cents and rider.auto_donation_type == "fixed":
-                try:
-                    payment = PaymentService()
-                    intent = payment.create_donation_payment_intent(
-                        db,
-                        amount_cents=amount_cents,
-                        donor=rider,
-                        ride_id=ride.id,
-                        driver_id=ride.driver_id,
-                    )
-                    auto_donation_intent = DonationIntentResponse(
-                        payment_intent_id=intent.payment_intent_id,
-                        client_secret=intent.client_secret,
-                        amount=intent.amount_cents / 100.0,
-                        currency="USD",
-                    )
-                except StripeNotConfiguredError:
-                    auto_donation_intent = None
-                except Exception:
-                    auto_donation_intent = None
+    ride_state.publish(changed)
+
+    # Auto-donations talk to Stripe, so they are created by a worker; the rider
+    # picks the intent up via GET /rides/{ride_id}/donation-intent or a push event.
+    if changed.status == RideStatus.COMPLETED and changed.auto_donation_enabled:
+        _enqueue_auto_donation(changed.ride_id)
 
     return RideAcceptResponse.model_validate(
         {
-            "id": ride.id,
-            "ride_request_id": ride.ride_request_id,
-            "driver_id": ride.driver_id,
-            "rider_id": ride.rider_id,
-            "status": ride.status,
-            "accepted_at": ride.accepted_at,
-            "auto_donation_intent": auto_donation_intent,
+            "id": changed.ride_id,
+            "ride_request_id": changed.ride_request_id,
+            "driver_id": changed.driver_id,
+            "rider_id": changed.rider_id,
+            "status": changed.status,
+            "accepted_at": changed.accepted_at,
+            "auto_donation_intent": None,
         }
     )
+
+
+@router.post(
+    "/{ride_id}/locations",
+    response_model=RideLocationBatchResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def ingest_ride_locations(
+    ride_id: int,
+    payload: RideLocationBatch,
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
+):
+    """Stream a batch of driver GPS samples for an active ride (driver only).
+
+    Samples are buffered in Redis and pushed to the rider's event stream; the
+    database is only touched once the ride completes.
+    """
+    _ensure_driver(current_user)
+
+    ride = db.query(Ride.driver_id, Ride.status).filter(Ride.id == ride_id).first()
+    if not ride:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ride not found")
+    if ride.driver_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your ride")
+    if ride.status not in TRACKED_RIDE_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ride is not in progress",
+        )
+
+    try:
+        accepted = ride_tracking.append_samples(
+            ride_id=ride_id,
+            driver_id=current_user.id,
+            ride_status=ride.status,
+            samples=[(s.latitude, s.longitude, s.recorded_at) for s in payload.samples],
+        )
+    except RedisError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Location tracking is temporarily unavailable",
+        )
+    return RideLocationBatchResponse(accepted=accepted)
+
+
+@router.get("/{ride_id}/locations", response_model=list[LocationSample])
+def get_ride_locations(
+    ride_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_verified_principal),
+):
+    """Return the buffered driver trail so a (re)connecting rider can catch up."""
+    ride = db.query(Ride.driver_id, Ride.rider_id).filter(Ride.id == ride_id).first()
+    if not ride:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ride not found")
+    if current_user.id not in {ride.driver_id, ride.rider_id}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your ride")
+
+    try:
+        trail = ride_tracking.get_trail(ride_id)
+    except RedisError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Location tracking is temporarily unavailable",
+        )
+    return [
+        LocationSample(
+            latitude=sample.latitude,
+            longitude=sample.longitude,
+            recorded_at=datetime.utcfromtimestamp(sample.recorded_at),
+        )
+        for sample in trail
+    ]
@@ -1,22 +1,32 @@
 """User endpoints."""
 
+import logging
 from datetime import datetime
-from io import BytesIO
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from geoalchemy2 import WKTElement
-from PIL import Image, ImageOps
+from redis.exceptions import RedisError
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps.auth import get_current_active_user
+from app.api.deps.auth import get_current_active_principal, get_current_active_user
+from app.api.deps.db import get_read_db
+from app.celery_app import process_profile_photo
 from app.core.config import settings
-from app.db.session import get_db
-from app.models.user import User
-from app.schemas.user import UserLocationUpdate, UserResponse, UserUpdate
-from app.services.storage import delete_file, generate_profile_photo_key, upload_file_obj
+from app.db.session import get_async_db, get_db
+from app.models.user import User, UserRole
+from app.schemas.user import UserLocationResponse, UserLocationUpdate, UserResponse, UserUpdate
+from app.services import location_index, profile_photos
+from app.services.storage import upload_file_obj
+from app.services.user_principal import UserPrincipal, invalidate_user_principal
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+DRIVER_ROLES = {UserRole.DRIVER, UserRole.BOTH}
+
 MAX_PROFILE_PHOTO_SIZE_BYTES = 5 * 1024 * 1024  # 5MB
 ALLOWED_IMAGE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp"}
 
@@ -43,17 +53,23 @@ def update_current_user(
 
     db.commit()
     db.refresh(current_user)
+    invalidate_user_principal(current_user.id)
 
     return current_user
 
 
-@router.post("/me/photo", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def upload_profile_photo(
+@router.post("/me/photo", response_model=UserResponse, status_code=status.HTTP_202_ACCEPTED)
+def upload_profile_photo(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_principal),
     db: Session = Depends(get_db),
 ):
-    """Upload or replace the current user's profile photo."""
+    """Upload or replace the current user's profile photo.
+
+    The upload is validated and stored as-is; resizing happens in a worker,
+    which updates `profile_photo_url` and pushes a `profile_photo_ready` event
+    when done. The response reflects the profile as it is right now.
+    """
     if not settings.AWS_S3_BUCKET:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -66,55 +82,41 @@ async def upload_profile_photo(
             detail="Invalid image format. Allowed: JPEG, PNG, WebP",
         )
 
-    # Read into memory to check size and process image
-    contents = await file.read()
-    if len(contents) > MAX_PROFILE_PHOTO_SIZE_BYTES:
+    # The multipart parser has already spooled the upload to a temp file.
+    size = file.size if file.size is not None else file.file.seek(0, 2)
+    if size > MAX_PROFILE_PHOTO_SIZE_BYTES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File too large (max 5MB)",
         )
 
     try:
-        image = Image.open(BytesIO(contents))
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid image file",
-        )
+        profile_photos.validate_image(file.file)
+    except profile_photos.InvalidImageError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
-    # Normalize and resize to 500x500 thumbnail
-    image = image.convert("RGB")
-    image = ImageOps.fit(image, (500, 500))
-
-    output = BytesIO()
-    image.save(output, format="JPEG", quality=85)
-    output.seek(0)
-
-    key = generate_profile_photo_key(current_user.id, file.filename or "profile.jpg")
-    url = upload_file_obj(
-        output,
+    prefix = profile_photos.new_photo_prefix(current_user.id)
+    upload_file_obj(
+        file.file,
         bucket=settings.AWS_S3_BUCKET,
-        key=key,
-        content_type="image/jpeg",
+        key=profile_photos.original_key(prefix),
+        content_type=file.content_type,
     )
+    _enqueue_profile_photo(current_user.id, prefix)
 
-    # Optionally delete previous photo
-    if current_user.profile_photo_url:
-        try:
-            # Expecting URLs like https://bucket.s3.region.amazonaws.com/key
-            parts = current_user.profile_photo_url.split(".amazonaws.com/", 1)
-            if len(parts) == 2:
-                old_key = parts[1]
-                delete_file(settings.AWS_S3_BUCKET, old_key)
-        except Exception:
-            # Best-effort cleanup; ignore failures
-            pass
-
-    current_user.profile_photo_url = url
-    db.commit()
-    db.refresh(current_user)
+    return db.get(User, current_user.id)
 
-    return current_user
+
+def _enqueue_profile_photo(user_id: int, prefix: str) -> None:
+    profile_photos.mark_pending(user_id, prefix)
+    try:
+        process_profile_photo.delay(user_id, prefix)
+    except Exception:
+        logger.exception("Failed to enqueue profile photo processing for user %s", user_id)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Photo processing is temporarily unavailable",
+        )
 
 
 @router.delete("/me/photo", response_model=UserResponse)
@@ -123,15 +125,7 @@ def delete_profile_photo(
     db: Session = Depends(get_db),
 ):
     """Remove the current user's profile photo."""
-    if current_user.profile_photo_url and settings.AWS_S3_BUCKET:
-        try:
-            parts = current_user.profile_photo_url.split(".amazonaws.com/", 1)
-            if len(parts) == 2:
-                key = parts[1]
-                delete_file(settings.AWS_S3_BUCKET, key)
-        except Exception:
-            # Ignore deletion errors
-            pass
+    profile_photos.delete_photo(current_user.profile_photo_url)
 
     current_user.profile_photo_url = None
     db.commit()
@@ -143,8 +137,8 @@ def delete_profile_photo(
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_active_principal),
 ):
     """Get user by ID."""
     user = db.query(User).filter(User.id == user_id).first()
@@ -155,23 +149,48 @@ def get_user(
     return user
 
 
-@router.post("/location", response_model=UserResponse)
-def update_user_location(
+@router.post("/location", response_model=UserLocationResponse)
+async def update_user_location(
     location: UserLocationUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
-) -> UserResponse:
+    current_user: UserPrincipal = Depends(get_current_active_principal),
+    db: AsyncSession = Depends(get_async_db),
+) -> UserLocationResponse:
     """Update the current user's last known location.
 
     This is typically called by the mobile or web client when the user
     explicitly shares their location (e.g., before requesting or offering a
     ride). Location is stored as a PostGIS POINT(longitude, latitude).
+
+    Driver heartbeats are high-frequency, so they only touch the Redis live
+    location index and are written to Postgres in batches by a Celery task. If
+    Redis is unavailable we fall back to a direct database write. Either way
+    the response is built from the principal, without reading the user row.
     """
-    point_wkt = f"POINT({location.longitude} {location.latitude})"
-    current_user.last_known_location = WKTElement(point_wkt, srid=4326)
-    current_user.last_location_updated_at = datetime.utcnow()
+    now = datetime.utcnow()
+    response = UserLocationResponse(
+        id=current_user.id,
+        latitude=location.latitude,
+        longitude=location.longitude,
+        updated_at=now,
+    )
+    if current_user.role in DRIVER_ROLES:
+        try:
+            await location_index.record_driver_location_async(
+                current_user.id, longitude=location.longitude, latitude=location.latitude
+            )
+            return response
+        except RedisError:
+            logger.warning("Live location index unavailable; writing location to database")
 
-    db.commit()
-    db.refresh(current_user)
+    point_wkt = f"POINT({location.longitude} {location.latitude})"
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(
+            last_known_location=WKTElement(point_wkt, srid=4326),
+            last_location_updated_at=now,
+        )
+    )
+    await db.commit()
 
-    return current_user
+    return response
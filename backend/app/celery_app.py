@@ -7,9 +7,24 @@
 
 from __future__ import annotations
 
+import stripe
+from botocore.exceptions import BotoCoreError, ClientError
 from celery import Celery
+from celery.signals import worker_process_shutdown
+from celery.utils.time import get_exponential_backoff_interval
 
+from app import models  # noqa: F401  (register every mapper for worker-side queries)
 from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services import (
+    auto_donation,
+    driver_stats,
+    email,
+    location_index,
+    matching,
+    profile_photos,
+    stripe_events,
+)
 
 
 def _create_celery() -> Celery:
@@ -26,6 +41,24 @@ def _create_celery() -> Celery:
         result_serializer="json",
         enable_utc=True,
         timezone="UTC",
+        beat_schedule={
+            "flush-driver-locations": {
+                "task": "locations.flush_driver_locations",
+                "schedule": float(settings.DRIVER_LOCATION_FLUSH_SECONDS),
+            },
+            "expire-ride-offers": {
+                "task": "matching.expire_ride_offers",
+                "schedule": 60.0,
+            },
+            "process-stripe-events": {
+                "task": "donations.process_stripe_events",
+                "schedule": float(settings.STRIPE_EVENT_BATCH_SECONDS),
+            },
+            "reconcile-driver-stats": {
+                "task": "drivers.reconcile_stats",
+                "schedule": float(settings.DRIVER_STATS_RECONCILE_SECONDS),
+            },
+        },
     )
     return app
 
@@ -37,3 +70,129 @@ def _create_celery() -> Celery:
 def ping() -> str:
     """Lightweight health task for smoke tests."""
     return "pong"
+
+
+@celery_app.task(name="locations.flush_driver_locations", ignore_result=True)
+def flush_driver_locations() -> int:
+    """Write buffered driver GPS positions from Redis to Postgres in one batch."""
+    db = SessionLocal()
+    try:
+        return location_index.flush_driver_locations(db)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="matching.match_ride_request", ignore_result=True)
+def match_ride_request(ride_request_id: int) -> int:
+    """Score nearby drivers for a ride request and send them offers."""
+    db = SessionLocal()
+    try:
+        return len(matching.match_ride_request(db, ride_request_id=ride_request_id))
+    finally:
+        db.close()
+
+
+@celery_app.task(name="matching.expire_ride_offers", ignore_result=True)
+def expire_ride_offers() -> int:
+    """Expire lapsed offers and re-match requests that ran out of live offers."""
+    db = SessionLocal()
+    try:
+        ride_request_ids = matching.expire_stale_offers(db)
+    finally:
+        db.close()
+
+    for ride_request_id in ride_request_ids:
+        match_ride_request.delay(ride_request_id)
+    return len(ride_request_ids)
+
+
+# Transient Stripe failures worth retrying; card/validation errors are not.
+RETRYABLE_STRIPE_ERRORS = (
+    stripe.error.APIConnectionError,
+    stripe.error.RateLimitError,
+    stripe.error.APIError,
+)
+
+
+@celery_app.task(
+    name="donations.create_auto_donation",
+    ignore_result=True,
+    autoretry_for=RETRYABLE_STRIPE_ERRORS,
+    retry_backoff=True,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    max_retries=6,
+)
+def create_auto_donation(ride_id: int) -> str | None:
+    """Create the rider's auto-donation PaymentIntent for a completed ride."""
+    db = SessionLocal()
+    try:
+        intent = auto_donation.create_auto_donation(db, ride_id=ride_id)
+    finally:
+        db.close()
+    return intent.payment_intent_id if intent else None
+
+
+@celery_app.task(name="donations.process_stripe_events", ignore_result=True)
+def process_stripe_events() -> int:
+    """Apply queued Stripe webhook events to donations, one batch per run."""
+    db = SessionLocal()
+    try:
+        return stripe_events.process_stripe_events(db, batch_size=settings.STRIPE_EVENT_BATCH_SIZE)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="drivers.reconcile_stats", ignore_result=True)
+def reconcile_driver_stats() -> int:
+    """Recompute driver ride counts and ratings, repairing any drift."""
+    db = SessionLocal()
+    try:
+        return driver_stats.reconcile_driver_stats(db)
+    finally:
+        db.close()
+
+
+@celery_app.task(
+    name="email.send_messages",
+    bind=True,
+    ignore_result=True,
+    max_retries=settings.EMAIL_MAX_RETRIES,
+)
+def send_emails(self, messages: list[dict]) -> int:
+    """Send a batch of emails over this worker's persistent SMTP connection.
+
+    Messages that hit a transient SMTP failure are retried with exponential
+    backoff and jitter; those already sent are not resent.
+    """
+    remaining = email.deliver(messages)
+    if remaining:
+        raise self.retry(
+            args=[remaining],
+            countdown=get_exponential_backoff_interval(
+                factor=10, retries=self.request.retries, maximum=600, full_jitter=True
+            ),
+        )
+    return len(messages)
+
+
+@worker_process_shutdown.connect
+def _close_smtp_connection(**_kwargs) -> None:
+    email.smtp_connection.close()
+
+
+@celery_app.task(
+    name="photos.process_profile_photo",
+    ignore_result=True,
+    autoretry_for=(BotoCoreError, ClientError),
+    retry_backoff=True,
+    retry_jitter=True,
+    max_retries=5,
+)
+def process_profile_photo(user_id: int, prefix: str) -> str | None:
+    """Render profile photo variants for an uploaded original and publish them."""
+    db = SessionLocal()
+    try:
+        return profile_photos.process_profile_photo(db, user_id=user_id, prefix=prefix)
+    finally:
+        db.close()
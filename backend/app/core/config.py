@@ -19,11 +19,54 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # Password hashing (bcrypt runs in a dedicated process pool; 0 workers = inline)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = 5.0
+
+    # Cached auth principal (id/role/is_active/is_verified) for request auth
+    USER_PRINCIPAL_CACHE_SECONDS: int = 60
+    USER_PRINCIPAL_REDIS_CACHE: bool = True
+    USER_PRINCIPAL_LOCAL_TTL_SECONDS: float = 5.0
+    USER_PRINCIPAL_LOCAL_CACHE_SIZE: int = 10_000
+
+    # Buckets mirrored in-process by the rate limiter's local pre-filter
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 10_000
+    # Reverse proxies (IPs or CIDRs, e.g. nginx's Docker network) whose X-Real-IP /
+    # X-Forwarded-For headers name the client. Empty: key on the peer address.
+    TRUSTED_PROXIES: List[str] = []
+
     # CORS
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
 
     # Database
     DATABASE_URL: str
+    # Async (asyncpg) URL for the async API paths; derived from DATABASE_URL if unset.
+    ASYNC_DATABASE_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 15_000  # 0 disables
+    DB_APPLICATION_NAME: str = "catholic-ride-share"
+    # Set when DATABASE_URL points at PgBouncer in transaction pooling mode.
+    DB_PGBOUNCER: bool = False
+    # Behind PgBouncer, skip the client-side pool entirely.
+    DB_PGBOUNCER_NULL_POOL: bool = True
+    # Streaming replica for read-only endpoints (unset = everything hits the primary).
+    DATABASE_READ_URL: Optional[str] = None
+    READ_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    READ_REPLICA_LAG_CHECK_SECONDS: float = 2.0
+    # After a user writes, serve their reads from the primary for this long.
+    READ_YOUR_WRITES_SECONDS: int = 10
+    # Development: log each request's statement count, repeated statements (N+1)
+    # and slow statements with their EXPLAIN plans (app.db.query_budget).
+    QUERY_DEBUG: bool = False
+    SLOW_QUERY_MS: int = 100
+    # A statement shape executed this many times in one request is reported as N+1.
+    QUERY_REPEAT_THRESHOLD: int = 3
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
@@ -35,6 +78,11 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     EMAILS_FROM_EMAIL: Optional[str] = None
     EMAILS_FROM_NAME: Optional[str] = None
+    # Workers reuse one SMTP connection per process; recycle it after idling or N messages.
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    SMTP_CONNECTION_IDLE_SECONDS: int = 60
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+    EMAIL_MAX_RETRIES: int = 6
 
     # SMS (Twilio)
     TWILIO_ACCOUNT_SID: Optional[str] = None
@@ -54,12 +102,15 @@ class Settings(BaseSettings):
     STRIPE_SECRET_KEY: Optional[str] = None
     STRIPE_PUBLISHABLE_KEY: Optional[str] = None
     STRIPE_WEBHOOK_SECRET: Optional[str] = None
+    STRIPE_EVENT_BATCH_SIZE: int = 500
+    STRIPE_EVENT_BATCH_SECONDS: int = 5
 
     # AWS S3 (for file storage)
     AWS_ACCESS_KEY_ID: Optional[str] = None
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
     AWS_S3_BUCKET: Optional[str] = None
     AWS_REGION: str = "us-east-1"
+    AWS_S3_MAX_POOL: int = 20
 
     # Background checks (Checkr or similar)
     CHECKR_API_KEY: Optional[str] = None
@@ -72,6 +123,21 @@ class Settings(BaseSettings):
     # Application settings
     MAX_DRIVER_DISTANCE_MILES: int = 10
     RIDE_OFFER_EXPIRY_MINUTES: int = 15
+    DRIVER_LOCATION_STALE_MINUTES: int = 10
+    DRIVER_LOCATION_FLUSH_SECONDS: int = 15
+    MATCHING_OFFER_FANOUT: int = 3
+    MATCHING_CANDIDATE_POOL: int = 25
+    RIDE_TRAIL_MAX_SAMPLES: int = 500
+    # Sample times are clamped to [now - this, now]; devices buffer while offline.
+    RIDE_SAMPLE_MAX_AGE_SECONDS: int = 10 * 60
+    DRIVER_STATS_RECONCILE_SECONDS: int = 6 * 60 * 60
+    PARISH_SEARCH_RADIUS_MILES: int = 25
+    # Autocomplete results are cached in Redis for prefixes up to this length.
+    PARISH_AUTOCOMPLETE_CACHE_MAX_PREFIX: int = 3
+    PARISH_AUTOCOMPLETE_CACHE_SECONDS: int = 600
+    # Redis lifetime of cached parish responses / browser and edge max-age.
+    PARISH_CACHE_SECONDS: int = 3600
+    PARISH_CACHE_MAX_AGE_SECONDS: int = 300
 
     class Config:
         """Pydantic config."""
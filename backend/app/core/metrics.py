@@ -0,0 +1,206 @@
+"""Prometheus metrics for request latency, database time and Redis traffic.
+
+`MetricsMiddleware` opens a `RequestStats` for every HTTP request in a context
+variable. The SQLAlchemy cursor hooks (`app.db.session`) and the instrumented
+Redis clients (`app.core.redis`) add to it from wherever the request's work
+runs: the event loop, a threadpool thread or an async driver greenlet. When the
+response is sent, the totals are observed into histograms labelled with the
+route template (`/api/v1/rides/{ride_id}/status`, never the concrete path), so
+cardinality stays bounded.
+
+`GET /metrics` renders the registry. With several uvicorn workers, set
+PROMETHEUS_MULTIPROC_DIR so every worker's samples are aggregated.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+UNMATCHED_ROUTE = "unmatched"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+registry = CollectorRegistry(auto_describe=True)
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code.",
+    ("method", "route", "status"),
+    registry=registry,
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL statements per request.",
+    ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request.",
+    ("method", "route"),
+    buckets=COUNT_BUCKETS,
+    registry=registry,
+)
+REQUEST_REDIS_OPS = Histogram(
+    "http_request_redis_ops",
+    "Redis round trips (commands or pipelines) per request.",
+    ("method", "route"),
+    buckets=COUNT_BUCKETS,
+    registry=registry,
+)
+REQUEST_REDIS_TIME = Histogram(
+    "http_request_redis_seconds",
+    "Time spent waiting on Redis per request.",
+    ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being handled.",
+    multiprocess_mode="livesum",
+    registry=registry,
+)
+
+
+@dataclass
+class RequestStats:
+    """Database and Redis work attributed to the current request."""
+
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    redis_ops: int = 0
+    redis_seconds: float = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+def record_db_query(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += seconds
+
+
+def record_redis_op(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.redis_ops += 1
+        stats.redis_seconds += seconds
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing per-route latency, DB and Redis usage."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_PROGRESS.dec()
+            _current.reset(token)
+            # The router stores the matched route in the (shared) scope.
+            labels = (scope["method"], _route_template(scope))
+            REQUESTS.labels(*labels, str(status_code)).inc()
+            REQUEST_DURATION.labels(*labels).observe(elapsed)
+            REQUEST_DB_TIME.labels(*labels).observe(stats.db_seconds)
+            REQUEST_DB_QUERIES.labels(*labels).observe(stats.db_queries)
+            REQUEST_REDIS_OPS.labels(*labels).observe(stats.redis_ops)
+            REQUEST_REDIS_TIME.labels(*labels).observe(stats.redis_seconds)
+
+
+class StatsCollector:
+    """Exposes dict-returning stats callables (e.g. `pool_stats`) as metric families.
+
+    Every numeric key becomes `{namespace}_{key}` labelled with the source name;
+    keys ending in `_total` are exported as counters, the rest as gauges.
+    """
+
+    def __init__(self, namespace: str, sources: dict[str, Callable[[], dict[str, Any]]]):
+        self.namespace = namespace
+        self.sources = sources
+
+    def describe(self) -> list[Any]:
+        # Don't call the sources at registration time (they may create engines).
+        return []
+
+    def collect(self) -> Iterator[Any]:
+        families: dict[str, Any] = {}
+        for source_name, source in self.sources.items():
+            for key, value in source().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                family = families.get(key)
+                if family is None:
+                    name = f"{self.namespace}_{key}"
+                    documentation = f"{key.replace('_', ' ').capitalize()} ({self.namespace})."
+                    family_class = (
+                        CounterMetricFamily if key.endswith("_total") else GaugeMetricFamily
+                    )
+                    family = families[key] = family_class(name, documentation, labels=("pool",))
+                family.add_metric((source_name,), value)
+        yield from families.values()
+
+
+def render_latest() -> tuple[bytes, str]:
+    """The exposition body and its content type."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Only the file-backed metrics aggregate across workers; pool stats are per process.
+        aggregate = CollectorRegistry()
+        MultiProcessCollector(aggregate)
+        return generate_latest(aggregate), CONTENT_TYPE_LATEST
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,149 @@
+"""Dedicated process pool for bcrypt hashing and verification.
+
+bcrypt is deliberately slow (~100-300 ms of CPU per call). Running it on the
+threadpool that serves every sync endpoint lets a burst of logins starve ride
+endpoints, so hashing is sent to a separate, bounded process pool instead:
+
+* `PASSWORD_HASH_WORKERS` processes give real CPU parallelism without holding
+  the GIL in the API process (0 runs inline, e.g. for tests and scripts).
+* At most `PASSWORD_HASH_MAX_PENDING` calls may be queued or running; beyond
+  that callers get `PasswordHashingBusyError` immediately instead of piling up.
+* `stats()` exposes queue depth and counters for metrics.
+
+Both blocking (for sync callers) and awaitable entry points are provided; the
+auth endpoints await the latter so a login waiting on bcrypt holds neither the
+event loop nor a threadpool thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import security
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class PasswordHashingBusyError(RuntimeError):
+    """Raised when the hashing pool is saturated and cannot accept more work."""
+
+
+class PasswordHashingPool:
+    """Bounded process pool wrapper with backpressure and queue-depth metrics."""
+
+    def __init__(self, workers: int, max_pending: int, timeout_seconds: float) -> None:
+        self.workers = workers
+        self.max_pending = max(max_pending, workers, 1)
+        self.timeout_seconds = timeout_seconds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _submit(self, fn: Callable[..., T], *args: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHashingBusyError("Password hashing is busy; please retry shortly.")
+
+        with self._lock:
+            self._pending += 1
+
+        if self.workers <= 0:
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args))
+            except BaseException as exc:  # surfaced to the caller via the future
+                future.set_exception(exc)
+        else:
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BaseException:
+                self._release(None)
+                raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future: Optional[Future]) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+        self._slots.release()
+
+    def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run `fn(*args)` in the pool and block until it finishes."""
+        return self._submit(fn, *args).result(timeout=self.timeout_seconds)
+
+    async def run_async(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run `fn(*args)` in the pool without blocking the event loop."""
+        if self.workers <= 0:
+            # Inline mode would hash on the loop thread; use the threadpool instead.
+            return await run_in_threadpool(self.run, fn, *args)
+        future = asyncio.wrap_future(self._submit(fn, *args))
+        return await asyncio.wait_for(future, timeout=self.timeout_seconds)
+
+    def stats(self) -> dict[str, int]:
+        """Snapshot of pool usage for metrics."""
+        with self._lock:
+            pending = self._pending
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": pending,
+                "queue_depth": max(0, pending - max(self.workers, 1)),
+                "completed_total": self._completed,
+                "rejected_total": self._rejected,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordHashingPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    timeout_seconds=settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+)
+
+
+def hash_password(password: str) -> str:
+    """Hash a password in the hashing pool."""
+    return password_pool.run(security.get_password_hash, password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """Verify a password in the hashing pool; also returns a new hash if the cost changed."""
+    return password_pool.run(security.verify_and_update_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """Awaitable variant of `hash_password`."""
+    return await password_pool.run_async(security.get_password_hash, password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """Awaitable variant of `verify_and_update_password`."""
+    return await password_pool.run_async(
+        security.verify_and_update_password, plain_password, hashed_password
+    )
@@ -1,18 +1,83 @@
-"""Redis client utilities."""
+"""Redis client utilities.
 
+The shared clients are instrumented: every command, and every pipeline as a
+whole, counts as one round trip towards the current request's metrics.
+"""
+
+import time
 from functools import lru_cache
 
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.client import Pipeline as AsyncPipeline
+from redis.client import Pipeline
 
+from app.core import metrics
 from app.core.config import settings
 
 
+class InstrumentedPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            metrics.record_redis_op(time.perf_counter() - started)
+
+
+class InstrumentedRedis(Redis):
+    """Redis client that reports its round trips to `app.core.metrics`."""
+
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            metrics.record_redis_op(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class InstrumentedAsyncPipeline(AsyncPipeline):
+    async def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            metrics.record_redis_op(time.perf_counter() - started)
+
+
+class InstrumentedAsyncRedis(AsyncRedis):
+    """asyncio Redis client that reports its round trips to `app.core.metrics`."""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            metrics.record_redis_op(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> AsyncPipeline:
+        return InstrumentedAsyncPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
 @lru_cache(maxsize=1)
 def get_redis_client() -> Redis:
     """Get a cached Redis client instance."""
-    return Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return InstrumentedRedis.from_url(settings.REDIS_URL, decode_responses=True)
 
 
 def get_redis() -> Redis:
     """FastAPI-friendly dependency wrapper."""
     return get_redis_client()
+
+
+@lru_cache(maxsize=1)
+def get_async_redis_client() -> AsyncRedis:
+    """Get a cached asyncio Redis client (pub/sub for WebSocket fan-out)."""
+    return InstrumentedAsyncRedis.from_url(settings.REDIS_URL, decode_responses=True)
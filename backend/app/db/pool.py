@@ -0,0 +1,97 @@
+"""Connection pool instrumentation.
+
+`InstrumentedQueuePool` (sync engine) and `InstrumentedAsyncQueuePool` (async
+engine) are drop-in pools that record how long callers wait to check out a
+connection and how often they time out, so pool size and overflow can be tuned
+from real data. Current occupancy is read live from the pool itself.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolMetrics:
+    """Thread-safe checkout counters for one pool."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts_total = 0
+        self.checkout_timeouts_total = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+
+    def record(self, waited: float, *, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.checkout_timeouts_total += 1
+            else:
+                self.checkouts_total += 1
+            self.checkout_wait_seconds_total += waited
+            self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, waited)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts_total": self.checkouts_total,
+                "checkout_timeouts_total": self.checkout_timeouts_total,
+                "checkout_wait_seconds_total": round(self.checkout_wait_seconds_total, 6),
+                "checkout_wait_seconds_max": round(self.checkout_wait_seconds_max, 6),
+            }
+
+
+class _CheckoutTimingMixin:
+    """Times every checkout of a QueuePool subclass."""
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self) -> Any:
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started, timed_out=False)
+        return connection
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    """QueuePool that times every checkout."""
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that times every checkout."""
+
+
+def pool_stats(pool: Pool) -> dict[str, Any]:
+    """Occupancy and checkout metrics for `pool`."""
+    stats: dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+            }
+        )
+    metrics = getattr(pool, "metrics", None)
+    if isinstance(metrics, PoolMetrics):
+        stats.update(metrics.snapshot())
+    return stats
@@ -0,0 +1,232 @@
+"""Query budgets: statement counting, N+1 detection and slow-query plans.
+
+A `QueryRecorder` collects every SQL statement executed while it is active,
+through the cursor hooks every engine in `app.db.session` already has. It
+reports
+
+* how many statements ran,
+* statement shapes (SQL with literals and bind names normalised) executed
+  QUERY_REPEAT_THRESHOLD or more times, the signature of an N+1 loop, and
+* statements slower than SLOW_QUERY_MS, logged with their EXPLAIN plan.
+
+Two scopes:
+
+* `QueryRecorder(...)` as a context manager records statements from every
+  thread, which is what tests need (the test client runs the app in another
+  thread). Leaving the block raises `QueryBudgetExceeded` if the budget was
+  broken:
+
+      with QueryRecorder(max_queries=6):
+          client.patch(f"/api/v1/rides/{ride_id}/status", ...)
+
+  Tests get it as the `query_budget` fixture.
+
+* `QueryLogMiddleware` (enabled by QUERY_DEBUG) gives each request its own
+  recorder through a context variable and logs a one-line summary per
+  request, with the repeated shapes, so N+1s show up while clicking around.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy.engine import Connection
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_EXPLAINING = "query_budget_explaining"
+_EXPLAINABLE = ("select", "with", "update", "delete", "insert")
+
+_BIND = re.compile(r"%\(\w+\)s|\$\d+|:\w+|\?|%s")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalise `statement` so executions that differ only in values compare equal."""
+    shape = _STRING.sub("?", statement)
+    shape = _BIND.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class RecordedQuery:
+    statement: str
+    seconds: float
+
+    @property
+    def shape(self) -> str:
+        return statement_shape(self.statement)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a recorded block ran too many statements or an N+1 pattern."""
+
+
+class QueryRecorder:
+    """Collects the statements executed while active (see module docstring).
+
+    Args:
+        max_queries: Fail if more statements than this run (None = no limit).
+        repeat_threshold: Executions of one shape that count as N+1.
+        allow_repeats: Only report repeated shapes instead of failing.
+        slow_ms: Log statements slower than this with their EXPLAIN plan.
+        label: Names the block in messages (e.g. "PATCH /rides/{ride_id}/status").
+    """
+
+    def __init__(
+        self,
+        max_queries: Optional[int] = None,
+        *,
+        repeat_threshold: Optional[int] = None,
+        allow_repeats: bool = False,
+        slow_ms: Optional[float] = None,
+        label: str = "block",
+    ):
+        self.max_queries = max_queries
+        self.repeat_threshold = repeat_threshold or settings.QUERY_REPEAT_THRESHOLD
+        self.allow_repeats = allow_repeats
+        self.slow_ms = settings.SLOW_QUERY_MS if slow_ms is None else slow_ms
+        self.label = label
+        self.queries: list[RecordedQuery] = []
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def repeated(self) -> dict[str, int]:
+        """Shapes executed at least `repeat_threshold` times, with their counts."""
+        counts = Counter(query.shape for query in self.queries)
+        return {shape: n for shape, n in counts.items() if n >= self.repeat_threshold}
+
+    def record(
+        self, conn: Connection, statement: str, parameters: Any, seconds: float, executemany: bool
+    ) -> None:
+        with self._lock:
+            self.queries.append(RecordedQuery(statement, seconds))
+        if seconds * 1000 >= self.slow_ms:
+            plan = None if executemany else explain(conn, statement, parameters)
+            logger.warning(
+                "Slow query (%.1f ms) in %s: %s%s",
+                seconds * 1000,
+                self.label,
+                _SPACE.sub(" ", statement),
+                f"\n{plan}" if plan else "",
+            )
+
+    def problems(self) -> list[str]:
+        problems = []
+        if self.max_queries is not None and self.count > self.max_queries:
+            problems.append(f"{self.count} statements (budget {self.max_queries})")
+        if not self.allow_repeats:
+            problems.extend(f"N+1: {n}x {shape}" for shape, n in sorted(self.repeated().items()))
+        return problems
+
+    def report(self) -> str:
+        lines = [f"{self.label}: {self.count} statements"]
+        lines.extend(f"  {query.seconds * 1000:7.1f} ms  {query.shape}" for query in self.queries)
+        return "\n".join(lines)
+
+    def __enter__(self) -> "QueryRecorder":
+        with _global_lock:
+            _global_recorders.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        with _global_lock:
+            _global_recorders.remove(self)
+        if exc_type is None:
+            problems = self.problems()
+            if problems:
+                raise QueryBudgetExceeded(
+                    f"Query budget exceeded in {self.label}: "
+                    + "; ".join(problems)
+                    + "\n"
+                    + self.report()
+                )
+
+
+_global_lock = threading.Lock()
+_global_recorders: list[QueryRecorder] = []
+_request_recorder: ContextVar[Optional[QueryRecorder]] = ContextVar("query_recorder", default=None)
+
+
+def record_query(
+    conn: Connection, statement: str, parameters: Any, seconds: float, executemany: bool
+) -> None:
+    """Cursor hook: hand a finished statement to every active recorder."""
+    if conn.info.get(_EXPLAINING):
+        return
+    recorders = list(_global_recorders)
+    request_recorder = _request_recorder.get()
+    if request_recorder is not None:
+        recorders.append(request_recorder)
+    for recorder in recorders:
+        recorder.record(conn, statement, parameters, seconds, executemany)
+
+
+def explain(conn: Connection, statement: str, parameters: Any) -> Optional[str]:
+    """EXPLAIN plan of `statement` (without executing it), or None if unsupported.
+
+    The plan is taken on a separate connection so the caller's transaction and
+    its pending cursor are left alone.
+    """
+    if not statement.lstrip().lower().startswith(_EXPLAINABLE):
+        return None
+    prefix = {"postgresql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN "}.get(conn.dialect.name)
+    if prefix is None:
+        return None
+    try:
+        with conn.engine.connect() as other:
+            other.info[_EXPLAINING] = True
+            rows = other.exec_driver_sql(prefix + statement, parameters).all()
+    except Exception as exc:  # diagnostics only; never break the request
+        return f"(EXPLAIN failed: {exc})"
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+class QueryLogMiddleware:
+    """ASGI middleware (QUERY_DEBUG) logging each request's statement summary."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recorder = QueryRecorder(label=f"{scope['method']} {scope['path']}")
+        token = _request_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_recorder.reset(token)
+            route = getattr(scope.get("route"), "path", scope["path"])
+            repeated = recorder.repeated()
+            log = logger.warning if repeated else logger.info
+            log(
+                "%s %s: %d statements, %.1f ms DB, %.1f ms total%s",
+                scope["method"],
+                route,
+                recorder.count,
+                sum(query.seconds for query in recorder.queries) * 1000,
+                (time.perf_counter() - started) * 1000,
+                "".join(f"\n  N+1: {n}x {shape}" for shape, n in repeated.items()),
+            )
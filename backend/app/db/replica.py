@@ -0,0 +1,147 @@
+"""Read-replica routing decisions.
+
+A request may read from the replica only when all of these hold:
+
+* a replica is configured (`DATABASE_READ_URL`),
+* the caller has not written recently (read-your-writes stickiness: every
+  successful mutating request marks the user in Redis for
+  `READ_YOUR_WRITES_SECONDS`, so their next reads see their own changes), and
+* the replica's replay lag is known and below `READ_REPLICA_MAX_LAG_SECONDS`.
+
+The lag is probed at most every `READ_REPLICA_LAG_CHECK_SECONDS` per process.
+Any failure (Redis down, replica unreachable) routes to the primary.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Optional
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.core.redis import get_async_redis_client, get_redis_client
+from app.db.session import get_async_read_engine, read_engine
+
+logger = logging.getLogger(__name__)
+
+STICKY_PREFIX = "read_your_writes"
+
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def _get_redis() -> Redis:
+    return get_redis_client()
+
+
+def _get_async_redis() -> AsyncRedis:
+    return get_async_redis_client()
+
+
+def replica_configured() -> bool:
+    return bool(settings.DATABASE_READ_URL)
+
+
+def _sticky_key(user_id: int) -> str:
+    return f"{STICKY_PREFIX}:{user_id}"
+
+
+class _LagProbe:
+    """Per-process cache of the last measured replica lag."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._lag: Optional[float] = None
+
+    def cached(self) -> tuple[bool, Optional[float]]:
+        """Return (fresh, lag); `fresh` is False when a new probe is due."""
+        with self._lock:
+            fresh = time.monotonic() - self._checked_at < settings.READ_REPLICA_LAG_CHECK_SECONDS
+            return fresh, self._lag
+
+    def store(self, lag: Optional[float]) -> Optional[float]:
+        with self._lock:
+            self._checked_at = time.monotonic()
+            self._lag = lag
+        return lag
+
+
+_lag_probe = _LagProbe()
+
+
+def replica_lag_seconds() -> Optional[float]:
+    """Replica replay lag in seconds, or None if it could not be measured."""
+    fresh, lag = _lag_probe.cached()
+    if fresh:
+        return lag
+    try:
+        with read_engine.connect() as conn:
+            lag = float(conn.execute(REPLICA_LAG_SQL).scalar() or 0.0)
+    except SQLAlchemyError:
+        logger.warning("Read replica lag check failed; routing reads to the primary")
+        lag = None
+    return _lag_probe.store(lag)
+
+
+async def replica_lag_seconds_async() -> Optional[float]:
+    """Awaitable variant of `replica_lag_seconds`."""
+    fresh, lag = _lag_probe.cached()
+    if fresh:
+        return lag
+    try:
+        async with get_async_read_engine().connect() as conn:
+            lag = float((await conn.execute(REPLICA_LAG_SQL)).scalar() or 0.0)
+    except SQLAlchemyError:
+        logger.warning("Read replica lag check failed; routing reads to the primary")
+        lag = None
+    return _lag_probe.store(lag)
+
+
+def _lag_ok(lag: Optional[float]) -> bool:
+    return lag is not None and lag <= settings.READ_REPLICA_MAX_LAG_SECONDS
+
+
+def mark_user_wrote(user_id: int) -> None:
+    """Pin `user_id`'s reads to the primary for READ_YOUR_WRITES_SECONDS."""
+    if not replica_configured():
+        return
+    try:
+        _get_redis().setex(_sticky_key(user_id), settings.READ_YOUR_WRITES_SECONDS, 1)
+    except RedisError:
+        logger.warning("Could not record read-your-writes marker for user %s", user_id)
+
+
+def use_replica(user_id: Optional[int]) -> bool:
+    """Whether this request's reads may be served by the replica."""
+    if not replica_configured():
+        return False
+    if user_id is not None:
+        try:
+            if _get_redis().exists(_sticky_key(user_id)):
+                return False
+        except RedisError:
+            return False
+    return _lag_ok(replica_lag_seconds())
+
+
+async def use_replica_async(user_id: Optional[int]) -> bool:
+    """Awaitable variant of `use_replica`."""
+    if not replica_configured():
+        return False
+    if user_id is not None:
+        try:
+            if await _get_async_redis().exists(_sticky_key(user_id)):
+                return False
+        except RedisError:
+            return False
+    return _lag_ok(await replica_lag_seconds_async())
@@ -1,17 +1,192 @@
-"""Database session management."""
+"""Database session management.
 
-from sqlalchemy import create_engine
+The API historically used the sync `SessionLocal`/`get_db`, and most endpoints
+still do. Hot read paths use the async stack (`get_async_db`, asyncpg) so
+waiting on Postgres does not tie up a threadpool thread.
+
+When `DATABASE_READ_URL` is set, `read_engine`/`ReadSessionLocal` (and the
+async read engine) point at a streaming replica; otherwise they are the
+primary. Endpoints reach them through `app.api.deps.db.get_read_db`, which
+decides per request whether the replica may be used.
+"""
+
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
+from app.core import metrics
 from app.core.config import settings
+from app.db import query_budget
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def engine_options(database_url: str, *, use_async: bool = False) -> dict[str, Any]:
+    """Pool and connection options for `create_engine`, driven by Settings."""
+    backend = make_url(database_url).get_backend_name()
+    is_postgres = backend == "postgresql"
+
+    if is_postgres and settings.DB_PGBOUNCER and settings.DB_PGBOUNCER_NULL_POOL:
+        # PgBouncer already pools server connections; don't hold a second pool here.
+        options: dict[str, Any] = {"poolclass": NullPool}
+    elif use_async and not is_postgres:
+        options = {"poolclass": NullPool}
+    else:
+        options = {
+            "poolclass": InstrumentedAsyncQueuePool if use_async else InstrumentedQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+            "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        }
+    options["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+
+    if is_postgres:
+        # Session-level settings are startup parameters, which PgBouncer (transaction
+        # mode) rejects; there the timeout is applied per transaction instead.
+        session_settings = not settings.DB_PGBOUNCER
+        if use_async:
+            connect_args: dict[str, Any] = {}
+            if session_settings:
+                server_settings = {"application_name": settings.DB_APPLICATION_NAME}
+                if settings.DB_STATEMENT_TIMEOUT_MS:
+                    server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+                connect_args["server_settings"] = server_settings
+            else:
+                # Prepared statements don't survive PgBouncer handing us another backend.
+                connect_args["statement_cache_size"] = 0
+                connect_args["prepared_statement_cache_size"] = 0
+        else:
+            connect_args = {"application_name": settings.DB_APPLICATION_NAME}
+            if session_settings and settings.DB_STATEMENT_TIMEOUT_MS:
+                connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        options["connect_args"] = connect_args
+    return options
+
+
+def async_database_url(database_url: str) -> URL:
+    """Return `database_url` with its async driver (asyncpg / aiosqlite)."""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=driver) if driver else url
+
+
+def _apply_transaction_statement_timeout(sync_engine) -> None:
+    """Apply the statement timeout per transaction (PgBouncer-safe)."""
+
+    @event.listens_for(sync_engine, "begin")
+    def _set_transaction_statement_timeout(conn) -> None:
+        conn.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}"
+        )
+
+
+def _needs_transaction_statement_timeout(dialect_name: str) -> bool:
+    return (
+        dialect_name == "postgresql"
+        and settings.DB_PGBOUNCER
+        and bool(settings.DB_STATEMENT_TIMEOUT_MS)
+    )
+
+
+def _instrument_queries(sync_engine) -> None:
+    """Attribute every statement's count and duration to the current request.
+
+    Statements are also handed to any active `app.db.query_budget` recorder.
+    """
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany) -> None:
+        seconds = time.perf_counter() - conn.info["query_started_at"].pop()
+        metrics.record_db_query(seconds)
+        query_budget.record_query(conn, statement, parameters, seconds, executemany)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _discard_query_timer(exception_context) -> None:
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+if _needs_transaction_statement_timeout(engine.dialect.name):
+    _apply_transaction_statement_timeout(engine)
+_instrument_queries(engine)
 
-engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if settings.DATABASE_READ_URL:
+    read_engine = create_engine(
+        settings.DATABASE_READ_URL, **engine_options(settings.DATABASE_READ_URL)
+    )
+    if _needs_transaction_statement_timeout(read_engine.dialect.name):
+        _apply_transaction_statement_timeout(read_engine)
+    _instrument_queries(read_engine)
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 
+def _create_async_engine(database_url: str) -> AsyncEngine:
+    async_engine = create_async_engine(
+        async_database_url(database_url), **engine_options(database_url, use_async=True)
+    )
+    if _needs_transaction_statement_timeout(async_engine.dialect.name):
+        _apply_transaction_statement_timeout(async_engine.sync_engine)
+    _instrument_queries(async_engine.sync_engine)
+    return async_engine
+
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    """Create (once per process) the async engine for the hot API paths."""
+    return _create_async_engine(settings.ASYNC_DATABASE_URL or settings.DATABASE_URL)
+
+
+@lru_cache(maxsize=1)
+def get_async_read_engine() -> AsyncEngine:
+    """Async engine for the read replica (the primary when none is configured)."""
+    if not settings.DATABASE_READ_URL:
+        return get_async_engine()
+    return _create_async_engine(settings.DATABASE_READ_URL)
+
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+@lru_cache(maxsize=1)
+def get_async_read_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(get_async_read_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def dispose_async_engines() -> None:
+    """Close the async engines' pooled connections (they belong to the running loop)."""
+    for create in (get_async_read_engine, get_async_engine):
+        if create.cache_info().currsize:
+            await create().dispose()
+
+
 def get_db():
     """Dependency to get database session."""
     db = SessionLocal()
@@ -19,3 +194,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency to get an async database session."""
+    async with get_async_sessionmaker()() as db:
+        yield db
@@ -1,10 +1,37 @@
 """Main FastAPI application entry point."""
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.endpoints import auth, donations, drivers, parishes, rides, users
+from app.api.deps.auth import get_current_admin_user
+from app.api.deps.db import request_user_id
+from app.api.endpoints import auth, donations, drivers, events, parishes, rides, users
+from app.core import metrics
 from app.core.config import settings
+from app.core.password_pool import password_pool
+from app.db import query_budget, replica
+from app.db.pool import pool_stats
+from app.db.session import (
+    dispose_async_engines,
+    engine,
+    get_async_engine,
+    get_async_read_engine,
+    read_engine,
+)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Application startup/shutdown hooks."""
+    yield
+    # asyncpg connections are tied to this event loop; close them with it.
+    await dispose_async_engines()
+    # Stop the bcrypt worker processes.
+    password_pool.shutdown()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -14,6 +41,7 @@
         "Mass, Confession, and Church events"
     ),
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -23,8 +51,44 @@
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+if settings.QUERY_DEBUG:
+    app.add_middleware(query_budget.QueryLogMiddleware)
+# Outermost, so the timing covers every other middleware too.
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+database_pools = {
+    "primary": lambda: pool_stats(engine.pool),
+    "primary_async": lambda: pool_stats(get_async_engine().pool),
+}
+if read_engine is not engine:
+    database_pools["replica"] = lambda: pool_stats(read_engine.pool)
+    database_pools["replica_async"] = lambda: pool_stats(get_async_read_engine().pool)
+metrics.registry.register(metrics.StatsCollector("db_pool", database_pools))
+metrics.registry.register(
+    metrics.StatsCollector("password_hashing", {"bcrypt": password_pool.stats})
 )
 
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """Pin a user's reads to the primary for a short while after they write."""
+    response = await call_next(request)
+    if (
+        replica.replica_configured()
+        and request.method not in READ_ONLY_METHODS
+        and response.status_code < 400
+    ):
+        user_id = request_user_id(request)
+        if user_id is not None:
+            await run_in_threadpool(replica.mark_user_wrote, user_id)
+    return response
+
+
 # Include routers
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["authentication"])
 app.include_router(users.router, prefix=f"{settings.API_V1_STR}/users", tags=["users"])
@@ -32,6 +96,7 @@
 app.include_router(drivers.router, prefix=f"{settings.API_V1_STR}/drivers", tags=["drivers"])
 app.include_router(parishes.router, prefix=f"{settings.API_V1_STR}/parishes", tags=["parishes"])
 app.include_router(donations.router, prefix=settings.API_V1_STR, tags=["donations"])
+app.include_router(events.router, prefix=f"{settings.API_V1_STR}/events", tags=["events"])
 
 
 @app.get("/")
@@ -44,3 +109,19 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get("/health/pools", dependencies=[Depends(get_current_admin_user)])
+def pool_health():
+    """Connection pool and password-hashing pool occupancy of this process (admins only)."""
+    return {
+        "database": {name: stats() for name, stats in database_pools.items()},
+        "password_hashing": password_pool.stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (not routed through nginx)."""
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
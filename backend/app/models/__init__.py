@@ -4,6 +4,7 @@
 from app.models.driver_profile import DriverProfile
 from app.models.parish import Parish
 from app.models.ride import Ride
+from app.models.ride_offer import RideOffer
 from app.models.ride_request import RideRequest
 from app.models.ride_review import RideReview
 from app.models.user import User
@@ -14,6 +15,7 @@
     "Parish",
     "RideRequest",
     "Ride",
+    "RideOffer",
     "Donation",
     "RideReview",
 ]
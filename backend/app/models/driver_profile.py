@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import relationship
 
 from app.db.session import Base
@@ -31,8 +31,10 @@ class DriverProfile(Base):
     # Status
     is_available = Column(Boolean, default=False, nullable=False)
 
-    # Stats
+    # Stats, maintained incrementally by app.services.driver_stats
     total_rides = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_count = Column(Integer, default=0, server_default="0", nullable=False)
     average_rating = Column(Float, default=0.0, nullable=False)
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -40,3 +42,13 @@ class DriverProfile(Base):
 
     # Relationships
     user = relationship("User", back_populates="driver_profile")
+
+    __table_args__ = (
+        # Only available drivers are ever searched; keep the index to just those rows.
+        Index(
+            "ix_driver_profiles_available",
+            "user_id",
+            "vehicle_capacity",
+            postgresql_where=text("is_available"),
+        ),
+    )
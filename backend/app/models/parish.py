@@ -3,7 +3,7 @@
 from datetime import datetime
 
 from geoalchemy2 import Geography
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import DDL, Column, DateTime, Index, Integer, String, event
 
 from app.db.session import Base
 
@@ -37,3 +37,28 @@ class Parish(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # pg_trgm indexes serve similarity search and ILIKE '%q%' / 'q%' lookups.
+        Index(
+            "ix_parishes_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_parishes_city_trgm",
+            "city",
+            postgresql_using="gin",
+            postgresql_ops={"city": "gin_trgm_ops"},
+        ),
+    )
+
+
+# The trigram indexes (and parish_search's `<%` / word_similarity) need pg_trgm. Alembic
+# migration 0008 creates it; this covers schemas built with `metadata.create_all` (tests).
+event.listen(
+    Parish.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
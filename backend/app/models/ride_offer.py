@@ -0,0 +1,47 @@
+"""Ride offer model."""
+
+from __future__ import annotations
+
+import enum
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Enum, Float, ForeignKey, Index, Integer, UniqueConstraint
+
+from app.db.session import Base
+
+
+class RideOfferStatus(str, enum.Enum):
+    """Ride offer status enum."""
+
+    PENDING = "pending"
+    ACCEPTED = "accepted"
+    DECLINED = "declined"
+    EXPIRED = "expired"
+
+
+class RideOffer(Base):
+    """Time-boxed offer of a pending ride request to a matched driver."""
+
+    __tablename__ = "ride_offers"
+
+    id = Column(Integer, primary_key=True, index=True)
+    ride_request_id = Column(Integer, ForeignKey("ride_requests.id"), nullable=False, index=True)
+    driver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    # Matching score at the time the offer was issued (higher is better).
+    score = Column(Float, nullable=False)
+
+    status = Column(
+        Enum("pending", "accepted", "declined", "expired", name="rideofferstatus"),
+        default="pending",
+        nullable=False,
+    )
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    responded_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("ride_request_id", "driver_id", name="uq_ride_offers_request_driver"),
+        Index("idx_driver_offers", "driver_id", "status", "expires_at"),
+    )
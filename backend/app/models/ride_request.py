@@ -4,7 +4,7 @@
 from datetime import datetime
 
 from geoalchemy2 import Geography
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, Text
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, Text, text
 
 from app.db.session import Base
 
@@ -66,3 +66,19 @@ class RideRequest(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Partial indexes backing the driver-facing open ride feed (/rides/open).
+        Index(
+            "ix_ride_requests_pending_pickup",
+            "pickup_location",
+            postgresql_using="gist",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        Index(
+            "ix_ride_requests_pending_requested",
+            "requested_datetime",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
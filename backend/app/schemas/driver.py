@@ -0,0 +1,24 @@
+"""Driver discovery schemas."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class AvailableDriverResponse(BaseModel):
+    """A nearby available driver (exact location is never exposed)."""
+
+    user_id: int
+    first_name: str
+    profile_photo_url: Optional[str] = None
+    vehicle_make: Optional[str] = None
+    vehicle_model: Optional[str] = None
+    vehicle_color: Optional[str] = None
+    vehicle_capacity: int
+    average_rating: float
+    total_rides: int
+    distance_miles: float
+    last_location_updated_at: datetime
@@ -23,6 +23,16 @@ class ParishResponse(BaseModel):
     website: Optional[str] = None
     created_at: datetime
     updated_at: datetime
+    distance_miles: Optional[float] = None
 
     class Config:
         from_attributes = True
+
+
+class ParishSuggestion(BaseModel):
+    """Lightweight parish match for search-as-you-type."""
+
+    id: int
+    name: str
+    city: str
+    state: str
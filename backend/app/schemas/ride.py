@@ -2,12 +2,14 @@
 
 from __future__ import annotations
 
+import enum
 from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, Field
 
 from app.models.ride import RideStatus
+from app.models.ride_offer import RideOfferStatus
 from app.models.ride_request import DestinationType, RideRequestStatus
 from app.schemas.donation import DonationIntentResponse
 
@@ -19,6 +21,24 @@ class Location(BaseModel):
     longitude: float = Field(..., ge=-180, le=180)
 
 
+class LocationSample(Location):
+    """A single GPS sample reported by the driver app."""
+
+    recorded_at: Optional[datetime] = None
+
+
+class RideLocationBatch(BaseModel):
+    """Batch of GPS samples streamed by the driver during a ride."""
+
+    samples: list[LocationSample] = Field(..., min_length=1, max_length=100)
+
+
+class RideLocationBatchResponse(BaseModel):
+    """Acknowledgement for an ingested location batch."""
+
+    accepted: int
+
+
 class RideRequestCreate(BaseModel):
     """Payload to create a ride request."""
 
@@ -31,11 +51,19 @@ class RideRequestCreate(BaseModel):
     passenger_count: int = Field(default=1, ge=1, le=6)
 
 
+class OpenRideOrder(str, enum.Enum):
+    """Sort orders supported by the driver-facing open ride feed."""
+
+    DISTANCE = "distance"
+    REQUESTED_DATETIME = "requested_datetime"
+
+
 class RideRequestResponse(BaseModel):
     """Ride request response payload."""
 
     id: int
     ride_id: Optional[int] = None
+    distance_miles: Optional[float] = None
     rider_id: int
     destination_type: DestinationType
     parish_id: Optional[int]
@@ -59,6 +87,8 @@ class RideAcceptResponse(BaseModel):
     rider_id: int
     status: RideStatus
     accepted_at: datetime
+    # Auto-donations are created asynchronously after completion; fetch them from
+    # GET /rides/{ride_id}/donation-intent. Kept for client compatibility.
     auto_donation_intent: Optional[DonationIntentResponse] = None
 
     class Config:
@@ -69,3 +99,18 @@ class RideStatusUpdate(BaseModel):
     """Payload for updating an in-flight ride status."""
 
     status: RideStatus
+
+
+class RideOfferResponse(BaseModel):
+    """A time-boxed ride offer issued to a driver by the matching engine."""
+
+    id: int
+    ride_request_id: int
+    score: float
+    status: RideOfferStatus
+    created_at: datetime
+    expires_at: datetime
+    ride_request: RideRequestResponse
+
+    class Config:
+        from_attributes = True
@@ -41,6 +41,15 @@ class UserLocationUpdate(BaseModel):
     longitude: float = Field(ge=-180, le=180)
 
 
+class UserLocationResponse(BaseModel):
+    """The location just recorded for the current user."""
+
+    id: int
+    latitude: float
+    longitude: float
+    updated_at: datetime
+
+
 class UserResponse(UserBase):
     """User response schema."""
 
@@ -0,0 +1,482 @@
+"""Generate production-sized synthetic data for query-plan and index tuning.
+
+Unlike `seed_demo`, which creates a handful of rows through the ORM, this
+streams millions of rows straight into the tables: with PostgreSQL's COPY when
+the driver is psycopg2, otherwise with multi-row INSERT batches. Primary keys
+are allocated up front (after the current maximum), so rows reference each
+other without round trips, and sequences are moved past them at the end.
+
+The data is geographically clustered: parishes sit around a few metro areas,
+every user lives within a few miles of a home parish, and rides go from the
+rider's home to that parish. Ride, review and donation volumes follow
+`ScaleConfig`, and driver rating/ride aggregates match what
+`driver_stats.reconcile_driver_stats` would compute.
+
+Examples:
+
+    python -m app.seed_scale --riders 1000000 --drivers 100000 \\
+        --parishes 5000 --ride-requests 3000000
+    python -m app.seed_scale --riders 10000 --drivers 2000 --parishes 500
+
+Every account's password is `Password123!`, as in the demo seed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import Table, func, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.security import get_password_hash
+from app.db.session import engine as default_engine
+from app.models.donation import Donation
+from app.models.driver_profile import DriverProfile
+from app.models.parish import Parish
+from app.models.ride import Ride
+from app.models.ride_request import RideRequest
+from app.models.ride_review import RideReview
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+PASSWORD = "Password123!"
+# (latitude, longitude, relative weight)
+METROS = (
+    (40.7128, -74.0060, 8),
+    (41.8781, -87.6298, 6),
+    (34.0522, -118.2437, 6),
+    (29.7604, -95.3698, 4),
+    (37.7749, -122.4194, 4),
+    (42.3601, -71.0589, 4),
+    (39.9526, -75.1652, 3),
+    (38.6270, -90.1994, 2),
+    (39.7817, -89.6501, 1),
+)
+PARISH_SPREAD_MILES = 15.0
+HOME_SPREAD_MILES = 3.0
+DESTINATION_WEIGHTS = {"mass": 70, "confession": 10, "prayer_event": 10, "social": 7, "other": 3}
+RATING_WEIGHTS = (1, 2, 5, 20, 72)  # 1..5 stars
+DONATION_AMOUNTS_CENTS = (500, 1000, 1500, 2000, 2500, 5000)
+VEHICLES = (
+    ("Toyota", "Sienna"),
+    ("Honda", "Odyssey"),
+    ("Ford", "Explorer"),
+    ("Chevrolet", "Malibu"),
+    ("Subaru", "Outback"),
+)
+COLORS = ("White", "Black", "Silver", "Blue", "Red", "Gray")
+
+
+@dataclass
+class ScaleConfig:
+    """How much data to generate."""
+
+    parishes: int = 500
+    riders: int = 10_000
+    drivers: int = 2_000
+    ride_requests: int = 50_000
+    # Fraction of completed rides that get a review / a donation.
+    review_rate: float = 0.6
+    donation_rate: float = 0.3
+    # Ride requests are spread over this many past days (plus a week ahead).
+    days: int = 365
+    email_prefix: str = "synthetic"
+    seed: int = 1
+    batch_size: int = 10_000
+
+
+@dataclass
+class SeedSummary:
+    """Rows written per table and the parish coordinates (lat, lon) used."""
+
+    rows: dict[str, int] = field(default_factory=dict)
+    parish_locations: list[tuple[float, float]] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def _ewkt(lat: float, lon: float) -> str:
+    return f"SRID=4326;POINT({lon:.6f} {lat:.6f})"
+
+
+def _jitter(rng: random.Random, lat: float, lon: float, miles: float) -> tuple[float, float]:
+    """A point normally distributed around (lat, lon) with `miles` standard deviation."""
+    return (
+        lat + rng.gauss(0, miles) / 69.0,
+        lon + rng.gauss(0, miles) / (69.0 * math.cos(math.radians(lat))),
+    )
+
+
+class _TableWriter:
+    """Buffers rows for one table and writes them with COPY or INSERT batches."""
+
+    def __init__(self, conn: Connection, table: Table, columns: Sequence[str], batch_size: int):
+        self.conn = conn
+        self.table = table
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.rows: list[tuple[Any, ...]] = []
+        self.written = 0
+        cursor = conn.connection.dbapi_connection.cursor()
+        self._copy = conn.dialect.name == "postgresql" and hasattr(cursor, "copy_expert")
+        cursor.close()
+
+    def add(self, *row: Any) -> None:
+        self.rows.append(row)
+
+    @property
+    def full(self) -> bool:
+        return len(self.rows) >= self.batch_size
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        if self._copy:
+            buffer = io.StringIO()
+            # In CSV format an unquoted empty field is NULL.
+            csv.writer(buffer).writerows(
+                tuple("" if value is None else value for value in row) for row in self.rows
+            )
+            buffer.seek(0)
+            cursor = self.conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {self.table.name} ({', '.join(self.columns)}) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+            finally:
+                cursor.close()
+        else:
+            self.conn.execute(
+                self.table.insert(), [dict(zip(self.columns, row)) for row in self.rows]
+            )
+        self.written += len(self.rows)
+        self.rows.clear()
+
+
+def _next_id(conn: Connection, table: Table) -> int:
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def _reset_sequence(conn: Connection, table: Table) -> None:
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"(SELECT max(id) FROM {table.name}))"
+            )
+        )
+
+
+def generate(config: ScaleConfig, bind: Optional[Engine] = None) -> SeedSummary:
+    """Write the configured volume of synthetic rows in one transaction."""
+    started = time.perf_counter()
+    rng = random.Random(config.seed)
+    now = datetime.utcnow()
+    password_hash = get_password_hash(PASSWORD)
+    summary = SeedSummary()
+    bind = bind or default_engine
+
+    with bind.begin() as conn:
+
+        def writer(model: Any, columns: Sequence[str]) -> _TableWriter:
+            return _TableWriter(conn, model.__table__, columns, config.batch_size)
+
+        # Parishes, clustered around the metros.
+        parish_writer = writer(
+            Parish,
+            ("id", "name", "address_line1", "city", "state", "zip_code", "location")
+            + ("created_at", "updated_at"),
+        )
+        parish_id = _next_id(conn, Parish.__table__)
+        parish_ids: list[int] = []
+        metro_weights = [weight for _, _, weight in METROS]
+        for i in range(config.parishes):
+            metro = rng.choices(range(len(METROS)), weights=metro_weights)[0]
+            lat, lon = _jitter(rng, METROS[metro][0], METROS[metro][1], PARISH_SPREAD_MILES)
+            parish_writer.add(
+                parish_id + i,
+                f"Synthetic Parish {parish_id + i}",
+                f"{rng.randint(1, 9999)} Church St",
+                f"Metro {metro + 1}",
+                "IL",
+                f"{rng.randint(10000, 99999)}",
+                _ewkt(lat, lon),
+                now,
+                now,
+            )
+            parish_ids.append(parish_id + i)
+            summary.parish_locations.append((lat, lon))
+            if parish_writer.full:
+                parish_writer.flush()
+        parish_writer.flush()
+
+        # Users: riders, then drivers, each living near a home parish.
+        user_writer = writer(
+            User,
+            ("id", "email", "password_hash", "first_name", "last_name", "role", "parish_id")
+            + ("auto_donation_enabled", "auto_donation_type", "auto_donation_amount_cents")
+            + ("is_active", "is_verified", "last_known_location", "last_location_updated_at")
+            + ("created_at", "updated_at"),
+        )
+        first_user_id = _next_id(conn, User.__table__)
+        # Per rider: (home lat, home lon, index of home parish)
+        rider_homes: list[tuple[float, float, int]] = []
+        drivers_by_parish: dict[int, list[int]] = {}
+        driver_ids: list[int] = []
+        for i in range(config.riders + config.drivers):
+            user_id = first_user_id + i
+            is_driver = i >= config.riders
+            role = "driver" if is_driver else "rider"
+            parish_index = rng.randrange(config.parishes)
+            lat, lon = _jitter(rng, *summary.parish_locations[parish_index], HOME_SPREAD_MILES)
+            auto_donate = not is_driver and rng.random() < 0.1
+            created_at = now - timedelta(days=rng.uniform(config.days, config.days * 2))
+            user_writer.add(
+                user_id,
+                f"{config.email_prefix}.{role}.{user_id}@example.com",
+                password_hash,
+                "Synthetic",
+                role.title(),
+                role,
+                parish_ids[parish_index],
+                auto_donate,
+                "fixed",
+                1000 if auto_donate else None,
+                True,
+                True,
+                _ewkt(lat, lon) if is_driver else None,
+                now - timedelta(minutes=rng.uniform(0, 600)) if is_driver else None,
+                created_at,
+                created_at,
+            )
+            if is_driver:
+                driver_ids.append(user_id)
+                drivers_by_parish.setdefault(parish_index, []).append(user_id)
+            else:
+                rider_homes.append((lat, lon, parish_index))
+            if user_writer.full:
+                user_writer.flush()
+        user_writer.flush()
+
+        # Requests, rides, reviews and donations; flushed together in FK order.
+        request_writer = writer(
+            RideRequest,
+            ("id", "rider_id", "destination_type", "parish_id", "pickup_location")
+            + ("destination_location", "requested_datetime", "passenger_count", "status")
+            + ("created_at", "updated_at"),
+        )
+        ride_writer = writer(
+            Ride,
+            ("id", "ride_request_id", "driver_id", "rider_id", "accepted_at", "pickup_time")
+            + ("dropoff_time", "actual_pickup_location", "actual_dropoff_location", "status")
+            + ("created_at", "completed_at"),
+        )
+        review_writer = writer(
+            RideReview,
+            ("id", "ride_id", "reviewer_id", "reviewee_id", "rating", "comment", "created_at"),
+        )
+        donation_writer = writer(
+            Donation,
+            ("id", "ride_id", "donor_id", "recipient_id", "amount_cents", "currency")
+            + ("stripe_payment_intent_id", "stripe_status", "stripe_fee_cents")
+            + ("net_amount_cents", "created_at", "completed_at"),
+        )
+        chain = (request_writer, ride_writer, review_writer, donation_writer)
+
+        request_id = _next_id(conn, RideRequest.__table__)
+        ride_id = _next_id(conn, Ride.__table__)
+        review_id = _next_id(conn, RideReview.__table__)
+        donation_id = _next_id(conn, Donation.__table__)
+        destination_types = list(DESTINATION_WEIGHTS)
+        destination_weights = list(DESTINATION_WEIGHTS.values())
+        # driver id -> [completed rides, rating sum, rating count]
+        driver_totals: dict[int, list[int]] = {}
+
+        for _ in range(config.ride_requests if rider_homes else 0):
+            rider_index = rng.randrange(len(rider_homes))
+            rider_id = first_user_id + rider_index
+            home_lat, home_lon, parish_index = rider_homes[rider_index]
+            parish_lat, parish_lon = summary.parish_locations[parish_index]
+            created_at = now - timedelta(days=rng.uniform(-7, config.days))
+            requested_at = created_at + timedelta(hours=rng.uniform(2, 120))
+
+            if requested_at > now:
+                request_status = "pending" if rng.random() < 0.75 else "accepted"
+            else:
+                request_status = "completed" if rng.random() < 0.88 else "cancelled"
+            ride_status = {"accepted": "accepted", "completed": "completed"}.get(request_status)
+            if request_status == "cancelled" and rng.random() < 0.5:
+                ride_status = "cancelled"  # cancelled after a driver accepted
+
+            request_writer.add(
+                request_id,
+                rider_id,
+                rng.choices(destination_types, weights=destination_weights)[0],
+                parish_ids[parish_index],
+                _ewkt(home_lat, home_lon),
+                _ewkt(parish_lat, parish_lon),
+                requested_at,
+                rng.choices((1, 2, 3, 4), weights=(70, 20, 7, 3))[0],
+                request_status,
+                created_at,
+                created_at,
+            )
+
+            if ride_status and driver_ids:
+                nearby = drivers_by_parish.get(parish_index) or driver_ids
+                driver_id = rng.choice(nearby)
+                accepted_at = created_at + timedelta(minutes=rng.uniform(1, 120))
+                completed = ride_status == "completed"
+                dropoff_at = requested_at + timedelta(minutes=rng.uniform(8, 40))
+                ride_writer.add(
+                    ride_id,
+                    request_id,
+                    driver_id,
+                    rider_id,
+                    accepted_at,
+                    requested_at if completed else None,
+                    dropoff_at if completed else None,
+                    _ewkt(home_lat, home_lon) if completed else None,
+                    _ewkt(parish_lat, parish_lon) if completed else None,
+                    ride_status,
+                    accepted_at,
+                    dropoff_at if completed else None,
+                )
+
+                if completed:
+                    totals = driver_totals.setdefault(driver_id, [0, 0, 0])
+                    totals[0] += 1
+                    if rng.random() < config.review_rate:
+                        rating = rng.choices((1, 2, 3, 4, 5), weights=RATING_WEIGHTS)[0]
+                        review_writer.add(
+                            review_id,
+                            ride_id,
+                            rider_id,
+                            driver_id,
+                            rating,
+                            None,
+                            dropoff_at + timedelta(hours=rng.uniform(0, 48)),
+                        )
+                        review_id += 1
+                        totals[1] += rating
+                        totals[2] += 1
+                    if rng.random() < config.donation_rate:
+                        amount = rng.choice(DONATION_AMOUNTS_CENTS)
+                        fee = round(amount * 0.029) + 30
+                        donation_writer.add(
+                            donation_id,
+                            ride_id,
+                            rider_id,
+                            driver_id,
+                            amount,
+                            "USD",
+                            f"pi_synthetic_{donation_id}",
+                            "succeeded",
+                            fee,
+                            amount - fee,
+                            dropoff_at,
+                            dropoff_at + timedelta(seconds=rng.uniform(5, 120)),
+                        )
+                        donation_id += 1
+                ride_id += 1
+
+            request_id += 1
+            if request_writer.full:
+                for table_writer in chain:
+                    table_writer.flush()
+        for table_writer in chain:
+            table_writer.flush()
+
+        # Driver profiles last, with aggregates matching the rows above.
+        profile_writer = writer(
+            DriverProfile,
+            ("id", "user_id", "vehicle_make", "vehicle_model", "vehicle_year", "vehicle_color")
+            + ("license_plate", "vehicle_capacity", "insurance_verified")
+            + ("background_check_status", "is_available", "total_rides", "rating_sum")
+            + ("rating_count", "average_rating", "created_at", "updated_at"),
+        )
+        profile_id = _next_id(conn, DriverProfile.__table__)
+        for i, driver_id in enumerate(driver_ids):
+            total_rides, rating_sum, rating_count = driver_totals.get(driver_id, (0, 0, 0))
+            make, model = rng.choice(VEHICLES)
+            profile_writer.add(
+                profile_id + i,
+                driver_id,
+                make,
+                model,
+                rng.randint(2008, 2025),
+                rng.choice(COLORS),
+                f"SYN{driver_id:07d}",
+                rng.choice((4, 4, 5, 7)),
+                True,
+                "approved",
+                rng.random() < 0.3,
+                total_rides,
+                rating_sum,
+                rating_count,
+                rating_sum / rating_count if rating_count else 0.0,
+                now,
+                now,
+            )
+            if profile_writer.full:
+                profile_writer.flush()
+        profile_writer.flush()
+
+        writers = (parish_writer, user_writer, *chain, profile_writer)
+        for table_writer in writers:
+            _reset_sequence(conn, table_writer.table)
+            summary.rows[table_writer.table.name] = table_writer.written
+            logger.info("Wrote %d rows to %s", table_writer.written, table_writer.table.name)
+
+    if bind.dialect.name == "postgresql":
+        # Fresh statistics so the planner sees the new volumes.
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for table_writer in writers:
+                conn.execute(text(f"ANALYZE {table_writer.table.name}"))
+
+    # Core inserts bypass the ORM events that normally invalidate this cache.
+    from app.services import parish_cache
+
+    parish_cache.invalidate()
+
+    summary.seconds = time.perf_counter() - started
+    return summary
+
+
+def main() -> None:
+    defaults = ScaleConfig()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--parishes", type=int, default=defaults.parishes)
+    parser.add_argument("--riders", type=int, default=defaults.riders)
+    parser.add_argument("--drivers", type=int, default=defaults.drivers)
+    parser.add_argument("--ride-requests", type=int, default=defaults.ride_requests)
+    parser.add_argument("--review-rate", type=float, default=defaults.review_rate)
+    parser.add_argument("--donation-rate", type=float, default=defaults.donation_rate)
+    parser.add_argument("--days", type=int, default=defaults.days)
+    parser.add_argument("--email-prefix", default=defaults.email_prefix)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size)
+    args = parser.parse_args()
+    if args.parishes < 1:
+        parser.error("--parishes must be at least 1")
+
+    logging.basicConfig(level=logging.INFO)
+    summary = generate(ScaleConfig(**vars(args)))
+    for table, rows in summary.rows.items():
+        print(f"{table:<16}{rows:>12,}")
+    print(f"done in {summary.seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,11 @@
 
 from redis import Redis
 
-from app.core.config import settings
+from app.celery_app import send_emails
 from app.core.redis import get_redis_client
 from app.models.user import User
-from app.services.email import send_email
+from app.services import rate_limit
+from app.services.email import email_configured
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,14 @@
 PASSWORD_RESET_RATE_LIMIT = 3
 
 
+def _enqueue_email(to_email: str, subject: str, body: str) -> None:
+    """Hand the message to the email workers; delivery never blocks the request."""
+    try:
+        send_emails.delay([{"to_email": to_email, "subject": subject, "body": body}])
+    except Exception:
+        logger.exception("Failed to enqueue email to %s", to_email)
+
+
 def _build_key(prefix: str, identifier: str) -> str:
     return f"{prefix}:{identifier}"
 
@@ -54,15 +63,11 @@ def send_verification_email(user: User) -> None:
         "If you did not create this account, you can ignore this email.\n"
     )
 
-    if not settings.SMTP_HOST or not settings.EMAILS_FROM_EMAIL:
+    if not email_configured():
         logger.info("DEV verification code for %s: %s", user.email, code)
         return
 
-    try:  # pragma: no cover - network boundary
-        send_email(to_email=user.email, subject=subject, body=body)
-    except Exception as exc:  # pragma: no cover - defensive logging
-        logger.warning("Failed to send verification email: %s", exc)
-        # Swallow to avoid blocking registration flows.
+    _enqueue_email(user.email, subject, body)
 
 
 def verify_email_code(email: str, code: str) -> bool:
@@ -83,23 +88,13 @@ def generate_password_reset_token() -> str:
     return secrets.token_urlsafe(32)
 
 
-def _increment_rate_limit(email: str) -> int:
-    """Increment and return the password reset request count for this email."""
-    redis = _get_redis()
-    key = _build_key(PASSWORD_RESET_RATE_PREFIX, email.lower())
-
-    # INCR followed by setting expiry if key is new
-    pipe = redis.pipeline()
-    pipe.incr(key)
-    pipe.expire(key, int(PASSWORD_RESET_RATE_WINDOW.total_seconds()))
-    count, _ = pipe.execute()
-    return int(count)
-
-
 def can_request_password_reset(email: str) -> bool:
     """Check if password reset can be requested under rate limits."""
-    count = _increment_rate_limit(email)
-    return count <= PASSWORD_RESET_RATE_LIMIT
+    return rate_limit.hit(
+        _build_key(PASSWORD_RESET_RATE_PREFIX, email.lower()),
+        PASSWORD_RESET_RATE_LIMIT,
+        PASSWORD_RESET_RATE_WINDOW.total_seconds(),
+    ).allowed
 
 
 def create_password_reset_token(user: User) -> str:
@@ -127,15 +122,11 @@ def send_password_reset_email(user: User, token: str) -> None:
         "If you did not request a password reset, you can ignore this email.\n"
     )
 
-    if not settings.SMTP_HOST or not settings.EMAILS_FROM_EMAIL:
+    if not email_configured():
         logger.info("DEV password reset token for %s: %s", user.email, token)
         return
 
-    try:  # pragma: no cover - network boundary
-        send_email(to_email=user.email, subject=subject, body=body)
-    except Exception as exc:  # pragma: no cover - defensive logging
-        logger.warning("Failed to send password reset email: %s", exc)
-        raise
+    _enqueue_email(user.email, subject, body)
 
 
 def get_user_id_from_reset_token(token: str) -> int | None:
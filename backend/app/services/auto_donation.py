@@ -0,0 +1,102 @@
+"""Auto-donation on ride completion.
+
+Runs in a Celery worker rather than the driver's completion request, so
+completing a ride never waits on Stripe. Creation is idempotent per ride: a
+ride that already has a donation from its rider is skipped, and the Stripe
+PaymentIntent is created with a ride-scoped idempotency key so a retry after a
+partial failure reuses the same intent instead of charging twice. Two runs that
+race past the existence check get the same intent from Stripe; whichever
+records it second returns the existing Donation.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.donation import Donation
+from app.models.ride import Ride, RideStatus
+from app.models.user import User
+from app.services.notifications import publish_to_user
+from app.services.payment import DonationIntentResult, PaymentService, StripeNotConfiguredError
+
+logger = logging.getLogger(__name__)
+
+BASE_DONATION_USD = 5.0
+DEFAULT_MULTIPLIER_USD_PER_MILE = 0.5
+MIN_DONATION_CENTS = 100
+MAX_DONATION_CENTS = 100_000
+
+
+def idempotency_key(ride_id: int) -> str:
+    """Stripe idempotency key for a ride's auto-donation PaymentIntent."""
+    return f"auto-donation-ride-{ride_id}"
+
+
+def calculate_amount_cents(
+    payment: PaymentService, db: Session, *, rider: User, ride_id: int
+) -> Optional[int]:
+    """Return the auto-donation amount for a ride per the rider's preferences."""
+    if rider.auto_donation_type == "fixed":
+        return rider.auto_donation_amount_cents or None
+
+    distance_miles = payment.get_ride_distance_miles(db, ride_id=ride_id) or 0.0
+    multiplier = rider.auto_donation_multiplier or DEFAULT_MULTIPLIER_USD_PER_MILE
+    amount = BASE_DONATION_USD + (distance_miles * multiplier)
+    return max(MIN_DONATION_CENTS, min(MAX_DONATION_CENTS, int(round(amount * 100))))
+
+
+def create_auto_donation(db: Session, *, ride_id: int) -> Optional[DonationIntentResult]:
+    """Create the rider's auto-donation PaymentIntent for a completed ride.
+
+    Returns None when no donation is due (ride not completed, auto-donation
+    disabled, a donation already exists, or Stripe is not configured). Stripe
+    API errors propagate so the caller can retry.
+    """
+    ride = db.query(Ride).filter(Ride.id == ride_id).first()
+    if not ride or ride.status != RideStatus.COMPLETED:
+        return None
+
+    rider = db.query(User).filter(User.id == ride.rider_id).first()
+    if not rider or not rider.auto_donation_enabled:
+        return None
+
+    existing = (
+        db.query(Donation.id)
+        .filter(Donation.ride_id == ride.id, Donation.donor_id == rider.id)
+        .first()
+    )
+    if existing:
+        return None
+
+    try:
+        payment = PaymentService()
+    except StripeNotConfiguredError:
+        logger.warning("Skipping auto-donation for ride %s: Stripe is not configured", ride.id)
+        return None
+
+    amount_cents = calculate_amount_cents(payment, db, rider=rider, ride_id=ride.id)
+    if not amount_cents:
+        return None
+
+    intent = payment.create_donation_payment_intent(
+        db,
+        amount_cents=amount_cents,
+        donor=rider,
+        ride_id=ride.id,
+        driver_id=ride.driver_id,
+        idempotency_key=idempotency_key(ride.id),
+    )
+    publish_to_user(
+        rider.id,
+        "donation_intent_ready",
+        {
+            "ride_id": ride.id,
+            "payment_intent_id": intent.payment_intent_id,
+            "amount": intent.amount_cents / 100.0,
+        },
+    )
+    logger.info("Created auto-donation %s for ride %s", intent.payment_intent_id, ride.id)
+    return intent
@@ -0,0 +1,167 @@
+"""Nearest-available-driver search.
+
+`find_nearest_available_drivers` runs a PostGIS KNN query against the stored
+`users.last_known_location`. `find_nearest_live_drivers` positions drivers from
+the Redis live index instead (see `app.services.location_index`), which is
+fresher than the write-behind copy in Postgres.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.driver_profile import DriverProfile
+from app.models.user import User
+from app.services import location_index
+from app.utils.geo import METERS_PER_MILE, to_geography
+
+logger = logging.getLogger(__name__)
+
+# GEOSEARCH returns every driver in range, available or not; fetch this many per
+# requested result so filtering on availability and capacity still fills `limit`.
+LIVE_SEARCH_OVERFETCH = 5
+
+
+@dataclass(frozen=True)
+class DriverCandidate:
+    user: User
+    profile: DriverProfile
+    distance_meters: float
+    located_at: Optional[datetime] = None
+
+
+def find_nearest_available_drivers(
+    db: Session,
+    *,
+    origin: Any,
+    limit: int = 10,
+    radius_miles: float | None = None,
+    min_capacity: int = 1,
+    exclude_user_ids: set[int] | None = None,
+) -> list[DriverCandidate]:
+    """Return up to `limit` available drivers closest to `origin`.
+
+    Drivers must be active, flagged available, able to seat `min_capacity`
+    passengers and have reported a location within DRIVER_LOCATION_STALE_MINUTES.
+    Results are ordered with the KNN `<->` operator so PostGIS can walk the GiST
+    index on users.last_known_location instead of sorting every candidate.
+
+    Args:
+        db: Database session.
+        origin: Geography expression (see `to_geography`) or scalar subquery.
+        limit: Maximum number of drivers to return.
+        radius_miles: Search radius (capped at MAX_DRIVER_DISTANCE_MILES).
+        min_capacity: Minimum vehicle capacity required.
+        exclude_user_ids: Users that must not be returned (e.g. the rider).
+    """
+    radius = _search_radius(radius_miles)
+    fresh_after = datetime.utcnow() - timedelta(minutes=settings.DRIVER_LOCATION_STALE_MINUTES)
+
+    query = (
+        db.query(
+            User,
+            DriverProfile,
+            func.ST_Distance(User.last_known_location, origin).label("distance_meters"),
+        )
+        .join(DriverProfile, DriverProfile.user_id == User.id)
+        .filter(
+            DriverProfile.is_available.is_(True),
+            DriverProfile.vehicle_capacity >= min_capacity,
+            User.is_active.is_(True),
+            User.last_known_location.isnot(None),
+            User.last_location_updated_at >= fresh_after,
+            func.ST_DWithin(User.last_known_location, origin, radius * METERS_PER_MILE),
+        )
+    )
+    if exclude_user_ids:
+        query = query.filter(User.id.notin_(exclude_user_ids))
+
+    rows = query.order_by(User.last_known_location.op("<->")(origin)).limit(limit).all()
+    return [
+        DriverCandidate(
+            user=user,
+            profile=profile,
+            distance_meters=float(meters),
+            located_at=user.last_location_updated_at,
+        )
+        for user, profile, meters in rows
+    ]
+
+
+def find_nearest_live_drivers(
+    db: Session,
+    *,
+    longitude: float,
+    latitude: float,
+    limit: int = 10,
+    radius_miles: float | None = None,
+    min_capacity: int = 1,
+    exclude_user_ids: set[int] | None = None,
+) -> list[DriverCandidate]:
+    """Return up to `limit` available drivers closest to a point, from the live index.
+
+    One GEOSEARCH finds drivers with a fresh heartbeat in range; one primary-key
+    query then keeps those that are active, available and seat `min_capacity`.
+    Falls back to `find_nearest_available_drivers` when Redis is unreachable.
+    """
+    excluded = exclude_user_ids or set()
+    radius = _search_radius(radius_miles)
+    try:
+        live = location_index.search_nearby_drivers(
+            longitude=longitude,
+            latitude=latitude,
+            radius_miles=radius,
+            count=limit * LIVE_SEARCH_OVERFETCH + len(excluded),
+        )
+    except RedisError:
+        logger.warning("Live driver index unavailable; searching stored locations", exc_info=True)
+        return find_nearest_available_drivers(
+            db,
+            origin=to_geography(longitude=longitude, latitude=latitude),
+            limit=limit,
+            radius_miles=radius_miles,
+            min_capacity=min_capacity,
+            exclude_user_ids=exclude_user_ids,
+        )
+
+    positions = {driver.user_id: driver for driver in live if driver.user_id not in excluded}
+    if not positions:
+        return []
+
+    rows = (
+        db.query(User, DriverProfile)
+        .join(DriverProfile, DriverProfile.user_id == User.id)
+        .filter(
+            User.id.in_(positions),
+            DriverProfile.is_available.is_(True),
+            DriverProfile.vehicle_capacity >= min_capacity,
+            User.is_active.is_(True),
+        )
+        .all()
+    )
+    candidates = [
+        DriverCandidate(
+            user=user,
+            profile=profile,
+            distance_meters=positions[user.id].distance_meters,
+            located_at=positions[user.id].updated_at,
+        )
+        for user, profile in rows
+    ]
+    candidates.sort(key=lambda candidate: candidate.distance_meters)
+    return candidates[:limit]
+
+
+def _search_radius(radius_miles: float | None) -> float:
+    return min(
+        radius_miles or settings.MAX_DRIVER_DISTANCE_MILES,
+        settings.MAX_DRIVER_DISTANCE_MILES,
+    )
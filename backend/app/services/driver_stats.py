@@ -0,0 +1,115 @@
+"""Per-driver ride count and rating aggregates.
+
+`DriverProfile.total_rides`, `rating_sum`, `rating_count` and `average_rating`
+are maintained incrementally: each review and each completed ride applies a
+single atomic `UPDATE ... SET col = col + n` in the caller's transaction, so
+ranking and profile reads never aggregate `ride_reviews` at query time.
+
+`reconcile_driver_stats` recomputes everything from source rows (the rating
+side is an index-only scan of `idx_driver_reviews`) and repairs any drift, e.g.
+from reviews deleted by an admin or writes that bypassed the API.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import Float, case, cast, func, or_, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.models.driver_profile import DriverProfile
+from app.models.ride import Ride, RideStatus
+from app.models.ride_review import RideReview
+
+logger = logging.getLogger(__name__)
+
+
+def record_review(db: Session, driver_id: int, rating: int) -> None:
+    """Fold a new rating into the driver's running aggregates (no commit)."""
+    db.execute(
+        update(DriverProfile)
+        .where(DriverProfile.user_id == driver_id)
+        .values(
+            rating_sum=DriverProfile.rating_sum + rating,
+            rating_count=DriverProfile.rating_count + 1,
+            # SET expressions see the pre-update row, hence the explicit +rating / +1.
+            average_rating=cast(DriverProfile.rating_sum + rating, Float)
+            / (DriverProfile.rating_count + 1),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_completed_ride(db: Session, driver_id: int) -> None:
+    """Count a completed ride for the driver (no commit)."""
+    db.execute(
+        update(DriverProfile)
+        .where(DriverProfile.user_id == driver_id)
+        .values(total_rides=DriverProfile.total_rides + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reconcile_driver_stats(db: Session) -> int:
+    """Recompute every driver's aggregates from source rows; return rows corrected.
+
+    The profile rows are locked first so a review or completed ride committed
+    meanwhile waits and then applies its increment on top of the recomputed
+    values; the recompute itself is one `UPDATE ... FROM` over the aggregates.
+    """
+    db.execute(select(DriverProfile.id).with_for_update()).all()
+
+    ratings = (
+        select(
+            RideReview.reviewee_id,
+            func.sum(RideReview.rating).label("rating_sum"),
+            func.count(RideReview.rating).label("rating_count"),
+        )
+        .group_by(RideReview.reviewee_id)
+        .subquery()
+    )
+    rides = (
+        select(Ride.driver_id, func.count(Ride.id).label("total_rides"))
+        .where(Ride.status == RideStatus.COMPLETED)
+        .group_by(Ride.driver_id)
+        .subquery()
+    )
+    profile = aliased(DriverProfile)
+    rating_count = func.coalesce(ratings.c.rating_count, 0)
+    expected = (
+        select(
+            profile.id,
+            func.coalesce(rides.c.total_rides, 0).label("total_rides"),
+            func.coalesce(ratings.c.rating_sum, 0).label("rating_sum"),
+            rating_count.label("rating_count"),
+            case(
+                (rating_count > 0, cast(ratings.c.rating_sum, Float) / rating_count),
+                else_=0.0,
+            ).label("average_rating"),
+        )
+        .outerjoin(ratings, ratings.c.reviewee_id == profile.user_id)
+        .outerjoin(rides, rides.c.driver_id == profile.user_id)
+        .subquery()
+    )
+    corrected = db.execute(
+        update(DriverProfile)
+        .where(
+            DriverProfile.id == expected.c.id,
+            or_(
+                DriverProfile.total_rides != expected.c.total_rides,
+                DriverProfile.rating_sum != expected.c.rating_sum,
+                DriverProfile.rating_count != expected.c.rating_count,
+            ),
+        )
+        .values(
+            total_rides=expected.c.total_rides,
+            rating_sum=expected.c.rating_sum,
+            rating_count=expected.c.rating_count,
+            average_rating=expected.c.average_rating,
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if corrected:
+        logger.info("Reconciled stats for %d driver profiles", corrected)
+    return corrected
@@ -1,32 +1,46 @@
-"""Email sending utilities."""
+"""Email sending utilities.
 
+Request handlers never talk to the mail server: they queue messages with the
+`email.send_messages` Celery task. Each worker process keeps one persistent,
+authenticated SMTP connection and reuses it for every message it sends, so a
+batch (or a run of consecutive tasks) pays the connect/STARTTLS/login
+handshake once. Connections are recycled after SMTP_CONNECTION_IDLE_SECONDS
+or SMTP_MAX_MESSAGES_PER_CONNECTION messages.
+"""
+
+import logging
+import threading
+import time
 from email.mime.text import MIMEText
-from smtplib import SMTP
-from typing import Optional
+from smtplib import (
+    SMTP,
+    SMTPAuthenticationError,
+    SMTPException,
+    SMTPNotSupportedError,
+    SMTPRecipientsRefused,
+    SMTPResponseException,
+    SMTPServerDisconnected,
+)
+from typing import Any, Optional
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
 
-def send_email(
+
+def email_configured() -> bool:
+    """Whether outbound email is set up (otherwise sending is a no-op)."""
+    return bool(settings.SMTP_HOST and settings.EMAILS_FROM_EMAIL)
+
+
+def build_message(
     to_email: str,
     subject: str,
     body: str,
     from_email: Optional[str] = None,
     from_name: Optional[str] = None,
-) -> None:
-    """Send a simple text email via SMTP.
-
-    Args:
-        to_email: Recipient email address.
-        subject: Email subject line.
-        body: Plain text body.
-        from_email: Optional from address (defaults to EMAILS_FROM_EMAIL).
-        from_name: Optional from name (defaults to EMAILS_FROM_NAME).
-    """
-    if not settings.SMTP_HOST or not settings.EMAILS_FROM_EMAIL:
-        # Email is not configured; in development we silently skip.
-        return
-
+) -> MIMEText:
+    """Build a plain text message with the configured sender."""
     sender_email = from_email or settings.EMAILS_FROM_EMAIL
     sender_name = from_name or settings.EMAILS_FROM_NAME or settings.PROJECT_NAME
 
@@ -34,17 +48,131 @@ def send_email(
     msg["Subject"] = subject
     msg["From"] = f"{sender_name} <{sender_email}>"
     msg["To"] = to_email
+    return msg
+
 
-    with SMTP(settings.SMTP_HOST, settings.SMTP_PORT or 587) as smtp:
+class SMTPConnection:
+    """A lazily opened SMTP connection reused across messages in this process."""
+
+    def __init__(self) -> None:
+        self._smtp: Optional[SMTP] = None
+        self._sent = 0
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> SMTP:
+        smtp = SMTP(
+            settings.SMTP_HOST,
+            settings.SMTP_PORT or 587,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+        )
         # Upgrade to TLS before any authentication attempt when possible.
         try:
             smtp.starttls()
-        except Exception:
-            # Some servers/ports may not support STARTTLS; in that case we
-            # continue without upgrading but avoid failing hard here.
+        except SMTPNotSupportedError:
+            # Some servers/ports may not support STARTTLS; continue without it.
             pass
 
         if settings.SMTP_USER and settings.SMTP_PASSWORD:
             smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        return smtp
+
+    def _recycle_if_stale(self) -> None:
+        idle = time.monotonic() - self._last_used
+        if self._smtp is not None and (
+            idle > settings.SMTP_CONNECTION_IDLE_SECONDS
+            or self._sent >= settings.SMTP_MAX_MESSAGES_PER_CONNECTION
+        ):
+            self._close()
+
+    def _close(self) -> None:
+        smtp, self._smtp, self._sent = self._smtp, None, 0
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except (SMTPException, OSError):
+            smtp.close()
+
+    def send(self, msg: MIMEText) -> None:
+        """Send `msg`, reconnecting once if the server dropped the idle connection."""
+        with self._lock:
+            self._recycle_if_stale()
+            for attempt in range(2):
+                if self._smtp is None:
+                    self._smtp = self._connect()
+                try:
+                    self._smtp.send_message(msg)
+                    break
+                except SMTPServerDisconnected:
+                    self._smtp = None
+                    if attempt:
+                        raise
+            self._sent += 1
+            self._last_used = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+smtp_connection = SMTPConnection()
 
-        smtp.send_message(msg)
+
+def _is_permanent(exc: Exception) -> bool:
+    if isinstance(exc, SMTPRecipientsRefused):
+        return True
+    return (
+        isinstance(exc, SMTPResponseException)
+        and not isinstance(exc, SMTPAuthenticationError)
+        and exc.smtp_code >= 500
+    )
+
+
+def deliver(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Send `build_message` kwargs dicts in order; return the ones to retry.
+
+    Permanent rejections (bad recipient, 5xx) are logged and dropped. On a
+    transient failure the connection is reset and the failed message and all
+    after it are returned.
+    """
+    if not email_configured():
+        return []
+    for index, message in enumerate(messages):
+        try:
+            smtp_connection.send(build_message(**message))
+        except (SMTPException, OSError) as exc:
+            if _is_permanent(exc):
+                logger.error("Dropping email to %s: %s", message.get("to_email"), exc)
+                continue
+            logger.warning(
+                "SMTP send failed, will retry %d message(s): %s", len(messages) - index, exc
+            )
+            smtp_connection.close()
+            return messages[index:]
+    return []
+
+
+def send_email(
+    to_email: str,
+    subject: str,
+    body: str,
+    from_email: Optional[str] = None,
+    from_name: Optional[str] = None,
+) -> None:
+    """Send a simple text email via SMTP, synchronously.
+
+    Prefer queueing through the `email.send_messages` task from request
+    handlers; this is for scripts and workers.
+
+    Args:
+        to_email: Recipient email address.
+        subject: Email subject line.
+        body: Plain text body.
+        from_email: Optional from address (defaults to EMAILS_FROM_EMAIL).
+        from_name: Optional from name (defaults to EMAILS_FROM_NAME).
+    """
+    if not email_configured():
+        # Email is not configured; in development we silently skip.
+        return
+    smtp_connection.send(build_message(to_email, subject, body, from_email, from_name))
@@ -0,0 +1,195 @@
+"""Redis GEO-backed live driver location index with write-behind to Postgres.
+
+Driver GPS heartbeats land in Redis only: a single pipelined round trip updates
+the GEO set used for nearby-driver lookups, a freshness sorted set and a "dirty"
+hash of positions that still need persisting. A periodic Celery task
+(`flush_driver_locations`) drains the dirty hash into `users.last_known_location`
+with one batched UPDATE.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import ResponseError
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis import get_async_redis_client, get_redis_client
+from app.models.user import User
+from app.utils.geo import METERS_PER_MILE
+
+logger = logging.getLogger(__name__)
+
+DRIVER_GEO_KEY = "driver_locations:geo"
+DRIVER_SEEN_KEY = "driver_locations:seen"
+DRIVER_DIRTY_KEY = "driver_locations:dirty"
+DRIVER_FLUSHING_KEY = "driver_locations:flushing"
+
+
+@dataclass(frozen=True)
+class LiveDriverLocation:
+    user_id: int
+    longitude: float
+    latitude: float
+    distance_meters: float
+    updated_at: datetime
+
+
+def _get_redis() -> Redis:
+    return get_redis_client()
+
+
+def _get_async_redis() -> AsyncRedis:
+    return get_async_redis_client()
+
+
+def _queue_location(pipe, user_id: int, longitude: float, latitude: float, ts: float) -> None:
+    member = str(user_id)
+    pipe.geoadd(DRIVER_GEO_KEY, [longitude, latitude, member])
+    pipe.zadd(DRIVER_SEEN_KEY, {member: ts})
+    pipe.hset(DRIVER_DIRTY_KEY, member, f"{longitude},{latitude},{ts}")
+
+
+def record_driver_location(
+    user_id: int,
+    *,
+    longitude: float,
+    latitude: float,
+    timestamp: float | None = None,
+) -> None:
+    """Record a driver's latest position in Redis (one round trip, no DB write)."""
+    ts = timestamp if timestamp is not None else time.time()
+    pipe = _get_redis().pipeline(transaction=False)
+    _queue_location(pipe, user_id, longitude, latitude, ts)
+    pipe.execute()
+
+
+async def record_driver_location_async(
+    user_id: int,
+    *,
+    longitude: float,
+    latitude: float,
+    timestamp: float | None = None,
+) -> None:
+    """Awaitable variant of `record_driver_location` for async endpoints."""
+    ts = timestamp if timestamp is not None else time.time()
+    pipe = _get_async_redis().pipeline(transaction=False)
+    _queue_location(pipe, user_id, longitude, latitude, ts)
+    await pipe.execute()
+
+
+def search_nearby_drivers(
+    *,
+    longitude: float,
+    latitude: float,
+    radius_miles: float,
+    count: int,
+) -> list[LiveDriverLocation]:
+    """Return drivers with a fresh position within `radius_miles`, nearest first."""
+    redis = _get_redis()
+    matches = redis.geosearch(
+        DRIVER_GEO_KEY,
+        longitude=longitude,
+        latitude=latitude,
+        radius=radius_miles,
+        unit="mi",
+        sort="ASC",
+        count=count,
+        withcoord=True,
+        withdist=True,
+    )
+    if not matches:
+        return []
+
+    members = [member for member, _dist, _coord in matches]
+    seen = redis.zmscore(DRIVER_SEEN_KEY, members)
+    fresh_after = time.time() - settings.DRIVER_LOCATION_STALE_MINUTES * 60
+
+    results: list[LiveDriverLocation] = []
+    for (member, dist_miles, (lon, lat)), seen_at in zip(matches, seen):
+        if seen_at is None or float(seen_at) < fresh_after:
+            continue
+        results.append(
+            LiveDriverLocation(
+                user_id=int(member),
+                longitude=float(lon),
+                latitude=float(lat),
+                distance_meters=float(dist_miles) * METERS_PER_MILE,
+                updated_at=datetime.utcfromtimestamp(float(seen_at)),
+            )
+        )
+    return results
+
+
+def flush_driver_locations(db: Session) -> int:
+    """Persist buffered driver positions to Postgres and prune stale GEO members.
+
+    Returns the number of users whose location was written.
+    """
+    redis = _get_redis()
+
+    # A previous flush that died mid-way leaves its batch behind; finish it first.
+    if not redis.exists(DRIVER_FLUSHING_KEY):
+        try:
+            redis.rename(DRIVER_DIRTY_KEY, DRIVER_FLUSHING_KEY)
+        except ResponseError:
+            # Nothing buffered since the last flush.
+            _prune_stale_drivers(redis)
+            return 0
+
+    pending = redis.hgetall(DRIVER_FLUSHING_KEY)
+    rows = []
+    for member, value in pending.items():
+        try:
+            lon, lat, ts = value.split(",")
+            rows.append(
+                {
+                    "b_id": int(member),
+                    "b_location": f"SRID=4326;POINT({float(lon)} {float(lat)})",
+                    "b_updated_at": datetime.utcfromtimestamp(float(ts)),
+                }
+            )
+        except ValueError:
+            logger.warning("Dropping malformed buffered location for user %s", member)
+
+    if rows:
+        users = User.__table__
+        stmt = (
+            update(users)
+            .where(users.c.id == bindparam("b_id"))
+            # Never let an older buffered ping overwrite a newer stored position.
+            .where(
+                or_(
+                    users.c.last_location_updated_at.is_(None),
+                    users.c.last_location_updated_at < bindparam("b_updated_at"),
+                )
+            )
+            .values(
+                last_known_location=bindparam("b_location", type_=users.c.last_known_location.type),
+                last_location_updated_at=bindparam("b_updated_at"),
+            )
+        )
+        db.execute(stmt, rows)
+        db.commit()
+
+    redis.delete(DRIVER_FLUSHING_KEY)
+    _prune_stale_drivers(redis)
+    return len(rows)
+
+
+def _prune_stale_drivers(redis: Redis) -> None:
+    cutoff = time.time() - settings.DRIVER_LOCATION_STALE_MINUTES * 60
+    stale = redis.zrangebyscore(DRIVER_SEEN_KEY, "-inf", cutoff)
+    if not stale:
+        return
+    pipe = redis.pipeline(transaction=False)
+    pipe.zrem(DRIVER_GEO_KEY, *stale)
+    pipe.zrem(DRIVER_SEEN_KEY, *stale)
+    pipe.execute()
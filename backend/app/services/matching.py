@@ -0,0 +1,199 @@
+"""Ride matching engine: score nearby drivers and fan out time-boxed offers."""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.ride_offer import RideOffer, RideOfferStatus
+from app.models.ride_request import RideRequest, RideRequestStatus
+from app.services.driver_search import DriverCandidate, find_nearest_available_drivers
+from app.services.notifications import publish_to_user
+from app.utils.geo import METERS_PER_MILE
+
+logger = logging.getLogger(__name__)
+
+DISTANCE_WEIGHT = 0.5
+RATING_WEIGHT = 0.25
+CAPACITY_WEIGHT = 0.15
+PARISH_WEIGHT = 0.1
+
+# Rating assumed for drivers who have not been reviewed yet.
+UNRATED_DRIVER_RATING = 4.0
+
+
+def score_candidate(
+    *,
+    distance_meters: float,
+    radius_meters: float,
+    vehicle_capacity: int,
+    passenger_count: int,
+    average_rating: float,
+    same_parish: bool,
+) -> float:
+    """Score a driver for a ride request on a 0..1 scale (higher is better).
+
+    Closer drivers win most of the weight. A tighter vehicle fit is preferred so
+    larger vehicles stay free for larger groups, and drivers from the rider's
+    parish get a small boost.
+    """
+    proximity = max(0.0, 1.0 - distance_meters / radius_meters) if radius_meters > 0 else 0.0
+    capacity_fit = min(1.0, passenger_count / vehicle_capacity) if vehicle_capacity > 0 else 0.0
+    rating = (average_rating or UNRATED_DRIVER_RATING) / 5.0
+    affinity = 1.0 if same_parish else 0.0
+
+    return round(
+        DISTANCE_WEIGHT * proximity
+        + RATING_WEIGHT * rating
+        + CAPACITY_WEIGHT * capacity_fit
+        + PARISH_WEIGHT * affinity,
+        4,
+    )
+
+
+def rank_candidates(
+    ride_request: RideRequest, candidates: list[DriverCandidate]
+) -> list[tuple[float, DriverCandidate]]:
+    """Return `(score, candidate)` pairs, best first."""
+    radius_meters = settings.MAX_DRIVER_DISTANCE_MILES * METERS_PER_MILE
+    scored = [
+        (
+            score_candidate(
+                distance_meters=c.distance_meters,
+                radius_meters=radius_meters,
+                vehicle_capacity=c.profile.vehicle_capacity,
+                passenger_count=ride_request.passenger_count,
+                average_rating=c.profile.average_rating,
+                same_parish=(
+                    ride_request.parish_id is not None
+                    and c.user.parish_id == ride_request.parish_id
+                ),
+            ),
+            c,
+        )
+        for c in candidates
+    ]
+    scored.sort(key=lambda pair: (-pair[0], pair[1].distance_meters))
+    return scored
+
+
+def match_ride_request(db: Session, *, ride_request_id: int) -> list[RideOffer]:
+    """Issue offers for a pending ride request to the best-scoring drivers.
+
+    Keeps at most MATCHING_OFFER_FANOUT live offers per request and never offers
+    the same request to a driver twice, so it is safe to call again after offers
+    expire or are declined. The ride request row is locked (FOR UPDATE) until the
+    offers are committed, so concurrent runs for one request take turns instead
+    of both filling the free slots.
+    """
+    ride_request = (
+        db.query(RideRequest).filter(RideRequest.id == ride_request_id).with_for_update().first()
+    )
+    if not ride_request or ride_request.status != RideRequestStatus.PENDING:
+        db.rollback()
+        return []
+
+    now = datetime.utcnow()
+    previous = db.query(RideOffer.driver_id, RideOffer.status, RideOffer.expires_at).filter(
+        RideOffer.ride_request_id == ride_request_id
+    )
+    offered_driver_ids: set[int] = set()
+    live_offers = 0
+    for driver_id, offer_status, expires_at in previous:
+        offered_driver_ids.add(driver_id)
+        if offer_status == RideOfferStatus.PENDING and expires_at > now:
+            live_offers += 1
+
+    slots = settings.MATCHING_OFFER_FANOUT - live_offers
+    if slots <= 0:
+        db.rollback()
+        return []
+
+    origin = (
+        select(RideRequest.pickup_location)
+        .where(RideRequest.id == ride_request_id)
+        .scalar_subquery()
+    )
+    candidates = find_nearest_available_drivers(
+        db,
+        origin=origin,
+        limit=settings.MATCHING_CANDIDATE_POOL,
+        min_capacity=ride_request.passenger_count,
+        exclude_user_ids={ride_request.rider_id} | offered_driver_ids,
+    )
+
+    expires_at = now + timedelta(minutes=settings.RIDE_OFFER_EXPIRY_MINUTES)
+    offers = [
+        RideOffer(
+            ride_request_id=ride_request.id,
+            driver_id=candidate.user.id,
+            score=score,
+            status=RideOfferStatus.PENDING,
+            created_at=now,
+            expires_at=expires_at,
+        )
+        for score, candidate in rank_candidates(ride_request, candidates)[:slots]
+    ]
+    if not offers:
+        logger.info("No drivers available to offer ride request %s", ride_request_id)
+        db.rollback()
+        return []
+
+    db.add_all(offers)
+    db.commit()
+
+    for offer in offers:
+        publish_to_user(
+            offer.driver_id,
+            "ride_offer",
+            {
+                "offer_id": offer.id,
+                "ride_request_id": offer.ride_request_id,
+                "expires_at": offer.expires_at,
+            },
+        )
+    return offers
+
+
+def expire_stale_offers(db: Session) -> list[int]:
+    """Mark lapsed offers as expired.
+
+    Returns the ids of ride requests that are still pending and have no live
+    offers left, so the caller can re-run matching for them.
+    """
+    now = datetime.utcnow()
+    expired_request_ids = {
+        row[0]
+        for row in db.execute(
+            update(RideOffer)
+            .where(RideOffer.status == RideOfferStatus.PENDING, RideOffer.expires_at <= now)
+            .values(status=RideOfferStatus.EXPIRED)
+            .returning(RideOffer.ride_request_id)
+        )
+    }
+    db.commit()
+    if not expired_request_ids:
+        return []
+
+    live = (
+        select(func.count(RideOffer.id))
+        .where(
+            RideOffer.ride_request_id == RideRequest.id,
+            RideOffer.status == RideOfferStatus.PENDING,
+        )
+        .scalar_subquery()
+    )
+    rows = (
+        db.query(RideRequest.id)
+        .filter(
+            RideRequest.id.in_(expired_request_ids),
+            RideRequest.status == RideRequestStatus.PENDING,
+            live == 0,
+        )
+        .all()
+    )
+    return [row[0] for row in rows]
@@ -0,0 +1,49 @@
+"""Redis pub/sub fan-out of real-time events to connected clients."""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.core.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+USER_CHANNEL_PREFIX = "events:user"
+RIDE_CHANNEL_PREFIX = "events:ride"
+
+
+def _get_redis() -> Redis:
+    return get_redis_client()
+
+
+def user_channel(user_id: int) -> str:
+    """Pub/sub channel carrying events addressed to a single user."""
+    return f"{USER_CHANNEL_PREFIX}:{user_id}"
+
+
+def ride_channel(ride_id: int) -> str:
+    """Pub/sub channel carrying events for one ride (rider and driver both listen)."""
+    return f"{RIDE_CHANNEL_PREFIX}:{ride_id}"
+
+
+def _publish(channel: str, event: str, payload: dict[str, Any]) -> None:
+    message = json.dumps({"event": event, **payload}, default=str)
+    try:
+        _get_redis().publish(channel, message)
+    except RedisError as exc:
+        logger.warning("Failed to publish %s on %s: %s", event, channel, exc)
+
+
+def publish_to_user(user_id: int, event: str, payload: dict[str, Any]) -> None:
+    """Publish an event to a user's channel (best-effort; never raises)."""
+    _publish(user_channel(user_id), event, payload)
+
+
+def publish_ride_event(ride_id: int, event: str, payload: dict[str, Any]) -> None:
+    """Publish an event to a ride's channel (best-effort; never raises)."""
+    _publish(ride_channel(ride_id), event, {"ride_id": ride_id, **payload})
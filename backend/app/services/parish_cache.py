@@ -0,0 +1,194 @@
+"""HTTP response cache for parish directory reads.
+
+Parish data changes rarely but is fetched on every app launch, so serialised
+`/parishes` responses are stored in Redis keyed by their query parameters and
+served with a strong ETag, Last-Modified and a public Cache-Control header.
+Clients revalidate to `304 Not Modified` and nginx can cache at the edge.
+
+Cache keys embed a version counter that is bumped whenever a session commits
+a Parish insert, update or delete (unit-of-work flushes and bulk
+`session.execute(update(Parish)...)` statements alike), so stale entries are
+never read again and simply expire. Writes on a bare Connection bypass the
+Session and must call `invalidate()` themselves, as `seed_scale` does.
+
+Misses are built on the primary: a lagging replica could still return
+pre-write rows, which would then be stored under the new version.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Callable, Iterator, Optional
+
+from fastapi import Request, Response, status
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.core.config import settings
+from app.core.redis import get_redis_client
+from app.db.session import SessionLocal, engine
+from app.models.parish import Parish
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "parish_cache"
+VERSION_KEY = f"{CACHE_PREFIX}:version"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _get_redis() -> Redis:
+    return get_redis_client()
+
+
+@dataclass
+class CachedResponse:
+    """A serialised response body plus the validators derived from it."""
+
+    body: str
+    etag: str
+    last_modified: Optional[str] = None
+    next_cursor: Optional[str] = None
+
+
+def build_response(
+    body: bytes, last_modified: Optional[datetime], next_cursor: Optional[str] = None
+) -> CachedResponse:
+    """Wrap a serialised body, deriving its strong ETag from the bytes themselves."""
+    return CachedResponse(
+        body=body.decode(),
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        # updated_at columns are naive UTC.
+        last_modified=(
+            format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+            if last_modified
+            else None
+        ),
+        next_cursor=next_cursor,
+    )
+
+
+def cache_version() -> int:
+    """Current parish cache generation (raises RedisError if Redis is down)."""
+    return int(_get_redis().get(VERSION_KEY) or 0)
+
+
+def _cache_key(version: int, scope: str, params: dict[str, Any]) -> str:
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{CACHE_PREFIX}:v{version}:{scope}:{digest}"
+
+
+@contextmanager
+def primary_session(db: Session) -> Iterator[Session]:
+    """`db` if it is bound to the primary, else a short-lived primary session."""
+    if db.get_bind() is engine:
+        yield db
+        return
+    primary = SessionLocal()
+    try:
+        yield primary
+    finally:
+        primary.close()
+
+
+def get_or_build(
+    scope: str,
+    params: dict[str, Any],
+    build: Callable[[Session], CachedResponse],
+    db: Session,
+) -> CachedResponse:
+    """Return the cached response for (scope, params), building and storing it on a miss.
+
+    `db` is the request's (possibly replica) session; it only serves requests
+    while Redis is down, since nothing built then is stored.
+    """
+    try:
+        key = _cache_key(cache_version(), scope, params)
+        cached = _get_redis().get(key)
+    except RedisError:
+        logger.warning("Parish response cache unavailable; serving from the database")
+        return build(db)
+    if cached is not None:
+        return CachedResponse(**json.loads(cached))
+
+    with primary_session(db) as primary:
+        entry = build(primary)
+    try:
+        _get_redis().setex(key, settings.PARISH_CACHE_SECONDS, json.dumps(asdict(entry)))
+    except RedisError:
+        pass
+    return entry
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def to_response(request: Request, entry: CachedResponse, *, public: bool = True) -> Response:
+    """Render `entry`, answering 304 when the client already holds this ETag."""
+    max_age = settings.PARISH_CACHE_MAX_AGE_SECONDS
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": f"public, max-age={max_age}" if public else "private, max-age=0",
+    }
+    if entry.last_modified:
+        headers["Last-Modified"] = entry.last_modified
+    if entry.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = entry.next_cursor
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def invalidate() -> None:
+    """Start a new cache generation so no existing entry is served again."""
+    try:
+        _get_redis().incr(VERSION_KEY)
+    except RedisError:
+        logger.error("Failed to invalidate the parish response cache")
+
+
+_DIRTY_FLAG = "parish_cache_dirty"
+
+
+def _mark_dirty(_mapper, _connection, target: Parish) -> None:
+    session = Session.object_session(target)
+    if session is not None:
+        session.info[_DIRTY_FLAG] = True
+
+
+def _mark_dirty_on_bulk_write(orm_execute_state: ORMExecuteState) -> None:
+    # Bulk and Core statements run through Session.execute skip the mapper events.
+    if not (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if getattr(table, "name", None) == Parish.__tablename__:
+        orm_execute_state.session.info[_DIRTY_FLAG] = True
+
+
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY_FLAG, False):
+        invalidate()
+
+
+def _forget_after_rollback(session: Session, _previous_transaction) -> None:
+    session.info.pop(_DIRTY_FLAG, None)
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Parish, _event, _mark_dirty)
+event.listen(Session, "do_orm_execute", _mark_dirty_on_bulk_write)
+event.listen(Session, "after_commit", _invalidate_after_commit)
+event.listen(Session, "after_soft_rollback", _forget_after_rollback)
@@ -0,0 +1,182 @@
+"""Parish directory search: trigram relevance, near-me and autocomplete.
+
+On Postgres, text queries use pg_trgm word similarity (served by the GIN
+indexes on name and city) and are ranked by it; "near me" searches are limited
+with ST_DWithin and ordered by distance. Other dialects (the SQLite test
+database) fall back to a case-insensitive substring match ordered by name.
+
+Every mode is keyset-paginated with an opaque cursor. Short autocomplete
+prefixes are few and hot, so their results are cached in Redis under the
+current `parish_cache` generation (bumped on every parish write).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Any, Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import Numeric, cast, func, literal, or_, select, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import settings
+from app.core.redis import get_redis_client
+from app.models.parish import Parish
+from app.services import parish_cache
+from app.utils.geo import METERS_PER_MILE
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_PREFIX = "parish_autocomplete"
+AUTOCOMPLETE_LIMIT = 10
+
+
+def _get_redis() -> Redis:
+    return get_redis_client()
+
+
+@dataclass
+class ParishSearchPage:
+    """One page of parish results plus the cursor for the next page."""
+
+    parishes: list[Parish]
+    next_cursor: Optional[str]
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _decode(cursor: str, parse_key) -> tuple[Any, int]:
+    last_key, last_id = decode_cursor(cursor, 2)
+    try:
+        return parse_key(last_key), int(last_id)
+    except (TypeError, ValueError, InvalidOperation) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+
+
+def search_parishes(
+    db: Session,
+    *,
+    q: Optional[str] = None,
+    origin: Optional[ColumnElement] = None,
+    radius_miles: Optional[float] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> ParishSearchPage:
+    """Search parishes by text and/or proximity to `origin`.
+
+    Results near `origin` are ordered by distance (and carry `distance_miles`);
+    text-only searches by relevance on Postgres; everything else by name.
+    Raises `InvalidCursorError` for a malformed cursor.
+    """
+    use_trigrams = db.get_bind().dialect.name == "postgresql"
+    query = select(Parish)
+
+    rank = None
+    if q and use_trigrams:
+        term = literal(q)
+        query = query.where(or_(term.op("<%")(Parish.name), term.op("<%")(Parish.city)))
+        # Rounded numeric so the cursor round-trips the rank exactly.
+        rank = func.round(
+            cast(
+                func.greatest(
+                    func.word_similarity(term, Parish.name), func.word_similarity(term, Parish.city)
+                ),
+                Numeric,
+            ),
+            4,
+        )
+    elif q:
+        pattern = f"%{_escape_like(q)}%"
+        query = query.where(
+            or_(Parish.name.ilike(pattern, escape="\\"), Parish.city.ilike(pattern, escape="\\"))
+        )
+
+    if origin is not None:
+        radius = radius_miles or settings.PARISH_SEARCH_RADIUS_MILES
+        sort_key = func.ST_Distance(Parish.location, origin)
+        query = query.where(
+            func.ST_DWithin(Parish.location, origin, radius * METERS_PER_MILE)
+        ).add_columns(sort_key.label("distance_meters"))
+        if cursor:
+            last_key, last_id = _decode(cursor, float)
+            query = query.where(tuple_(sort_key, Parish.id) > tuple_(last_key, last_id))
+        query = query.order_by(sort_key.asc(), Parish.id.asc())
+    elif rank is not None:
+        query = query.add_columns(rank.label("rank"))
+        if cursor:
+            last_key, last_id = _decode(cursor, Decimal)
+            query = query.where(tuple_(-rank, Parish.id) > tuple_(-last_key, last_id))
+        query = query.order_by(rank.desc(), Parish.id.asc())
+    else:
+        query = query.add_columns(Parish.name)
+        if cursor:
+            last_key, last_id = _decode(cursor, str)
+            query = query.where(tuple_(Parish.name, Parish.id) > tuple_(last_key, last_id))
+        query = query.order_by(Parish.name.asc(), Parish.id.asc())
+
+    rows = db.execute(query.limit(limit + 1)).all()
+
+    parishes: list[Parish] = []
+    for parish, key in rows[:limit]:
+        if origin is not None:
+            setattr(parish, "distance_miles", round(key / METERS_PER_MILE, 2))
+        parishes.append(parish)
+
+    next_cursor = None
+    if len(rows) > limit:
+        last_parish, last_key = rows[limit - 1]
+        next_cursor = encode_cursor(str(last_key), last_parish.id)
+    return ParishSearchPage(parishes=parishes, next_cursor=next_cursor)
+
+
+def autocomplete(db: Session, prefix: str) -> list[dict[str, Any]]:
+    """Parishes whose name (or a word in it) starts with `prefix`, by name."""
+    normalized = " ".join(prefix.lower().split())
+    cacheable = len(normalized) <= settings.PARISH_AUTOCOMPLETE_CACHE_MAX_PREFIX
+
+    if cacheable:
+        try:
+            key = f"{AUTOCOMPLETE_PREFIX}:v{parish_cache.cache_version()}:{normalized}"
+            cached = _get_redis().get(key)
+        except RedisError:
+            logger.warning("Parish autocomplete cache unavailable; querying the database")
+            cacheable = False
+            cached = None
+        if cached is not None:
+            return json.loads(cached)
+
+    if not cacheable:
+        return _suggestions(db, normalized)
+
+    # Stored under the current cache version, so read the primary (see parish_cache).
+    with parish_cache.primary_session(db) as primary:
+        suggestions = _suggestions(primary, normalized)
+    try:
+        _get_redis().setex(key, settings.PARISH_AUTOCOMPLETE_CACHE_SECONDS, json.dumps(suggestions))
+    except RedisError:
+        pass
+    return suggestions
+
+
+def _suggestions(db: Session, normalized: str) -> list[dict[str, Any]]:
+    pattern = _escape_like(normalized)
+    rows = db.execute(
+        select(Parish.id, Parish.name, Parish.city, Parish.state)
+        .where(
+            or_(
+                Parish.name.ilike(f"{pattern}%", escape="\\"),
+                Parish.name.ilike(f"% {pattern}%", escape="\\"),
+            )
+        )
+        .order_by(Parish.name.asc(), Parish.id.asc())
+        .limit(AUTOCOMPLETE_LIMIT)
+    )
+    return [dict(row._mapping) for row in rows]
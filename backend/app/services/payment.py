@@ -9,6 +9,7 @@
 
 import stripe
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -17,6 +18,13 @@
 from app.models.ride_request import RideRequest
 from app.models.user import User
 
+# PaymentIntent webhook events that change a Donation's state.
+DONATION_EVENT_TYPES = {
+    "payment_intent.succeeded",
+    "payment_intent.payment_failed",
+    "payment_intent.canceled",
+}
+
 
 class StripeNotConfiguredError(RuntimeError):
     """Raised when Stripe settings are not configured."""
@@ -74,6 +82,8 @@ def get_or_create_stripe_customer_id(self, db: Session, *, user: User) -> str:
             email=user.email,
             name=f"{user.first_name} {user.last_name}",
             metadata={"user_id": str(user.id), "type": "catholic_ride_share_user"},
+            # Concurrent first donations (or a retry) get the same Customer back.
+            idempotency_key=f"customer-user-{user.id}",
         )
         user.stripe_customer_id = customer["id"]
         db.add(user)
@@ -108,8 +118,13 @@ def create_donation_payment_intent(
         ride_id: int,
         driver_id: int,
         currency: str = "usd",
+        idempotency_key: Optional[str] = None,
     ) -> DonationIntentResult:
-        """Create a Stripe PaymentIntent and a pending Donation record."""
+        """Create a Stripe PaymentIntent and a pending Donation record.
+
+        Pass `idempotency_key` when the call may be retried so Stripe returns the
+        original PaymentIntent instead of creating a second one.
+        """
         if amount_cents < 100:
             raise ValueError("Donation amount must be at least $1.00.")
         if amount_cents > 100_000:
@@ -129,8 +144,14 @@ def create_donation_payment_intent(
                 "driver_id": str(driver_id),
             },
             description=f"Donation for ride #{ride_id}",
+            idempotency_key=idempotency_key,
         )
 
+        replayed = self._recorded_intent(db, intent)
+        if replayed:
+            # Replayed idempotent request: the Donation row was already recorded.
+            return replayed
+
         donation = Donation(
             ride_id=ride_id,
             donor_id=donor.id,
@@ -142,7 +163,15 @@ def create_donation_payment_intent(
             stripe_status=intent["status"],
         )
         db.add(donation)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent call with the same idempotency key recorded it first.
+            db.rollback()
+            replayed = self._recorded_intent(db, intent)
+            if replayed is None:
+                raise
+            return replayed
         db.refresh(donation)
 
         client_secret = intent.get("client_secret")
@@ -155,6 +184,20 @@ def create_donation_payment_intent(
             amount_cents=amount_cents,
         )
 
+    @staticmethod
+    def _recorded_intent(db: Session, intent: Any) -> Optional[DonationIntentResult]:
+        """The result for `intent` if its Donation row already exists."""
+        donation = (
+            db.query(Donation).filter(Donation.stripe_payment_intent_id == intent["id"]).first()
+        )
+        if donation is None:
+            return None
+        return DonationIntentResult(
+            payment_intent_id=intent["id"],
+            client_secret=donation.stripe_client_secret or intent.get("client_secret"),
+            amount_cents=donation.amount_cents,
+        )
+
     def verify_and_construct_event(self, *, payload: bytes, sig_header: str) -> Any:
         """Verify Stripe webhook signature and return the parsed event."""
         if not settings.STRIPE_WEBHOOK_SECRET:
@@ -168,11 +211,7 @@ def handle_webhook_event(self, db: Session, *, event: Any) -> None:
         event_type = event.get("type")
         data_object = event.get("data", {}).get("object", {})
 
-        if event_type not in {
-            "payment_intent.succeeded",
-            "payment_intent.payment_failed",
-            "payment_intent.canceled",
-        }:
+        if event_type not in DONATION_EVENT_TYPES:
             return
 
         payment_intent_id = data_object.get("id")
@@ -0,0 +1,171 @@
+"""Off-request profile photo processing.
+
+The upload endpoint only validates the image header and streams the original
+from its spooled temp file to S3 (`profiles/{user_id}/{uuid}/original`). The
+`photos.process_profile_photo` Celery task then renders square variants
+(64/200/500 px, JPEG and WebP) next to it, points `profile_photo_url` at the
+500 px JPEG, removes the original and the previous photo, and pushes a
+`profile_photo_ready` event to the user.
+
+Every variant lives at `{prefix}/{size}.{jpg|webp}`, so clients can derive the
+other sizes and formats from `profile_photo_url`.
+
+If a user uploads again before the previous photo finished processing, only
+the newest upload is applied; stale tasks clean up after themselves.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+from io import BytesIO
+from typing import BinaryIO, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis import get_redis_client
+from app.models.user import User
+from app.services import storage
+from app.services.notifications import publish_to_user
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = (64, 200, 500)
+# format -> (extension, content type, save options)
+VARIANT_FORMATS = {
+    "JPEG": ("jpg", "image/jpeg", {"quality": 85, "optimize": True, "progressive": True}),
+    "WEBP": ("webp", "image/webp", {"quality": 80, "method": 4}),
+}
+PRIMARY_VARIANT = "500.jpg"
+ORIGINAL_NAME = "original"
+MAX_IMAGE_PIXELS = 40_000_000
+
+PENDING_PREFIX = "profile_photo_pending"
+PENDING_TTL_SECONDS = 60 * 60
+
+
+def _get_redis() -> Redis:
+    return get_redis_client()
+
+
+class InvalidImageError(ValueError):
+    """Raised when an upload is not a decodable image of acceptable size."""
+
+
+def validate_image(file_obj: BinaryIO) -> None:
+    """Check the image header (format and dimensions) without decoding pixels."""
+    file_obj.seek(0)
+    try:
+        with Image.open(file_obj) as image:
+            width, height = image.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise InvalidImageError("Invalid image file") from exc
+    finally:
+        file_obj.seek(0)
+    if width * height > MAX_IMAGE_PIXELS:
+        raise InvalidImageError("Image dimensions too large")
+
+
+def new_photo_prefix(user_id: int) -> str:
+    return f"profiles/{user_id}/{uuid.uuid4().hex}"
+
+
+def original_key(prefix: str) -> str:
+    return f"{prefix}/{ORIGINAL_NAME}"
+
+
+def variant_names() -> list[str]:
+    return [f"{size}.{ext}" for size in VARIANT_SIZES for ext, _, _ in VARIANT_FORMATS.values()]
+
+
+def render_variants(data: bytes) -> dict[str, tuple[bytes, str]]:
+    """Render every size/format; returns {name: (bytes, content type)}."""
+    largest = max(VARIANT_SIZES)
+    with Image.open(BytesIO(data)) as source:
+        # JPEG can decode at a reduced scale directly, which is much cheaper.
+        source.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(source).convert("RGB")
+
+    variants: dict[str, tuple[bytes, str]] = {}
+    for size in sorted(VARIANT_SIZES, reverse=True):
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for image_format, (ext, content_type, options) in VARIANT_FORMATS.items():
+            output = BytesIO()
+            image.save(output, format=image_format, **options)
+            variants[f"{size}.{ext}"] = (output.getvalue(), content_type)
+    return variants
+
+
+def photo_keys(url: str) -> list[str]:
+    """Every S3 key that belongs to the photo at `url` (all variants if known)."""
+    key = storage.key_from_url(url)
+    if key is None:
+        return []
+    prefix, _, name = key.rpartition("/")
+    if name == PRIMARY_VARIANT:
+        return [f"{prefix}/{variant}" for variant in variant_names()]
+    return [key]
+
+
+def delete_photo(url: Optional[str]) -> None:
+    """Best-effort removal of a stored profile photo and its variants."""
+    if not url or not settings.AWS_S3_BUCKET:
+        return
+    try:
+        storage.delete_files(settings.AWS_S3_BUCKET, photo_keys(url))
+    except Exception:
+        logger.warning("Failed to delete profile photo %s", url)
+
+
+def mark_pending(user_id: int, prefix: str) -> None:
+    """Record `prefix` as the user's newest upload so older tasks stand down."""
+    try:
+        _get_redis().setex(f"{PENDING_PREFIX}:{user_id}", PENDING_TTL_SECONDS, prefix)
+    except RedisError:
+        logger.warning("Could not record pending profile photo for user %s", user_id)
+
+
+def _is_superseded(user_id: int, prefix: str) -> bool:
+    try:
+        pending = _get_redis().get(f"{PENDING_PREFIX}:{user_id}")
+    except RedisError:
+        return False
+    return pending is not None and pending != prefix
+
+
+def process_profile_photo(db: Session, user_id: int, prefix: str) -> Optional[str]:
+    """Render and publish the upload stored under `prefix`; returns the new URL."""
+    bucket = settings.AWS_S3_BUCKET
+    source_key = original_key(prefix)
+
+    if _is_superseded(user_id, prefix):
+        storage.delete_file(bucket, source_key)
+        return None
+
+    try:
+        variants = render_variants(storage.download_bytes(bucket, source_key))
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        logger.warning("Discarding undecodable profile photo %s", source_key)
+        storage.delete_file(bucket, source_key)
+        return None
+
+    for name, (data, content_type) in variants.items():
+        storage.upload_bytes(data, bucket, f"{prefix}/{name}", content_type)
+    url = storage.public_url(bucket, f"{prefix}/{PRIMARY_VARIANT}")
+
+    user = db.get(User, user_id)
+    if user is None or _is_superseded(user_id, prefix):
+        storage.delete_files(bucket, [f"{prefix}/{name}" for name in variants] + [source_key])
+        return None
+
+    previous_url, user.profile_photo_url = user.profile_photo_url, url
+    db.commit()
+
+    delete_photo(previous_url)
+    storage.delete_file(bucket, source_key)
+    publish_to_user(user_id, "profile_photo_ready", {"profile_photo_url": url})
+    return url
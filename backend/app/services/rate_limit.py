@@ -1,39 +1,299 @@
-"""Simple Redis-backed rate limiting utilities."""
+"""Redis-backed token-bucket rate limiting.
 
-from __future__ import annotations
+Each limit is a bucket of `limit` tokens that refills continuously over
+`window_seconds`. A hit is decided by one Lua script, so the refill, the take
+and the TTL update happen atomically in a single round trip, with Redis' own
+clock shared by every worker. Unlike a fixed INCR/EXPIRE counter, a steady
+abuser never gets a fresh window, and every decision comes with the remaining
+quota and the time until the next token, for `X-RateLimit-*` and `Retry-After`.
 
-from typing import Optional
+Each process also keeps a bounded local mirror of the buckets it has seen.
+A process only sees a subset of the hits Redis sees, so when the local bucket
+is empty (or a recent Redis decision said "retry later") the global one is
+too, and the request is refused without touching Redis. A flood from one
+client is therefore shed in-process.
 
-from fastapi import HTTPException, status
+Use `check_rate_limit` inside an endpoint, or `RateLimit(...)` as a route
+dependency to also emit the headers on successful responses.
+"""
 
+# No `from __future__ import annotations`: FastAPI inspects RateLimit.__call__'s
+# annotations at runtime and cannot resolve postponed ones on an instance.
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from ipaddress import IPv4Network, IPv6Network, ip_address, ip_network
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from redis.exceptions import NoScriptError, RedisError
+
+from app.core.config import settings
 from app.core.redis import get_redis_client
 
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_PREFIX = "ratelimit"
+
+# KEYS[1] = bucket hash; ARGV = capacity, window (ms), cost.
+# Returns {allowed, remaining, retry_after_ms, reset_ms}.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local rate = capacity / window_ms
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) / rate)
+end
+
+local reset = math.ceil((capacity - tokens) / rate)
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.max(reset, 1))
+return {allowed, math.floor(tokens), retry_after, reset}
+"""
+TOKEN_BUCKET_SHA = hashlib.sha1(TOKEN_BUCKET_LUA.encode()).hexdigest()
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of one rate-limit check."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after_seconds: float
+    reset_seconds: float
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_seconds)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after_seconds)))
+        return headers
+
+
+class _LocalBucket:
+    __slots__ = ("tokens", "updated_at", "blocked_until")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated_at = now
+        self.blocked_until = 0.0
+
+
+class _LocalPrefilter:
+    """Per-process token buckets that can only ever be fuller than Redis' ones."""
+
+    def __init__(self, max_keys: int):
+        self._max_keys = max_keys
+        self._buckets: OrderedDict[str, _LocalBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: str, limit: int, window_seconds: float, now: float) -> _LocalBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _LocalBucket(limit, now)
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            rate = limit / window_seconds
+            bucket.tokens = min(limit, bucket.tokens + (now - bucket.updated_at) * rate)
+            bucket.updated_at = now
+        return bucket
+
+    def check(
+        self, key: str, limit: int, window_seconds: float, cost: int
+    ) -> Optional[RateLimitResult]:
+        """Return a denial if the request can be refused locally, else None."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(key, limit, window_seconds, now)
+            rate = limit / window_seconds
+            if bucket.blocked_until > now:
+                retry_after = bucket.blocked_until - now
+            elif bucket.tokens < cost:
+                retry_after = (cost - bucket.tokens) / rate
+            else:
+                return None
+            return RateLimitResult(
+                allowed=False,
+                limit=limit,
+                remaining=0,
+                retry_after_seconds=retry_after,
+                reset_seconds=(limit - bucket.tokens) / rate,
+            )
+
+    def record(
+        self, key: str, limit: int, window_seconds: float, cost: int, result: RateLimitResult
+    ) -> None:
+        """Mirror a Redis decision: spend the tokens, or block until the retry time."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(key, limit, window_seconds, now)
+            if result.allowed:
+                # Only hits Redis accepted are spent, so local >= global always holds.
+                bucket.tokens = max(0.0, bucket.tokens - cost)
+            else:
+                bucket.blocked_until = now + result.retry_after_seconds
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+_prefilter = _LocalPrefilter(settings.RATE_LIMIT_LOCAL_MAX_KEYS)
+
+
+def reset_local_buckets() -> None:
+    """Forget this process' local bucket state (tests, config reloads)."""
+    _prefilter.clear()
+
+
+def _run_token_bucket(redis_key: str, limit: int, window_seconds: float, cost: int) -> list[int]:
+    redis = get_redis_client()
+    args = (limit, int(window_seconds * 1000), cost)
+    try:
+        return redis.evalsha(TOKEN_BUCKET_SHA, 1, redis_key, *args)
+    except NoScriptError:
+        # First use on this Redis (or after SCRIPT FLUSH); EVAL also caches the script.
+        return redis.eval(TOKEN_BUCKET_LUA, 1, redis_key, *args)
+
+
+def hit(key: str, limit: int, window_seconds: float, cost: int = 1) -> RateLimitResult:
+    """Take `cost` tokens from the bucket `key` and report the outcome.
+
+    If Redis is unavailable the request is allowed (only the local pre-filter
+    applies), so an outage degrades limiting rather than the API.
+    """
+    local_denial = _prefilter.check(key, limit, window_seconds, cost)
+    if local_denial is not None:
+        return local_denial
+
+    try:
+        allowed, remaining, retry_after_ms, reset_ms = _run_token_bucket(
+            f"{RATE_LIMIT_PREFIX}:{key}", limit, window_seconds, cost
+        )
+    except RedisError:
+        logger.warning("Rate limiter unavailable; allowing %s", key)
+        result = RateLimitResult(True, limit, limit, 0.0, 0.0)
+        _prefilter.record(key, limit, window_seconds, cost, result)
+        return result
+
+    result = RateLimitResult(
+        allowed=bool(allowed),
+        limit=limit,
+        remaining=int(remaining),
+        retry_after_seconds=int(retry_after_ms) / 1000,
+        reset_seconds=int(reset_ms) / 1000,
+    )
+    _prefilter.record(key, limit, window_seconds, cost, result)
+    return result
+
 
 def check_rate_limit(
     key: str,
     limit: int,
     window_seconds: int,
     error_message: Optional[str] = None,
-) -> None:
-    """Increment rate counter and raise if over limit.
+) -> RateLimitResult:
+    """Take one token and raise 429 (with Retry-After) if the bucket is empty.
 
     Args:
         key: Identifier (e.g., email or ip+email) used as the Redis key suffix.
-        limit: Max allowed hits within the window.
-        window_seconds: Rolling window in seconds.
+        limit: Burst size; the bucket refills `limit` tokens per window.
+        window_seconds: Time to refill an empty bucket.
         error_message: Optional custom message for the 429 response.
     """
-    redis = get_redis_client()
-    redis_key = f"ratelimit:{key}"
-
-    # Pipeline to increment and set expiry atomically.
-    pipeline = redis.pipeline()
-    pipeline.incr(redis_key)
-    pipeline.expire(redis_key, window_seconds)
-    current, _ = pipeline.execute()
-
-    if int(current) > limit:
+    result = hit(key, limit, window_seconds)
+    if not result.allowed:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail=error_message or "Too many requests, please try again later.",
+            headers=result.headers(),
+        )
+    return result
+
+
+@lru_cache(maxsize=8)
+def _trusted_networks(proxies: tuple[str, ...]) -> tuple[IPv4Network | IPv6Network, ...]:
+    return tuple(ip_network(proxy, strict=False) for proxy in proxies)
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _trusted_networks(tuple(settings.TRUSTED_PROXIES)))
+
+
+def client_ip(request: Request) -> str:
+    """Default rate-limit key: the client address.
+
+    When the peer is a trusted proxy (TRUSTED_PROXIES), the client is the
+    address it reports: X-Real-IP, which nginx always overwrites, else the last
+    X-Forwarded-For hop (earlier hops are client-supplied).
+    """
+    peer = request.client.host if request.client else None
+    if peer and _is_trusted_proxy(peer):
+        forwarded = (
+            request.headers.get("x-real-ip")
+            or request.headers.get("x-forwarded-for", "").split(",")[-1]
+        )
+        if forwarded.strip():
+            return forwarded.strip()
+    return peer or "unknown"
+
+
+class RateLimit:
+    """Route dependency applying a token bucket and emitting X-RateLimit-* headers.
+
+    Example:
+        @router.post("/login", dependencies=[Depends(RateLimit("login_ip", 30, 300))])
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        window_seconds: int,
+        key_func: Callable[[Request], str] = client_ip,
+        error_message: Optional[str] = None,
+    ):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.key_func = key_func
+        self.error_message = error_message
+
+    def __call__(self, request: Request, response: Response) -> RateLimitResult:
+        result = check_rate_limit(
+            f"{self.name}:{self.key_func(request)}",
+            self.limit,
+            self.window_seconds,
+            self.error_message,
         )
+        response.headers.update(result.headers())
+        return result
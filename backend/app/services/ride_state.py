@@ -0,0 +1,201 @@
+"""Ride status state machine.
+
+A ride moves forward through RIDE_FLOW until it is completed or cancelled,
+which are both terminal. Steps may be skipped (a driver who never taps
+"arrived"), but a ride never moves backwards, e.g. COMPLETED -> ACCEPTED.
+
+`transition` applies a move as one conditional UPDATE guarded by the allowed
+source statuses, so stale or concurrent requests cannot apply an illegal move.
+The same statement
+
+* stamps pickup_time, dropoff_time and completed_at,
+* folds in the compacted location trail,
+* moves the ride request to the matching status, and
+* returns the rider's auto-donation opt-in,
+
+so a transition is a single round trip on PostgreSQL (a data-modifying CTE).
+SQLite, used by the tests, has no such CTEs and takes a second UPDATE for the
+ride request.
+
+A successful move returns a `RideStatusChanged` domain event, which the
+caller publishes with `publish` once the transaction has committed.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models.ride import Ride, RideStatus
+from app.models.ride_request import RideRequest, RideRequestStatus
+from app.models.user import User
+from app.services.notifications import publish_ride_event
+
+RIDE_FLOW = (
+    RideStatus.ACCEPTED,
+    RideStatus.DRIVER_ENROUTE,
+    RideStatus.ARRIVED,
+    RideStatus.PICKED_UP,
+    RideStatus.IN_PROGRESS,
+    RideStatus.COMPLETED,
+)
+TERMINAL_STATUSES = frozenset({RideStatus.COMPLETED, RideStatus.CANCELLED})
+
+# Allowed moves: any later step of the flow, or cancellation before the end.
+TRANSITIONS: dict[RideStatus, frozenset[RideStatus]] = {
+    status: frozenset(RIDE_FLOW[index + 1 :]) | {RideStatus.CANCELLED}
+    for index, status in enumerate(RIDE_FLOW)
+    if status not in TERMINAL_STATUSES
+}
+TRANSITIONS.update({status: frozenset() for status in TERMINAL_STATUSES})
+
+# The ride request mirrors the ride at a coarser grain.
+REQUEST_STATUS = {
+    RideStatus.ACCEPTED: RideRequestStatus.ACCEPTED,
+    RideStatus.DRIVER_ENROUTE: RideRequestStatus.ACCEPTED,
+    RideStatus.ARRIVED: RideRequestStatus.ACCEPTED,
+    RideStatus.PICKED_UP: RideRequestStatus.ACCEPTED,
+    RideStatus.IN_PROGRESS: RideRequestStatus.IN_PROGRESS,
+    RideStatus.COMPLETED: RideRequestStatus.COMPLETED,
+    RideStatus.CANCELLED: RideRequestStatus.CANCELLED,
+}
+
+# Statuses at which the rider is known to be on board.
+_PICKED_UP_STATUSES = {RideStatus.PICKED_UP, RideStatus.IN_PROGRESS}
+
+
+class InvalidTransitionError(ValueError):
+    """Raised for a status change the state machine does not allow."""
+
+    def __init__(self, current: RideStatus, target: RideStatus):
+        super().__init__(f"Cannot move a {current.value} ride to {target.value}")
+        self.current = current
+        self.target = target
+
+
+def sources(target: RideStatus) -> list[RideStatus]:
+    """Statuses a ride may move to `target` from."""
+    return [status for status, targets in TRANSITIONS.items() if target in targets]
+
+
+def check_transition(current: RideStatus, target: RideStatus) -> None:
+    """Raise InvalidTransitionError unless `current -> target` is allowed."""
+    if target not in TRANSITIONS[RideStatus(current)]:
+        raise InvalidTransitionError(RideStatus(current), target)
+
+
+@dataclass(frozen=True)
+class RideStatusChanged:
+    """Domain event: a ride moved to a new status."""
+
+    ride_id: int
+    ride_request_id: int
+    driver_id: int
+    rider_id: int
+    status: RideStatus
+    accepted_at: datetime
+    pickup_time: Optional[datetime]
+    dropoff_time: Optional[datetime]
+    completed_at: Optional[datetime]
+    auto_donation_enabled: bool
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+
+def transition(
+    db: Session,
+    *,
+    ride_id: int,
+    driver_id: int,
+    target: RideStatus,
+    actual_pickup: Any = None,
+    actual_dropoff: Any = None,
+) -> Optional[RideStatusChanged]:
+    """Move the driver's ride to `target` (no commit).
+
+    `actual_pickup` / `actual_dropoff` are points from the compacted location
+    trail; an already recorded pickup point is kept. Returns None when nothing
+    was updated: the ride does not exist, belongs to another driver, or may not
+    move to `target` from its current status.
+    """
+    now = datetime.utcnow()
+    values: dict[str, Any] = {"status": target.value}
+    if target in _PICKED_UP_STATUSES:
+        values["pickup_time"] = func.coalesce(Ride.pickup_time, now)
+    if target == RideStatus.COMPLETED:
+        values["dropoff_time"] = now
+        values["completed_at"] = now
+    if actual_pickup is not None:
+        values["actual_pickup_location"] = func.coalesce(
+            Ride.actual_pickup_location, literal(actual_pickup, Ride.actual_pickup_location.type)
+        )
+    if actual_dropoff is not None:
+        values["actual_dropoff_location"] = actual_dropoff
+
+    move_ride = (
+        update(Ride)
+        .where(
+            Ride.id == ride_id,
+            Ride.driver_id == driver_id,
+            Ride.status.in_([status.value for status in sources(target)]),
+        )
+        .values(**values)
+        .returning(
+            Ride.id,
+            Ride.ride_request_id,
+            Ride.driver_id,
+            Ride.rider_id,
+            Ride.status,
+            Ride.accepted_at,
+            Ride.pickup_time,
+            Ride.dropoff_time,
+            Ride.completed_at,
+            select(User.auto_donation_enabled)
+            .where(User.id == Ride.rider_id)
+            .scalar_subquery()
+            .label("auto_donation_enabled"),
+        )
+    )
+    move_request = update(RideRequest).values(status=REQUEST_STATUS[target].value, updated_at=now)
+
+    if db.get_bind().dialect.name == "postgresql":
+        moved = move_ride.cte("moved_ride")
+        row = db.execute(
+            move_request.where(RideRequest.id == moved.c.ride_request_id)
+            .returning(*moved.c)
+            .execution_options(synchronize_session=False)
+        ).first()
+    else:
+        row = db.execute(move_ride.execution_options(synchronize_session=False)).first()
+        if row is not None:
+            db.execute(
+                move_request.where(RideRequest.id == row.ride_request_id).execution_options(
+                    synchronize_session=False
+                )
+            )
+    if row is None:
+        return None
+
+    return RideStatusChanged(
+        ride_id=row.id,
+        ride_request_id=row.ride_request_id,
+        driver_id=row.driver_id,
+        rider_id=row.rider_id,
+        status=RideStatus(row.status),
+        accepted_at=row.accepted_at,
+        pickup_time=row.pickup_time,
+        dropoff_time=row.dropoff_time,
+        completed_at=row.completed_at,
+        auto_donation_enabled=bool(row.auto_donation_enabled),
+    )
+
+
+def publish(event: RideStatusChanged) -> None:
+    """Push the event to the ride's channel (call after commit; never raises)."""
+    publish_ride_event(event.ride_id, "ride_status", {"status": event.status.value})
@@ -0,0 +1,143 @@
+"""Live driver location trail for in-flight rides.
+
+Driver apps post GPS samples in batches. Each batch is appended to a bounded
+per-ride ring buffer in Redis (RPUSH + LTRIM), the newest sample is fanned out
+on the ride's pub/sub channel, and the driver's live location index is
+refreshed. Nothing is written to Postgres until the ride finishes, when the
+trail is compacted into the ride's actual pickup/dropoff points.
+
+Sample times come from the device, so they are clamped to a window ending at
+the server's clock; the live index is always stamped with server time. The
+first on-board sample is kept under its own key, since a long ride pushes it
+out of the ring buffer.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from redis import Redis
+
+from app.core.config import settings
+from app.core.redis import get_redis_client
+from app.models.ride import RideStatus
+from app.services import location_index
+from app.services.notifications import publish_ride_event
+
+TRAIL_PREFIX = "ride_trail"
+TRAIL_TTL_SECONDS = 24 * 60 * 60
+
+# Statuses during which the rider is in the car; the first sample taken in one of
+# these marks the actual pickup point.
+ONBOARD_STATUSES = {RideStatus.PICKED_UP, RideStatus.IN_PROGRESS}
+
+
+@dataclass(frozen=True)
+class TrailSample:
+    latitude: float
+    longitude: float
+    recorded_at: float
+    status: str
+
+
+def _get_redis() -> Redis:
+    return get_redis_client()
+
+
+def trail_key(ride_id: int) -> str:
+    return f"{TRAIL_PREFIX}:{ride_id}"
+
+
+def pickup_key(ride_id: int) -> str:
+    return f"{TRAIL_PREFIX}:{ride_id}:pickup"
+
+
+def _epoch_seconds(moment: datetime) -> float:
+    """Unix time of `moment`; naive datetimes are UTC, as everywhere in this app."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def append_samples(
+    *,
+    ride_id: int,
+    driver_id: int,
+    ride_status: str,
+    samples: Iterable[tuple[float, float, Optional[datetime]]],
+) -> int:
+    """Append `(latitude, longitude, recorded_at)` samples to a ride's trail.
+
+    Returns the number of samples stored.
+    """
+    now = time.time()
+    oldest = now - settings.RIDE_SAMPLE_MAX_AGE_SECONDS
+    batch = sorted(
+        (
+            {
+                "latitude": latitude,
+                "longitude": longitude,
+                "recorded_at": (
+                    min(max(_epoch_seconds(recorded_at), oldest), now) if recorded_at else now
+                ),
+                "status": ride_status,
+            }
+            for latitude, longitude, recorded_at in samples
+        ),
+        key=lambda sample: sample["recorded_at"],
+    )
+    if not batch:
+        return 0
+
+    key = trail_key(ride_id)
+    pipe = _get_redis().pipeline(transaction=False)
+    pipe.rpush(key, *(json.dumps(sample) for sample in batch))
+    pipe.ltrim(key, -settings.RIDE_TRAIL_MAX_SAMPLES, -1)
+    pipe.expire(key, TRAIL_TTL_SECONDS)
+    if ride_status in ONBOARD_STATUSES:
+        pipe.set(pickup_key(ride_id), json.dumps(batch[0]), nx=True, ex=TRAIL_TTL_SECONDS)
+    pipe.execute()
+
+    latest = batch[-1]
+    publish_ride_event(
+        ride_id,
+        "driver_location",
+        {
+            "latitude": latest["latitude"],
+            "longitude": latest["longitude"],
+            "recorded_at": latest["recorded_at"],
+        },
+    )
+    location_index.record_driver_location(
+        driver_id, longitude=latest["longitude"], latitude=latest["latitude"], timestamp=now
+    )
+    return len(batch)
+
+
+def get_trail(ride_id: int) -> list[TrailSample]:
+    """Return the buffered trail for a ride, oldest first."""
+    return [
+        TrailSample(**json.loads(raw)) for raw in _get_redis().lrange(trail_key(ride_id), 0, -1)
+    ]
+
+
+def compact_trail(ride_id: int) -> tuple[Optional[TrailSample], Optional[TrailSample]]:
+    """Reduce a ride's trail to its `(pickup, dropoff)` samples.
+
+    Pickup is the first sample recorded once the rider was on board (falling
+    back to the oldest buffered sample); dropoff is the last sample.
+    """
+    trail = get_trail(ride_id)
+    if not trail:
+        return None, None
+    pickup = _get_redis().get(pickup_key(ride_id))
+    return (TrailSample(**json.loads(pickup)) if pickup else trail[0]), trail[-1]
+
+
+def discard_trail(ride_id: int) -> None:
+    """Drop a ride's buffered trail once it has been compacted or abandoned."""
+    _get_redis().delete(trail_key(ride_id), pickup_key(ride_id))
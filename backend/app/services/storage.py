@@ -2,8 +2,8 @@
 
 from __future__ import annotations
 
-import uuid
-from typing import BinaryIO, Optional
+from functools import lru_cache
+from typing import BinaryIO, Iterable, Optional
 
 import boto3
 from botocore.client import Config
@@ -11,23 +11,28 @@
 from app.core.config import settings
 
 
+@lru_cache(maxsize=1)
 def _get_s3_client():
+    # boto3 clients are thread-safe; build one per process and reuse its connection pool.
     return boto3.client(
         "s3",
         region_name=settings.AWS_REGION,
         aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
         aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        config=Config(signature_version="s3v4"),
+        config=Config(signature_version="s3v4", max_pool_connections=settings.AWS_S3_MAX_POOL),
     )
 
 
-def generate_profile_photo_key(user_id: int, filename: str) -> str:
-    """Generate a unique S3 key for a user's profile photo."""
-    ext = ""
-    if "." in filename:
-        ext = filename.rsplit(".", 1)[1].lower()
-    unique_id = uuid.uuid4().hex
-    return f"profiles/{user_id}/{unique_id}.{ext or 'jpg'}"
+def public_url(bucket: str, key: str) -> str:
+    """Public URL of an object in `bucket`."""
+    return f"https://{bucket}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
+
+
+def key_from_url(url: str) -> Optional[str]:
+    """Extract the object key from a URL produced by `public_url`."""
+    # Expecting URLs like https://bucket.s3.region.amazonaws.com/key
+    parts = url.split(".amazonaws.com/", 1)
+    return parts[1] if len(parts) == 2 else None
 
 
 def upload_file_obj(
@@ -45,10 +50,34 @@ def upload_file_obj(
 
     s3.upload_fileobj(file_obj, bucket, key, ExtraArgs=extra_args)
 
-    return f"https://{bucket}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
+    return public_url(bucket, key)
+
+
+def upload_bytes(data: bytes, bucket: str, key: str, content_type: str) -> str:
+    """Upload a small in-memory object with a single PUT and return its public URL."""
+    _get_s3_client().put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=data,
+        ContentType=content_type,
+        CacheControl="public, max-age=31536000, immutable",
+    )
+    return public_url(bucket, key)
+
+
+def download_bytes(bucket: str, key: str) -> bytes:
+    """Read an object from S3 into memory."""
+    return _get_s3_client().get_object(Bucket=bucket, Key=key)["Body"].read()
 
 
 def delete_file(bucket: str, key: str) -> None:
     """Delete an object from S3."""
     s3 = _get_s3_client()
     s3.delete_object(Bucket=bucket, Key=key)
+
+
+def delete_files(bucket: str, keys: Iterable[str]) -> None:
+    """Delete several objects in one request (S3 accepts up to 1000 per call)."""
+    objects = [{"Key": key} for key in keys]
+    if objects:
+        _get_s3_client().delete_objects(Bucket=bucket, Delete={"Objects": objects, "Quiet": True})
@@ -0,0 +1,174 @@
+"""Cached authorization principal for authenticated requests.
+
+Resolving the caller on every request used to cost a `SELECT * FROM users`.
+Most endpoints only need the caller's id, role and active/verified flags, so
+those are cached as a small `UserPrincipal` in two tiers:
+
+* an in-process LRU with a very short TTL (no network hop at all), and
+* an optional Redis tier shared by every API worker.
+
+Writes that change any of these fields must call `invalidate_user_principal`.
+Invalidation clears Redis and the local tier of the process handling the write;
+other processes may serve their local copy for at most
+`USER_PRINCIPAL_LOCAL_TTL_SECONDS`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import get_async_redis_client, get_redis_client
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_PREFIX = "user_principal"
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """The subset of a user needed to authenticate and authorize a request."""
+
+    id: int
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+
+
+class _LocalPrincipalCache:
+    """Thread-safe LRU of principals with a per-entry TTL."""
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._entries: OrderedDict[int, tuple[float, UserPrincipal]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[UserPrincipal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def set(self, principal: UserPrincipal, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic() + ttl_seconds, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_local_cache = _LocalPrincipalCache(settings.USER_PRINCIPAL_LOCAL_CACHE_SIZE)
+
+
+def _get_redis() -> Redis:
+    return get_redis_client()
+
+
+def _get_async_redis() -> AsyncRedis:
+    return get_async_redis_client()
+
+
+def _redis_key(user_id: int) -> str:
+    return f"{PRINCIPAL_PREFIX}:{user_id}"
+
+
+def _decode(raw: Optional[str]) -> Optional[UserPrincipal]:
+    if not raw:
+        return None
+    try:
+        data = json.loads(raw)
+        return UserPrincipal(
+            id=int(data["id"]),
+            role=UserRole(data["role"]),
+            is_active=bool(data["is_active"]),
+            is_verified=bool(data["is_verified"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _encode(principal: UserPrincipal) -> str:
+    data = asdict(principal)
+    data["role"] = principal.role.value
+    return json.dumps(data)
+
+
+async def get_user_principal(db: AsyncSession, user_id: int) -> Optional[UserPrincipal]:
+    """Return the principal for `user_id`, or None if the user does not exist."""
+    principal = _local_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    use_redis = settings.USER_PRINCIPAL_REDIS_CACHE
+    if use_redis:
+        try:
+            principal = _decode(await _get_async_redis().get(_redis_key(user_id)))
+        except RedisError:
+            use_redis = False
+
+    if principal is None:
+        result = await db.execute(
+            select(User.id, User.role, User.is_active, User.is_verified).where(User.id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        principal = UserPrincipal(
+            id=row.id,
+            role=UserRole(row.role),
+            is_active=bool(row.is_active),
+            is_verified=bool(row.is_verified),
+        )
+        if use_redis:
+            try:
+                await _get_async_redis().setex(
+                    _redis_key(user_id), settings.USER_PRINCIPAL_CACHE_SECONDS, _encode(principal)
+                )
+            except RedisError:
+                logger.debug("Could not cache principal for user %s", user_id)
+
+    _local_cache.set(principal, settings.USER_PRINCIPAL_LOCAL_TTL_SECONDS)
+    return principal
+
+
+def invalidate_user_principal(user_id: int) -> None:
+    """Drop any cached principal for `user_id` after its auth fields change."""
+    _local_cache.pop(user_id)
+    if not settings.USER_PRINCIPAL_REDIS_CACHE:
+        return
+    try:
+        _get_redis().delete(_redis_key(user_id))
+    except RedisError:
+        logger.warning("Could not invalidate cached principal for user %s", user_id)
+
+
+def clear_local_cache() -> None:
+    """Empty this process's principal cache."""
+    _local_cache.clear()
@@ -0,0 +1,19 @@
+"""Geospatial helpers shared by location-aware endpoints and services."""
+
+from __future__ import annotations
+
+from geoalchemy2 import Geography, WKTElement
+from sqlalchemy import cast
+from sqlalchemy.sql.elements import ColumnElement
+
+METERS_PER_MILE = 1609.34
+
+
+def to_point(longitude: float, latitude: float) -> WKTElement:
+    """Convert lat/long to PostGIS-compatible POINT."""
+    return WKTElement(f"POINT({longitude} {latitude})", srid=4326)
+
+
+def to_geography(longitude: float, latitude: float) -> ColumnElement:
+    """Build a geography POINT expression for spatial predicates (ST_DWithin, <->)."""
+    return cast(to_point(longitude, latitude), Geography(geometry_type="POINT", srid=4326))
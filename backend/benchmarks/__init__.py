@@ -0,0 +1 @@
+"""Performance benchmarks (run manually; not collected by pytest)."""
@@ -0,0 +1,184 @@
+"""Concurrent ride-acceptance benchmark.
+
+Seeds one rider, N drivers and M pending ride requests, then for every request
+releases all N drivers at once (behind a barrier) to hit
+`POST /rides/{id}/accept` simultaneously. Reports throughput, latency
+percentiles and status-code counts, and checks correctness: each request must
+have exactly one 201 winner, every loser must get a 409, and the database must
+hold exactly one ride per request owned by the winning driver.
+
+Run against a disposable PostGIS database and a running API server that share
+the same DATABASE_URL:
+
+    uvicorn app.main:app --workers 4 &
+    python -m benchmarks.accept_concurrency --base-url http://localhost:8000 \\
+        --drivers 50 --requests 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import httpx
+from geoalchemy2 import WKTElement
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.session import Base, SessionLocal, engine
+from app.models.ride import Ride
+from app.models.ride_request import RideRequest
+from app.models.user import User
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _seed(drivers: int, requests: int) -> tuple[list[int], list[int]]:
+    """Create the rider, drivers and pending requests; return (driver_ids, request_ids)."""
+    run_id = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+
+        def user(email: str, role: str) -> User:
+            return User(
+                email=email,
+                password_hash="!",  # nobody logs in; tokens are minted directly
+                first_name="Bench",
+                last_name=role.title(),
+                role=role,
+                is_active=True,
+                is_verified=True,
+            )
+
+        rider = user(f"bench-rider-{run_id}@example.com", "rider")
+        driver_users = [
+            user(f"bench-driver-{run_id}-{i}@example.com", "driver") for i in range(drivers)
+        ]
+        db.add(rider)
+        db.add_all(driver_users)
+        db.flush()
+
+        pickup = WKTElement("POINT(-122.4194 37.7749)", srid=4326)
+        dropoff = WKTElement("POINT(-122.4094 37.7849)", srid=4326)
+        ride_requests = [
+            RideRequest(
+                rider_id=rider.id,
+                destination_type="mass",
+                pickup_location=pickup,
+                destination_location=dropoff,
+                requested_datetime=datetime.utcnow() + timedelta(hours=2),
+                passenger_count=1,
+                status="pending",
+            )
+            for _ in range(requests)
+        ]
+        db.add_all(ride_requests)
+        db.commit()
+        return [d.id for d in driver_users], [r.id for r in ride_requests]
+    finally:
+        db.close()
+
+
+def run(base_url: str, drivers: int, requests: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    driver_ids, request_ids = _seed(drivers, requests)
+    tokens = {driver_id: create_access_token(subject=str(driver_id)) for driver_id in driver_ids}
+
+    latencies: list[float] = []
+    outcomes: Counter[int] = Counter()
+    winners: dict[int, list[int]] = {request_id: [] for request_id in request_ids}
+    lock = threading.Lock()
+
+    limits = httpx.Limits(max_connections=drivers, max_keepalive_connections=drivers)
+    with httpx.Client(base_url=base_url, limits=limits, timeout=30.0) as client:
+
+        def accept(request_id: int, driver_id: int, barrier: threading.Barrier) -> None:
+            barrier.wait()
+            started = time.perf_counter()
+            resp = client.post(
+                f"{settings.API_V1_STR}/rides/{request_id}/accept",
+                headers={"Authorization": f"Bearer {tokens[driver_id]}"},
+            )
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                outcomes[resp.status_code] += 1
+                if resp.status_code == 201:
+                    winners[request_id].append(driver_id)
+
+        wall_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=drivers) as pool:
+            for request_id in request_ids:
+                barrier = threading.Barrier(drivers)
+                futures = [
+                    pool.submit(accept, request_id, driver_id, barrier) for driver_id in driver_ids
+                ]
+                for future in futures:
+                    future.result()
+        wall = time.perf_counter() - wall_started
+
+    db = SessionLocal()
+    try:
+        rides = db.query(Ride.ride_request_id, Ride.driver_id).filter(
+            Ride.ride_request_id.in_(request_ids)
+        )
+        stored = {}
+        for ride_request_id, driver_id in rides:
+            stored.setdefault(ride_request_id, []).append(driver_id)
+    finally:
+        db.close()
+
+    errors = []
+    for request_id in request_ids:
+        if len(winners[request_id]) != 1:
+            errors.append(f"request {request_id}: {len(winners[request_id])} winners")
+        elif stored.get(request_id) != winners[request_id]:
+            errors.append(f"request {request_id}: stored rides {stored.get(request_id)}")
+    unexpected = {code: n for code, n in outcomes.items() if code not in (201, 409)}
+    if unexpected:
+        errors.append(f"unexpected status codes: {unexpected}")
+
+    attempts = sum(outcomes.values())
+    print(f"accepts attempted : {attempts} ({drivers} drivers x {requests} requests)")
+    print(f"wall time         : {wall:.3f}s")
+    print(f"throughput        : {attempts / wall:.1f} accepts/s")
+    print(
+        "latency ms        : "
+        f"p50={_percentile(latencies, 50) * 1000:.1f} "
+        f"p95={_percentile(latencies, 95) * 1000:.1f} "
+        f"p99={_percentile(latencies, 99) * 1000:.1f} "
+        f"max={max(latencies, default=0) * 1000:.1f}"
+    )
+    print(f"status codes      : {dict(sorted(outcomes.items()))}")
+    if errors:
+        print("CORRECTNESS FAILURES:")
+        for error in errors:
+            print(f"  - {error}")
+        return 1
+    print("correctness       : OK (one winner per request, losers got 409)")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--drivers", type=int, default=20, help="concurrent drivers per request")
+    parser.add_argument("--requests", type=int, default=10, help="pending ride requests to race")
+    args = parser.parse_args()
+    sys.exit(run(args.base_url, args.drivers, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Load-test comparison of async and sync (threadpool) endpoints.
+
+`GET /rides/mine` runs on the async stack (AsyncSession + asyncpg), while
+`GET /rides/assigned` is a sync endpoint of the same shape (one indexed list
+query for the caller) that occupies an AnyIO threadpool thread for the whole
+request. Seeds one user who has --rows ride requests as a rider and --rows
+rides as a driver, then drives both endpoints with the same number of
+concurrent clients and reports throughput and latency percentiles.
+
+The difference shows once concurrency exceeds the threadpool size (40 by
+default) and each query spends real time waiting on Postgres, so run it
+against a server with a single worker and a realistic database:
+
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.async_vs_sync --base-url http://localhost:8000 \\
+        --concurrency 200 --requests 4000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+from geoalchemy2 import WKTElement
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.session import Base, SessionLocal, engine
+from app.models.ride import Ride
+from app.models.ride_request import RideRequest
+from app.models.user import User
+from benchmarks.accept_concurrency import _percentile
+
+ENDPOINTS = {
+    "async /rides/mine": "/rides/mine",
+    "sync /rides/assigned": "/rides/assigned",
+}
+
+
+def _seed(rows: int) -> int:
+    """Create the benchmark user and their rides; return the user's id."""
+    run_id = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+
+        def user(email: str, role: str) -> User:
+            return User(
+                email=email,
+                password_hash="!",
+                first_name="Bench",
+                last_name=role.title(),
+                role=role,
+                is_active=True,
+                is_verified=True,
+            )
+
+        subject = user(f"bench-both-{run_id}@example.com", "both")
+        other = user(f"bench-rider-{run_id}@example.com", "rider")
+        db.add_all([subject, other])
+        db.flush()
+
+        pickup = WKTElement("POINT(-122.4194 37.7749)", srid=4326)
+        dropoff = WKTElement("POINT(-122.4094 37.7849)", srid=4326)
+
+        def ride_request(rider_id: int, status: str) -> RideRequest:
+            return RideRequest(
+                rider_id=rider_id,
+                destination_type="mass",
+                pickup_location=pickup,
+                destination_location=dropoff,
+                requested_datetime=datetime.utcnow() + timedelta(hours=2),
+                passenger_count=1,
+                status=status,
+            )
+
+        mine = [ride_request(subject.id, "pending") for _ in range(rows)]
+        assigned = [ride_request(other.id, "accepted") for _ in range(rows)]
+        db.add_all(mine + assigned)
+        db.flush()
+        db.add_all(
+            Ride(ride_request_id=r.id, driver_id=subject.id, rider_id=other.id, status="accepted")
+            for r in assigned
+        )
+        db.commit()
+        return subject.id
+    finally:
+        db.close()
+
+
+async def _drive(
+    client: httpx.AsyncClient, path: str, requests: int, concurrency: int
+) -> tuple[float, list[float], Counter[int]]:
+    latencies: list[float] = []
+    outcomes: Counter[int] = Counter()
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            resp = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            outcomes[resp.status_code] += 1
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - wall_started, latencies, outcomes
+
+
+async def run(base_url: str, rows: int, requests: int, concurrency: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    token = create_access_token(subject=str(_seed(rows)))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    failed = False
+    async with httpx.AsyncClient(
+        base_url=f"{base_url}{settings.API_V1_STR}",
+        headers={"Authorization": f"Bearer {token}"},
+        limits=limits,
+        timeout=60.0,
+    ) as client:
+        print(f"requests per endpoint: {requests} at concurrency {concurrency} ({rows} rows)")
+        for label, path in ENDPOINTS.items():
+            await _drive(client, path, min(requests, concurrency * 2), concurrency)  # warm-up
+            wall, latencies, outcomes = await _drive(client, path, requests, concurrency)
+            failed |= set(outcomes) != {200}
+            print()
+            print(f"{label}")
+            print(f"  throughput : {len(latencies) / wall:.1f} req/s")
+            print(
+                "  latency ms : "
+                f"p50={_percentile(latencies, 50) * 1000:.1f} "
+                f"p95={_percentile(latencies, 95) * 1000:.1f} "
+                f"p99={_percentile(latencies, 99) * 1000:.1f} "
+                f"max={max(latencies, default=0) * 1000:.1f}"
+            )
+            print(f"  status     : {dict(sorted(outcomes.items()))}")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rows", type=int, default=20, help="rides per endpoint response")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.base_url, args.rows, args.requests, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Login / password-hashing throughput versus hashing pool size.
+
+Three modes:
+
+* In-process (default): for each pool size in --pool-sizes, push --logins
+  bcrypt verifications through a `PasswordHashingPool` from --concurrency
+  threads (standing in for request threads) and report throughput, latency
+  percentiles and rejections. While that runs, a bystander thread measures how
+  long a trivial unit of Python work takes, i.e. how much bcrypt interferes
+  with everything else the API process is doing. Pool size 0 is the old
+  behaviour (bcrypt inline on the calling thread).
+
+      python -m benchmarks.login_throughput --pool-sizes 0,1,2,4 --logins 200
+
+* Handler style (--handlers): for each pool size, runs --logins concurrent
+  logins on an event loop the way a sync endpoint does (`pool.run` inside
+  `run_in_threadpool`) and the way the async auth endpoints do (awaiting
+  `pool.run_async`). It reports the peak number of AnyIO threadpool threads
+  held and how long an unrelated `run_in_threadpool` call (any sync endpoint)
+  waits meanwhile. With the async style the threadpool stays free.
+
+      python -m benchmarks.login_throughput --handlers --pool-sizes 2,4 --logins 200
+
+* HTTP (--base-url): seeds --users verified users and fires --logins
+  concurrent `POST /auth/login` calls at a running server. The pool size is
+  whatever PASSWORD_HASH_WORKERS the server was started with, so run once per
+  configuration. Each user logs in at most a few times to stay under the login
+  rate limit.
+
+      PASSWORD_HASH_WORKERS=4 uvicorn app.main:app --workers 1 &
+      python -m benchmarks.login_throughput --base-url http://localhost:8000 \\
+          --users 100 --logins 300 --concurrency 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import anyio.to_thread
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import security
+from app.core.config import settings
+from app.core.password_pool import PasswordHashingBusyError, PasswordHashingPool
+from app.db.session import Base, SessionLocal, engine
+from app.models.user import User
+from benchmarks.accept_concurrency import _percentile
+
+PASSWORD = "BenchPass123!"
+
+
+def _print_latencies(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<19}: "
+        f"p50={_percentile(samples, 50) * 1000:.1f} "
+        f"p95={_percentile(samples, 95) * 1000:.1f} "
+        f"p99={_percentile(samples, 99) * 1000:.1f} "
+        f"max={max(samples, default=0) * 1000:.1f} ms"
+    )
+
+
+def _bystander(stop: threading.Event, samples: list[float]) -> None:
+    """Time a ~1 ms slice of pure-Python work until stopped."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        total = 0
+        for i in range(20_000):
+            total += i
+        samples.append(time.perf_counter() - started)
+        time.sleep(0.005)
+
+
+def run_in_process(pool_sizes: list[int], logins: int, concurrency: int) -> int:
+    hashed = security.get_password_hash(PASSWORD)
+    print(f"bcrypt rounds      : {settings.BCRYPT_ROUNDS}")
+    print(f"logins per size    : {logins} from {concurrency} threads")
+
+    for workers in pool_sizes:
+        pool = PasswordHashingPool(
+            workers=workers,
+            max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+            timeout_seconds=60,
+        )
+        # Warm the worker processes so start-up cost is not measured.
+        for _ in range(max(workers, 1)):
+            pool.run(security.verify_and_update_password, PASSWORD, hashed)
+
+        latencies: list[float] = []
+        bystander: list[float] = []
+        rejected = 0
+        lock = threading.Lock()
+
+        def login() -> None:
+            nonlocal rejected
+            started = time.perf_counter()
+            try:
+                pool.run(security.verify_and_update_password, PASSWORD, hashed)
+            except PasswordHashingBusyError:
+                with lock:
+                    rejected += 1
+                return
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+        stop = threading.Event()
+        watcher = threading.Thread(target=_bystander, args=(stop, bystander))
+        watcher.start()
+        wall_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(login) for _ in range(logins)]:
+                future.result()
+        wall = time.perf_counter() - wall_started
+        stop.set()
+        watcher.join()
+        pool.shutdown()
+
+        print()
+        print(f"pool size          : {workers or 'inline'}")
+        print(f"throughput         : {len(latencies) / wall:.1f} logins/s ({rejected} rejected)")
+        _print_latencies("login latency", latencies)
+        _print_latencies("bystander ~1ms op", bystander)
+    return 0
+
+
+async def _run_handler_style(
+    pool: PasswordHashingPool, hashed: str, logins: int, style: str
+) -> None:
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    latencies: list[float] = []
+    bystander: list[float] = []
+    peak_threads = 0
+    rejected = 0
+    done = asyncio.Event()
+
+    async def login() -> None:
+        nonlocal rejected
+        started = time.perf_counter()
+        try:
+            if style == "sync":
+                await run_in_threadpool(
+                    pool.run, security.verify_and_update_password, PASSWORD, hashed
+                )
+            else:
+                await pool.run_async(security.verify_and_update_password, PASSWORD, hashed)
+        except PasswordHashingBusyError:
+            rejected += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    async def watch() -> None:
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, int(limiter.borrowed_tokens))
+            started = time.perf_counter()
+            await run_in_threadpool(lambda: None)
+            bystander.append(time.perf_counter() - started)
+            await asyncio.sleep(0.005)
+
+    watcher = asyncio.create_task(watch())
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    wall = time.perf_counter() - wall_started
+    done.set()
+    await watcher
+
+    print(f"handler style      : {style}")
+    print(f"throughput         : {len(latencies) / wall:.1f} logins/s ({rejected} rejected)")
+    print(f"threadpool threads : peak {peak_threads} of {int(limiter.total_tokens)}")
+    _print_latencies("login latency", latencies)
+    _print_latencies("bystander endpoint", bystander)
+
+
+def run_handlers(pool_sizes: list[int], logins: int) -> int:
+    hashed = security.get_password_hash(PASSWORD)
+    print(f"bcrypt rounds      : {settings.BCRYPT_ROUNDS}")
+    print(f"logins per size    : {logins} concurrent on one event loop")
+
+    for workers in pool_sizes:
+        # Admit every login so both styles queue the same amount of work.
+        pool = PasswordHashingPool(workers=workers, max_pending=logins, timeout_seconds=600)
+        for _ in range(max(workers, 1)):
+            pool.run(security.verify_and_update_password, PASSWORD, hashed)
+
+        print()
+        print(f"pool size          : {workers or 'inline'}")
+        for style in ("sync", "async"):
+            asyncio.run(_run_handler_style(pool, hashed, logins, style))
+        pool.shutdown()
+    return 0
+
+
+def _seed_users(count: int) -> list[str]:
+    run_id = uuid.uuid4().hex[:8]
+    password_hash = security.get_password_hash(PASSWORD)
+    emails = [f"bench-login-{run_id}-{i}@example.com" for i in range(count)]
+    db = SessionLocal()
+    try:
+        db.add_all(
+            User(
+                email=email,
+                password_hash=password_hash,
+                first_name="Bench",
+                last_name="Login",
+                role="rider",
+                is_active=True,
+                is_verified=True,
+            )
+            for email in emails
+        )
+        db.commit()
+    finally:
+        db.close()
+    return emails
+
+
+def run_http(base_url: str, users: int, logins: int, concurrency: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    emails = _seed_users(users)
+
+    latencies: list[float] = []
+    outcomes: Counter[int] = Counter()
+    lock = threading.Lock()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    with httpx.Client(base_url=base_url, limits=limits, timeout=60.0) as client:
+
+        def login(i: int) -> None:
+            started = time.perf_counter()
+            resp = client.post(
+                f"{settings.API_V1_STR}/auth/login",
+                data={"username": emails[i % len(emails)], "password": PASSWORD},
+            )
+            elapsed = time.perf_counter() - started
+            with lock:
+                outcomes[resp.status_code] += 1
+                if resp.status_code == 200:
+                    latencies.append(elapsed)
+
+        wall_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(login, i) for i in range(logins)]:
+                future.result()
+        wall = time.perf_counter() - wall_started
+
+    print(f"logins attempted   : {logins} ({users} users, {concurrency} concurrent)")
+    print(f"wall time          : {wall:.3f}s")
+    print(f"throughput         : {len(latencies) / wall:.1f} successful logins/s")
+    _print_latencies("login latency", latencies)
+    print(f"status codes       : {dict(sorted(outcomes.items()))}")
+    return 0 if set(outcomes) <= {200, 503} else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--base-url", help="benchmark a running server instead of in-process")
+    parser.add_argument(
+        "--handlers", action="store_true", help="compare sync and async handler styles"
+    )
+    parser.add_argument("--pool-sizes", default="0,1,2,4", help="comma-separated pool sizes")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=50, help="users to seed (HTTP mode)")
+    args = parser.parse_args()
+
+    if args.base_url:
+        sys.exit(run_http(args.base_url, args.users, args.logins, args.concurrency))
+    pool_sizes = [int(size) for size in args.pool_sizes.split(",")]
+    if args.handlers:
+        sys.exit(run_handlers(pool_sizes, args.logins))
+    sys.exit(run_in_process(pool_sizes, args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
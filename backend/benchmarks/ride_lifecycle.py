@@ -0,0 +1,495 @@
+"""End-to-end load test of the ride lifecycle, with saved baselines.
+
+Every virtual user (VU) runs the whole lifecycle in a loop:
+
+    register a fresh account -> log in a seeded rider -> create a ride request
+    near a parish -> driver lists open requests -> accept -> driver_enroute ->
+    arrived -> picked_up -> in_progress -> completed -> review (with a donation
+    when --donate is set) -> rider lists their rides
+
+Drivers log in once per VU and keep their token, as the app does. The
+population (--riders/--drivers/--parishes, plus --history past ride requests
+with their rides, reviews and donations) is generated by `app.seed_scale`, so
+queries run against realistically sized tables; later runs can reuse it with
+--skip-seed.
+
+Latencies are recorded per route template in log-bucketed histograms (about
+2% resolution) and reported as throughput and percentiles. --save-baseline
+writes the results as JSON; --baseline compares a run against a saved file and
+exits 1 if any endpoint's p95 or the lifecycle throughput regressed by more
+than --tolerance, or if any request failed.
+
+Targets:
+
+* A running server (--base-url). Start PostGIS and Redis, migrate, and run the
+  API (and a worker, so queued tasks do not pile up in Redis):
+
+      docker compose up -d db redis
+      alembic upgrade head
+      uvicorn app.main:app --workers 4 &
+      celery -A app.celery_app worker &
+      python -m benchmarks.ride_lifecycle --base-url http://localhost:8000 \\
+          --riders 10000 --drivers 2000 --parishes 500 \\
+          --concurrency 64 --lifecycles 5000 \\
+          --save-baseline benchmarks/baselines/ride_lifecycle.json
+
+* In-process (--in-process): the app is driven through httpx's ASGI transport
+  in this process, without uvicorn or a network hop. It still uses the
+  DATABASE_URL and REDIS_URL from settings.
+
+Each lifecycle presents its own client address in X-Forwarded-For so the
+per-IP rate limits on register/login apply per simulated client. uvicorn
+honours the header from 127.0.0.1 by default; pass --forwarded-allow-ips for a
+remote load generator.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+from sqlalchemy import select
+
+from app import seed_scale
+from app.core.config import settings
+from app.db.session import Base, SessionLocal, engine
+from app.models.user import User
+from app.seed_scale import ScaleConfig
+
+PASSWORD = seed_scale.PASSWORD
+EMAIL_PREFIX = "bench"
+STATUS_SEQUENCE = ("driver_enroute", "arrived", "picked_up", "in_progress", "completed")
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram; bucket i covers (FLOOR*GROWTH^(i-1), FLOOR*GROWTH^i]."""
+
+    FLOOR = 1e-4  # seconds
+    GROWTH = 1.02
+
+    def __init__(self) -> None:
+        self.buckets: Counter[int] = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        index = 0
+        if seconds > self.FLOOR:
+            index = math.ceil(math.log(seconds / self.FLOOR, self.GROWTH))
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def _upper_bound(self, index: int) -> float:
+        return self.FLOOR * self.GROWTH**index
+
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> dict[str, Any]:
+        """Counts and latencies (in ms) as stored in results and baselines."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            **{f"p{p}_ms": round(self.percentile(p) * 1000, 2) for p in (50, 90, 95, 99)},
+            "max_ms": round(self.max * 1000, 2),
+            "histogram_ms": {
+                f"{self._upper_bound(index) * 1000:.3f}": n
+                for index, n in sorted(self.buckets.items())
+            },
+        }
+
+
+@dataclass
+class Results:
+    histograms: dict[str, LatencyHistogram] = field(default_factory=dict)
+    statuses: dict[str, Counter[int]] = field(default_factory=dict)
+    completed: int = 0
+    failed: int = 0
+
+    def record(self, label: str, seconds: float, status_code: int) -> None:
+        self.histograms.setdefault(label, LatencyHistogram()).record(seconds)
+        self.statuses.setdefault(label, Counter())[status_code] += 1
+
+
+class StepFailed(Exception):
+    """A lifecycle step returned an unexpected status; the lifecycle is abandoned."""
+
+
+def _near(rng: random.Random, lat: float, lon: float, miles: float) -> tuple[float, float]:
+    # ~69 miles per degree of latitude; good enough for synthetic data.
+    return (
+        lat + rng.uniform(-miles, miles) / 69.0,
+        lon + rng.uniform(-miles, miles) / (69.0 * math.cos(math.radians(lat))),
+    )
+
+
+def _population(email_pattern: str) -> tuple[list[str], list[str]]:
+    """Emails of the seeded riders and drivers whose prefix matches `email_pattern` (LIKE)."""
+    db = SessionLocal()
+    try:
+
+        def emails(role: str) -> list[str]:
+            pattern = f"{email_pattern}.{role}.%"
+            return list(db.scalars(select(User.email).where(User.email.like(pattern))).all())
+
+        return emails("rider"), emails("driver")
+    finally:
+        db.close()
+
+
+def _seed(
+    riders: int, drivers: int, parishes: int, history: int, seed: int
+) -> tuple[list[str], list[str], list[tuple[float, float]]]:
+    """Generate the population with `app.seed_scale`; return (riders, drivers, parishes)."""
+    email_prefix = f"{EMAIL_PREFIX}-{uuid.uuid4().hex[:8]}"
+    summary = seed_scale.generate(
+        ScaleConfig(
+            parishes=parishes,
+            riders=riders,
+            drivers=drivers,
+            ride_requests=history,
+            email_prefix=email_prefix,
+            seed=seed,
+        )
+    )
+    return (*_population(email_prefix), summary.parish_locations)
+
+
+def _existing_population() -> tuple[list[str], list[str], list[tuple[float, float]]]:
+    """Reuse users seeded by an earlier run (for --skip-seed)."""
+    riders, drivers = _population(f"{EMAIL_PREFIX}-%")
+    # Parish coordinates only steer where rides are requested; metro centres suffice.
+    return riders, drivers, [(lat, lon) for lat, lon, _ in seed_scale.METROS]
+
+
+class Lifecycle:
+    """One VU's HTTP session plus the steps of a ride lifecycle."""
+
+    def __init__(self, client: httpx.AsyncClient, results: Results, donate: bool):
+        self.client = client
+        self.results = results
+        self.donate = donate
+        self.client_ip = "127.0.0.1"
+
+    async def call(
+        self, label: str, method: str, path: str, expected: int = 200, **kwargs: Any
+    ) -> httpx.Response:
+        headers = {"X-Forwarded-For": self.client_ip, **kwargs.pop("headers", {})}
+        started = time.perf_counter()
+        resp = await self.client.request(method, path, headers=headers, **kwargs)
+        self.results.record(label, time.perf_counter() - started, resp.status_code)
+        if resp.status_code != expected:
+            raise StepFailed(f"{label}: {resp.status_code} {resp.text[:200]}")
+        return resp
+
+    async def login(self, email: str) -> dict[str, str]:
+        resp = await self.call(
+            "POST /auth/login",
+            "POST",
+            "/auth/login",
+            data={"username": email, "password": PASSWORD},
+        )
+        return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    async def run(
+        self,
+        seq: int,
+        rider_email: str,
+        driver: dict[str, str],
+        parish: tuple[float, float],
+        rng: random.Random,
+    ) -> None:
+        self.client_ip = f"10.{(seq >> 16) & 255}.{(seq >> 8) & 255}.{seq & 255}"
+        await self.call(
+            "POST /auth/register",
+            "POST",
+            "/auth/register",
+            expected=201,
+            json={
+                "email": f"bench-new-{uuid.uuid4().hex}@example.com",
+                "password": PASSWORD,
+                "first_name": "Bench",
+                "last_name": "Newcomer",
+                "role": "rider",
+            },
+        )
+        rider = await self.login(rider_email)
+
+        pickup = _near(rng, *parish, miles=5)
+        ride_request = await self.call(
+            "POST /rides/",
+            "POST",
+            "/rides/",
+            expected=201,
+            headers=rider,
+            json={
+                "pickup": {"latitude": pickup[0], "longitude": pickup[1]},
+                "dropoff": {"latitude": parish[0], "longitude": parish[1]},
+                "destination_type": "mass",
+                "requested_datetime": (datetime.utcnow() + timedelta(hours=2)).isoformat(),
+                "passenger_count": 1,
+            },
+        )
+        await self.call(
+            "GET /rides/open",
+            "GET",
+            "/rides/open",
+            headers=driver,
+            params={"latitude": pickup[0], "longitude": pickup[1]},
+        )
+        ride = await self.call(
+            "POST /rides/{id}/accept",
+            "POST",
+            f"/rides/{ride_request.json()['id']}/accept",
+            expected=201,
+            headers=driver,
+        )
+        ride_id = ride.json()["id"]
+        for ride_status in STATUS_SEQUENCE:
+            await self.call(
+                "PATCH /rides/{id}/status",
+                "PATCH",
+                f"/rides/{ride_id}/status",
+                headers=driver,
+                json={"status": ride_status},
+            )
+        review: dict[str, Any] = {"rating": rng.randint(3, 5)}
+        if self.donate:
+            review["donation_amount"] = 10.0
+        await self.call(
+            "POST /rides/{id}/review",
+            "POST",
+            f"/rides/{ride_id}/review",
+            expected=201,
+            headers=rider,
+            json=review,
+        )
+        await self.call("GET /rides/mine", "GET", "/rides/mine", headers=rider)
+
+
+def _transport(in_process: bool) -> Optional[httpx.AsyncBaseTransport]:
+    if not in_process:
+        return None
+    from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+    from app.main import app
+
+    # Apply X-Forwarded-For the way uvicorn does in front of a real server.
+    return httpx.ASGITransport(app=ProxyHeadersMiddleware(app, trusted_hosts="*"))
+
+
+async def _drive(
+    client: httpx.AsyncClient,
+    riders: list[str],
+    drivers: list[str],
+    parishes: list[tuple[float, float]],
+    lifecycles: int,
+    concurrency: int,
+    donate: bool,
+    seed: int,
+) -> tuple[float, Results]:
+    results = Results()
+    sequence = itertools.count(seed * 1_000_000)
+    remaining = iter(range(lifecycles))
+
+    async def vu(index: int) -> None:
+        rng = random.Random(seed * 10_000 + index)
+        lifecycle = Lifecycle(client, results, donate)
+        try:
+            driver = await lifecycle.login(drivers[index % len(drivers)])
+        except StepFailed as exc:
+            print(f"  VU {index} could not log in its driver: {exc}", file=sys.stderr)
+            return
+        for n in remaining:
+            try:
+                await lifecycle.run(
+                    next(sequence),
+                    riders[(index + n * concurrency) % len(riders)],
+                    driver,
+                    rng.choice(parishes),
+                    rng,
+                )
+                results.completed += 1
+            except StepFailed as exc:
+                results.failed += 1
+                if results.failed <= 5:
+                    print(f"  lifecycle failed: {exc}", file=sys.stderr)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(vu(i) for i in range(concurrency)))
+    return time.perf_counter() - started, results
+
+
+def _report(wall: float, results: Results, meta: dict[str, Any]) -> dict[str, Any]:
+    requests = sum(h.count for h in results.histograms.values())
+    report = {
+        "meta": meta,
+        "wall_seconds": round(wall, 3),
+        "lifecycles": results.completed,
+        "failed_lifecycles": results.failed,
+        "lifecycles_per_second": round(results.completed / wall, 2) if wall else 0.0,
+        "requests_per_second": round(requests / wall, 2) if wall else 0.0,
+        "endpoints": {
+            label: {
+                **histogram.summary(),
+                "status": {str(code): n for code, n in sorted(results.statuses[label].items())},
+            }
+            for label, histogram in results.histograms.items()
+        },
+    }
+
+    print(
+        f"lifecycles        : {results.completed} ok, {results.failed} failed "
+        f"in {wall:.1f}s ({report['lifecycles_per_second']} /s, "
+        f"{report['requests_per_second']} req/s)"
+    )
+    print()
+    print(f"{'endpoint':<26}{'count':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  status")
+    for label, endpoint in report["endpoints"].items():
+        print(
+            f"{label:<26}{endpoint['count']:>8}"
+            f"{endpoint['p50_ms']:>9.1f}{endpoint['p95_ms']:>9.1f}"
+            f"{endpoint['p99_ms']:>9.1f}{endpoint['max_ms']:>9.1f}  {endpoint['status']}"
+        )
+    print("(latencies in ms)")
+    return report
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Regressions of `report` against `baseline`, as human-readable lines."""
+    regressions = []
+    floor = baseline["lifecycles_per_second"] * (1 - tolerance)
+    if report["lifecycles_per_second"] < floor:
+        regressions.append(
+            f"throughput {report['lifecycles_per_second']}/s < "
+            f"{baseline['lifecycles_per_second']}/s baseline"
+        )
+    for label, before in baseline["endpoints"].items():
+        after = report["endpoints"].get(label)
+        if after is None:
+            regressions.append(f"{label}: missing from this run")
+        elif after["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: p95 {after['p95_ms']:.1f} ms > {before['p95_ms']:.1f} ms baseline"
+            )
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> int:
+    Base.metadata.create_all(bind=engine)
+    if args.skip_seed:
+        riders, drivers, parishes = _existing_population()
+        if not riders or not drivers:
+            print("--skip-seed needs riders and drivers from an earlier run", file=sys.stderr)
+            return 2
+    else:
+        started = time.perf_counter()
+        riders, drivers, parishes = _seed(
+            args.riders, args.drivers, args.parishes, args.history, args.seed
+        )
+        print(
+            f"seeded            : {len(riders)} riders, {len(drivers)} drivers, "
+            f"{len(parishes)} parishes, {args.history} past ride requests "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    concurrency = min(args.concurrency, len(drivers))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=f"{args.base_url}{settings.API_V1_STR}",
+        transport=_transport(args.in_process),
+        limits=limits,
+        timeout=60.0,
+    ) as client:
+        if args.warmup:
+            await _drive(
+                client, riders, drivers, parishes, args.warmup, concurrency, args.donate, 0
+            )
+        wall, results = await _drive(
+            client,
+            riders,
+            drivers,
+            parishes,
+            args.lifecycles,
+            concurrency,
+            args.donate,
+            args.seed,
+        )
+
+    meta = {
+        "target": "in-process" if args.in_process else args.base_url,
+        "riders": len(riders),
+        "drivers": len(drivers),
+        "parishes": len(parishes),
+        "concurrency": concurrency,
+        "donate": args.donate,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+    report = _report(wall, results, meta)
+    status = 1 if results.failed else 0
+
+    if args.save_baseline:
+        path = Path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nsaved baseline to {path}")
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        print()
+        if regressions:
+            print(f"REGRESSIONS (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  - {line}")
+            status = 1
+        else:
+            print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="drive the app via ASGI")
+    parser.add_argument("--riders", type=int, default=1000)
+    parser.add_argument("--drivers", type=int, default=200)
+    parser.add_argument("--parishes", type=int, default=50)
+    parser.add_argument("--history", type=int, default=10_000, help="past ride requests")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse earlier bench users")
+    parser.add_argument("--lifecycles", type=int, default=500, help="measured lifecycles")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured lifecycles first")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--donate", action="store_true", help="donate with reviews (Stripe)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,37 @@
+import math
 import os
+import time
 from typing import Any, Dict, List
 
 import pytest
 from fastapi.testclient import TestClient
 from geoalchemy2 import Geography
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite.base import SQLiteCompiler
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.compiler import compiles
 
 # Provide minimal defaults so Settings can initialize during tests without external services.
 os.environ.setdefault("SECRET_KEY", "test-secret-key")
 os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
 os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+# Cheap bcrypt, hashed inline rather than in worker processes.
+os.environ.setdefault("BCRYPT_ROUNDS", "5")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
 
 from app.db.session import Base, SessionLocal, engine  # noqa: E402
 from app.main import app  # noqa: E402
 
 # Import models so metadata is aware for table creation.
-from app.models import driver_profile, parish, ride, ride_request, user  # noqa: F401, E402
+from app.models import (  # noqa: F401, E402
+    driver_profile,
+    parish,
+    ride,
+    ride_offer,
+    ride_request,
+    user,
+)
+from app.services import rate_limit, user_principal  # noqa: E402
 
 # Check if we're using SQLite (for local dev) or PostgreSQL (for CI)
 _is_sqlite = "sqlite" in os.environ.get("DATABASE_URL", "sqlite")
@@ -32,44 +48,198 @@ def compile_geography_sqlite(element, compiler, **kwargs):
     Geography.spatial_index = False
 
 
+def _haversine_meters(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    dlat, dlon = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    h = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    )
+    return 2 * 6_371_008.8 * math.asin(math.sqrt(h))
+
+
+def _sqlite_st_distance(a: Any, b: Any):
+    """ST_Distance over the "[SRID=4326;]POINT(x y)" strings geography columns hold on SQLite."""
+    if a is None or b is None:
+        return None
+    points = [p.split(";")[-1].strip().removeprefix("POINT(").rstrip(")").split() for p in (a, b)]
+    (lon1, lat1), (lon2, lat2) = [(float(lon), float(lat)) for lon, lat in points]
+    return _haversine_meters(lon1, lat1, lon2, lat2)
+
+
+def _sqlite_st_dwithin(a: Any, b: Any, meters: float):
+    distance = _sqlite_st_distance(a, b)
+    return None if distance is None else int(distance <= meters)
+
+
+# SQLite resolves function names when a statement is prepared, so queries that only
+# take the PostGIS branch for some rows still need these to exist.
+@event.listens_for(Engine, "connect")
+def _register_sqlite_spatial_functions(dbapi_connection, _record):
+    if _is_sqlite:
+        dbapi_connection.create_function("ST_Distance", 2, _sqlite_st_distance)
+        dbapi_connection.create_function("ST_DWithin", 3, _sqlite_st_dwithin)
+        # Explicit coordinates arrive as WKT; points are stored as WKT text here too.
+        dbapi_connection.create_function("ST_GeogFromText", 1, lambda wkt: wkt)
+
+
+_sqlite_custom_op = SQLiteCompiler.visit_custom_op_binary
+
+
+def _sqlite_knn_as_distance(self, element, operator, **kw):
+    """Compile the PostGIS KNN operator `a <-> b` as ST_Distance(a, b) on SQLite."""
+    if operator.opstring == "<->":
+        left, right = self.process(element.left, **kw), self.process(element.right, **kw)
+        return f"ST_Distance({left}, {right})"
+    return _sqlite_custom_op(self, element, operator, **kw)
+
+
+SQLiteCompiler.visit_custom_op_binary = _sqlite_knn_as_distance
+
+
 class _FakePipeline:
-    def __init__(self, store: Dict[str, Any]):
-        self.store = store
-        self._incr_key: str | None = None
-        self._count: int | None = None
+    """Queues calls against FakeRedis and replays them on execute()."""
 
-    def incr(self, key: str):
-        self._incr_key = key
-        current = int(self.store.get(key, 0)) + 1
-        self._count = current
-        self.store[key] = current
-        return self
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self._calls: List[Any] = []
 
-    def expire(self, key: str, _seconds: int):
-        # TTL not enforced in this in-memory fake.
-        return self
+    def __getattr__(self, name: str):
+        method = getattr(self.redis, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+
+        return queue
 
     def execute(self) -> List[Any]:
-        return [self._count or 0, True]
+        calls, self._calls = self._calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+class _FakeAsyncPipeline(_FakePipeline):
+    async def execute(self) -> List[Any]:  # type: ignore[override]
+        return super().execute()
+
+
+class FakeAsyncRedis:
+    """redis.asyncio-style view of a FakeRedis (commands become coroutines)."""
+
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+
+    def pubsub(self):
+        return self.redis.pubsub()
+
+    def pipeline(self, transaction: bool = True):
+        return _FakeAsyncPipeline(self.redis)
+
+    def __getattr__(self, name: str):
+        method = getattr(self.redis, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class FakeAsyncPubSub:
+    """Asyncio pub/sub stub fed by FakeRedis.publish (safe across threads)."""
+
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.channels: set = set()
+        self.queue: Any = None
+        self.loop: Any = None
+
+    async def subscribe(self, *channels: str):
+        import asyncio
+
+        if self.queue is None:
+            self.loop = asyncio.get_running_loop()
+            self.queue = asyncio.Queue()
+            self.redis.subscribers.append(self)
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels: str):
+        if channels:
+            self.channels.difference_update(channels)
+        else:
+            self.channels.clear()
+
+    def deliver(self, channel: str, message: str):
+        if channel in self.channels:
+            self.loop.call_soon_threadsafe(
+                self.queue.put_nowait, {"type": "message", "channel": channel, "data": message}
+            )
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        import asyncio
+
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        if self in self.redis.subscribers:
+            self.redis.subscribers.remove(self)
 
 
 class FakeRedis:
-    """Minimal Redis stub for rate limits and email codes."""
+    """Minimal Redis stub for rate limits, email codes and the live location index."""
 
     def __init__(self):
         self.store: Dict[str, Any] = {}
+        self.published: List[Any] = []
+        self.subscribers: List[FakeAsyncPubSub] = []
+        self.stream_seq = 0
 
-    def pipeline(self):
-        return _FakePipeline(self.store)
+    def pipeline(self, transaction: bool = True):
+        return _FakePipeline(self)
 
     def setex(self, key: str, _ttl: int, value: Any):
         self.store[key] = value
 
+    def set(self, key: str, value: Any, nx: bool = False, ex: int | None = None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
     def get(self, key: str):
         return self.store.get(key)
 
-    def delete(self, key: str):
-        self.store.pop(key, None)
+    def delete(self, *keys: str):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    def exists(self, key: str) -> int:
+        return int(key in self.store)
+
+    def rename(self, src: str, dst: str):
+        from redis.exceptions import ResponseError
+
+        if src not in self.store:
+            raise ResponseError("no such key")
+        self.store[dst] = self.store.pop(src)
+        return True
+
+    def evalsha(self, sha: str, numkeys: int, *keys_and_args: Any):
+        """Run the rate limiter's token-bucket script (the only script we use)."""
+        assert sha == rate_limit.TOKEN_BUCKET_SHA and numkeys == 1
+        key, capacity, window_ms, cost = keys_and_args
+        now = time.time() * 1000
+        rate = capacity / window_ms
+        tokens, ts = self.store.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0, now - ts) * rate)
+        allowed, retry_after = 0, 0
+        if tokens >= cost:
+            tokens -= cost
+            allowed = 1
+        else:
+            retry_after = math.ceil((cost - tokens) / rate)
+        self.store[key] = (tokens, now)
+        return [allowed, math.floor(tokens), retry_after, math.ceil((capacity - tokens) / rate)]
 
     def incr(self, key: str):
         current = int(self.store.get(key, 0)) + 1
@@ -79,6 +249,86 @@ def incr(self, key: str):
     def expire(self, key: str, _seconds: int):
         return True
 
+    def hset(self, key: str, field: str, value: Any):
+        self.store.setdefault(key, {})[field] = value
+        return 1
+
+    def hgetall(self, key: str):
+        return dict(self.store.get(key, {}))
+
+    def zadd(self, key: str, mapping: Dict[str, float]):
+        self.store.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def zrem(self, key: str, *members: str):
+        zset = self.store.get(key, {})
+        return sum(1 for m in members if zset.pop(m, None) is not None)
+
+    def zrangebyscore(self, key: str, _min: Any, max_score: float):
+        return [m for m, score in self.store.get(key, {}).items() if float(score) <= max_score]
+
+    def zmscore(self, key: str, members: List[str]):
+        zset = self.store.get(key, {})
+        return [zset.get(m) for m in members]
+
+    def publish(self, channel: str, message: str):
+        self.published.append((channel, message))
+        for subscriber in list(self.subscribers):
+            subscriber.deliver(channel, message)
+        return len(self.subscribers)
+
+    def pubsub(self):
+        return FakeAsyncPubSub(self)
+
+    def xadd(self, key: str, fields: Dict[str, Any], **_options: Any):
+        self.stream_seq += 1
+        entry_id = f"{self.stream_seq}-0"
+        self.store.setdefault(key, []).append((entry_id, dict(fields)))
+        return entry_id
+
+    def xrange(self, key: str, _min: str = "-", _max: str = "+", count: int | None = None):
+        return list(self.store.get(key, []))[:count]
+
+    def xdel(self, key: str, *entry_ids: str):
+        stream = self.store.get(key, [])
+        self.store[key] = [entry for entry in stream if entry[0] not in entry_ids]
+        return len(stream) - len(self.store[key])
+
+    def rpush(self, key: str, *values: Any):
+        items = self.store.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    def ltrim(self, key: str, start: int, end: int):
+        items = self.store.get(key, [])
+        stop = None if end == -1 else end + 1
+        self.store[key] = items[start:stop]
+        return True
+
+    def lrange(self, key: str, start: int, end: int):
+        items = self.store.get(key, [])
+        stop = None if end == -1 else end + 1
+        return items[start:stop]
+
+    def geoadd(self, key: str, values: List[Any]):
+        geo = self.store.setdefault(key, {})
+        for i in range(0, len(values), 3):
+            lon, lat, member = values[i : i + 3]
+            geo[member] = (float(lon), float(lat))
+        return len(values) // 3
+
+    def geosearch(
+        self, key: str, *, longitude: float, latitude: float, radius: float, count: int, **_o: Any
+    ):
+        """GEOSEARCH ... BYRADIUS <radius> mi ASC COUNT <count> WITHDIST WITHCOORD."""
+        matches = []
+        for member, (lon, lat) in self.store.get(key, {}).items():
+            # Redis uses the same spherical model.
+            miles = _haversine_meters(longitude, latitude, lon, lat) / 1609.34
+            if miles <= radius:
+                matches.append([member, miles, (lon, lat)])
+        return sorted(matches, key=lambda match: match[1])[:count]
+
 
 @pytest.fixture(autouse=True)
 def _db_setup():
@@ -95,6 +345,9 @@ def _db_setup():
 
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # User ids are reused across tests; never serve a principal from a previous one.
+    user_principal.clear_local_cache()
+    rate_limit.reset_local_buckets()
     yield
     SessionLocal().close()
     Base.metadata.drop_all(bind=engine)
@@ -115,9 +368,37 @@ def fake_redis(monkeypatch):
     monkeypatch.setattr(redis_module, "get_redis_client", lambda: client)
     monkeypatch.setattr(rate_limit, "get_redis_client", lambda: client)
     monkeypatch.setattr("app.services.auth_email._get_redis", lambda: client)
+    monkeypatch.setattr("app.services.location_index._get_redis", lambda: client)
+    monkeypatch.setattr("app.services.notifications._get_redis", lambda: client)
+    monkeypatch.setattr("app.services.parish_cache._get_redis", lambda: client)
+    monkeypatch.setattr("app.services.parish_search._get_redis", lambda: client)
+    monkeypatch.setattr("app.services.profile_photos._get_redis", lambda: client)
+    monkeypatch.setattr("app.services.ride_tracking._get_redis", lambda: client)
+    monkeypatch.setattr("app.services.stripe_events._get_redis", lambda: client)
+    monkeypatch.setattr("app.services.user_principal._get_redis", lambda: client)
+    monkeypatch.setattr("app.db.replica._get_redis", lambda: client)
+    async_client = FakeAsyncRedis(client)
+    monkeypatch.setattr("app.api.endpoints.events._get_async_redis", lambda: async_client)
+    monkeypatch.setattr("app.services.user_principal._get_async_redis", lambda: async_client)
+    monkeypatch.setattr("app.services.location_index._get_async_redis", lambda: async_client)
+    monkeypatch.setattr("app.db.replica._get_async_redis", lambda: async_client)
     return client
 
 
+@pytest.fixture(autouse=True)
+def celery_calls(monkeypatch):
+    """Record Celery task dispatches instead of sending them to a broker."""
+    from celery.app.task import Task
+
+    calls: List[Any] = []
+
+    def fake_apply_async(self, args=None, kwargs=None, **options):
+        calls.append((self.name, tuple(args or ()), dict(kwargs or {})))
+
+    monkeypatch.setattr(Task, "apply_async", fake_apply_async)
+    return calls
+
+
 @pytest.fixture(autouse=True)
 def patch_point_for_sqlite(monkeypatch):
     """Avoid WKTElement binding issues on SQLite by using plain strings."""
@@ -137,4 +418,19 @@ def mock_email(monkeypatch):
 
 @pytest.fixture
 def client():
-    return TestClient(app)
+    # One event loop for the whole test: pooled async connections are bound to it,
+    # and the lifespan disposes of them on the way out.
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def query_budget(request):
+    """`with query_budget(max_queries=N): ...` fails the test on extra statements or N+1s."""
+    from app.db.query_budget import QueryRecorder
+
+    def recorder(max_queries=None, **options):
+        options.setdefault("label", request.node.name)
+        return QueryRecorder(max_queries, **options)
+
+    return recorder
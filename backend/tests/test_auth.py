@@ -1,6 +1,17 @@
+import time
+from smtplib import SMTPResponseException
+
+import pytest
 from fastapi import status
+from passlib.hash import bcrypt
+from sqlalchemy import event
 
-from app.services import auth_email
+from app.core import security
+from app.core.config import settings
+from app.core.password_pool import PasswordHashingBusyError, PasswordHashingPool
+from app.db.session import SessionLocal, engine, get_async_engine
+from app.models.user import User
+from app.services import auth_email, email
 
 
 def test_register_and_login_success(client):
@@ -114,3 +125,223 @@ def test_validate_reset_token_rejects_invalid(client):
     resp = client.post("/api/v1/auth/validate-reset-token", json={"token": "nope"})
     assert resp.status_code == status.HTTP_400_BAD_REQUEST
     assert resp.json()["detail"] == "Invalid or expired token"
+
+
+def test_principal_is_cached_and_invalidated_on_verification(client, fake_redis, monkeypatch):
+    email = "principal@example.com"
+    password = "StrongPass123!"
+    register = client.post(
+        "/api/v1/auth/register",
+        json={
+            "email": email,
+            "phone": "+15557650001",
+            "password": password,
+            "first_name": "Cache",
+            "last_name": "User",
+            "role": "rider",
+        },
+    )
+    user_id = register.json()["id"]
+    login = client.post(
+        "/api/v1/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    resp = client.get("/api/v1/rides/mine", headers=headers)
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
+    assert f"user_principal:{user_id}" in fake_redis.store
+
+    user_lookups: list[str] = []
+
+    def count_user_lookups(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            user_lookups.append(statement)
+
+    engines = [engine, get_async_engine().sync_engine]
+    for target in engines:
+        event.listen(target, "before_cursor_execute", count_user_lookups)
+    try:
+        assert client.get("/api/v1/rides/mine", headers=headers).status_code == 403
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", count_user_lookups)
+    assert user_lookups == []
+
+    monkeypatch.setattr(auth_email, "verify_email_code", lambda email, code: True)
+    verify = client.post("/api/v1/auth/verify-email", json={"email": email, "code": "123456"})
+    assert verify.status_code == status.HTTP_200_OK
+    assert f"user_principal:{user_id}" not in fake_redis.store
+
+    assert client.get("/api/v1/rides/mine", headers=headers).status_code == status.HTTP_200_OK
+
+
+def test_login_rehashes_password_when_cost_changes(client):
+    email = "rehash@example.com"
+    password = "StrongPass123!"
+    register = client.post(
+        "/api/v1/auth/register",
+        json={
+            "email": email,
+            "phone": "+15557650002",
+            "password": password,
+            "first_name": "Old",
+            "last_name": "Hash",
+            "role": "rider",
+        },
+    )
+    assert register.status_code == status.HTTP_201_CREATED
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).one()
+        user.password_hash = bcrypt.using(rounds=4).hash(password)
+        db.commit()
+    finally:
+        db.close()
+
+    login = client.post(
+        "/api/v1/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert login.status_code == status.HTTP_200_OK
+
+    db = SessionLocal()
+    try:
+        stored = db.query(User.password_hash).filter(User.email == email).scalar()
+    finally:
+        db.close()
+    assert bcrypt.from_string(stored).rounds == settings.BCRYPT_ROUNDS
+    assert bcrypt.verify(password, stored)
+
+
+def test_password_pool_hashes_in_worker_processes_with_backpressure():
+    pool = PasswordHashingPool(workers=1, max_pending=1, timeout_seconds=30)
+    try:
+        hashed = pool.run(security.get_password_hash, "StrongPass123!")
+        assert pool.run(security.verify_and_update_password, "StrongPass123!", hashed) == (
+            True,
+            None,
+        )
+
+        slow = pool._submit(time.sleep, 0.5)
+        with pytest.raises(PasswordHashingBusyError):
+            pool.run(security.get_password_hash, "another")
+        slow.result()
+
+        # The slot is released by a done-callback, which may run just after result().
+        deadline = time.monotonic() + 5
+        while pool.stats()["in_flight"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = pool.stats()
+        assert stats["in_flight"] == 0
+        assert stats["completed_total"] == 3
+        assert stats["rejected_total"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_rate_limit_token_bucket_headers_and_local_prefilter(client, fake_redis, monkeypatch):
+    from app.services import rate_limit
+
+    for remaining in (2, 1, 0):
+        result = rate_limit.hit("probe", limit=3, window_seconds=60)
+        assert result.allowed and result.remaining == remaining
+
+    denied = rate_limit.hit("probe", limit=3, window_seconds=60)
+    assert not denied.allowed
+    assert denied.headers()["Retry-After"] == "20"
+    assert denied.headers()["X-RateLimit-Remaining"] == "0"
+
+    # Once Redis has said "retry later", this process refuses without asking again.
+    def unreachable(*args, **kwargs):
+        raise AssertionError("the local pre-filter should have answered")
+
+    monkeypatch.setattr(fake_redis, "evalsha", unreachable)
+    assert not rate_limit.hit("probe", limit=3, window_seconds=60).allowed
+
+
+def test_login_rate_limit_returns_retry_after(client):
+    for _ in range(10):
+        client.post("/api/v1/auth/login", data={"username": "x@example.com", "password": "nope"})
+
+    resp = client.post("/api/v1/auth/login", data={"username": "x@example.com", "password": "nope"})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert resp.headers["X-RateLimit-Limit"] == "10"
+
+
+def test_rate_limit_keys_on_the_client_behind_a_trusted_proxy(monkeypatch):
+    from starlette.requests import Request
+
+    from app.services.rate_limit import client_ip
+
+    def request(peer: str, **headers: str) -> Request:
+        raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+        return Request({"type": "http", "client": (peer, 50000), "headers": raw})
+
+    behind_nginx = request("172.28.0.5", x_real_ip="203.0.113.7", x_forwarded_for="1.2.3.4")
+    assert client_ip(behind_nginx) == "172.28.0.5"
+
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["172.28.0.0/16"])
+    assert client_ip(behind_nginx) == "203.0.113.7"
+    assert client_ip(request("172.28.0.5", x_forwarded_for="1.2.3.4, 198.51.100.9")) == (
+        "198.51.100.9"
+    )
+    # Anyone else's forwarding headers are ignored.
+    assert client_ip(request("198.51.100.1", x_real_ip="203.0.113.7")) == "198.51.100.1"
+
+
+def test_emails_are_queued_and_sent_over_one_smtp_connection(client, celery_calls, monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_HOST", "smtp.example.com")
+    monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "noreply@example.com")
+
+    resp = client.post(
+        "/api/v1/auth/register",
+        json={
+            "email": "mailer@example.com",
+            "phone": "+15550000091",
+            "password": "StrongPass123!",
+            "first_name": "Mail",
+            "last_name": "User",
+            "role": "rider",
+        },
+    )
+    assert resp.status_code == status.HTTP_201_CREATED
+    (name, (messages,), _), *_ = [c for c in celery_calls if c[0] == "email.send_messages"]
+    assert messages[0]["to_email"] == "mailer@example.com"
+
+    connections = []
+
+    class FakeSMTP:
+        def __init__(self, host, port, timeout):
+            self.sent = []
+            connections.append(self)
+
+        def starttls(self):
+            pass
+
+        def send_message(self, msg):
+            if msg["To"] == "full@example.com":
+                raise SMTPResponseException(452, b"mailbox full")
+            if msg["To"] == "nobody@example.com":
+                raise SMTPResponseException(550, b"no such user")
+            self.sent.append(msg["To"])
+
+        def quit(self):
+            pass
+
+    monkeypatch.setattr(email, "SMTP", FakeSMTP)
+    batch = [
+        {"to_email": to, "subject": "Hi", "body": "Hello"}
+        for to in ["a@example.com", "nobody@example.com", "b@example.com", "full@example.com"]
+    ]
+    try:
+        # The 5xx recipient is dropped; the 4xx failure and everything after it is retried.
+        assert email.deliver(batch) == batch[3:]
+        assert len(connections) == 1
+        assert connections[0].sent == ["a@example.com", "b@example.com"]
+    finally:
+        email.smtp_connection.close()
@@ -0,0 +1,291 @@
+import json
+from datetime import datetime, timedelta
+
+from fastapi import status
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.models.donation import Donation
+from app.models.driver_profile import DriverProfile
+from app.models.user import User
+from app.services import auto_donation, driver_stats, stripe_events
+from app.services.payment import PaymentService
+from tests.test_rides import _register_verified
+
+
+def _complete_ride(client, rider_headers, driver_headers) -> int:
+    create_resp = client.post(
+        "/api/v1/rides/",
+        json={
+            "pickup": {"latitude": 37.7749, "longitude": -122.4194},
+            "dropoff": {"latitude": 37.7849, "longitude": -122.4094},
+            "destination_type": "mass",
+            "requested_datetime": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
+        },
+        headers=rider_headers,
+    )
+    accept = client.post(f"/api/v1/rides/{create_resp.json()['id']}/accept", headers=driver_headers)
+    ride_id = accept.json()["id"]
+    resp = client.patch(
+        f"/api/v1/rides/{ride_id}/status", json={"status": "completed"}, headers=driver_headers
+    )
+    assert resp.status_code == status.HTTP_200_OK, resp.text
+    assert resp.json()["auto_donation_intent"] is None
+    return ride_id
+
+
+def test_auto_donation_runs_off_the_request_path_and_is_idempotent(
+    client, fake_redis, celery_calls, monkeypatch
+):
+    rider_headers = _register_verified(client, "give.rider@example.com", "rider", "+15550000071")
+    driver_headers = _register_verified(client, "give.drv@example.com", "driver", "+15550000072")
+    prefs = client.put(
+        "/api/v1/users/me/donation-preferences",
+        json={
+            "auto_donation_enabled": True,
+            "auto_donation_type": "fixed",
+            "auto_donation_amount": 10,
+        },
+        headers=rider_headers,
+    )
+    assert prefs.status_code == status.HTTP_200_OK, prefs.text
+
+    ride_id = _complete_ride(client, rider_headers, driver_headers)
+    assert ("donations.create_auto_donation", (ride_id,), {}) in celery_calls
+
+    intents = []
+
+    def fake_intent_create(**params):
+        intents.append(params)
+        return {"id": "pi_auto_1", "client_secret": "pi_auto_1_secret", "status": "pending"}
+
+    monkeypatch.setattr(settings, "STRIPE_SECRET_KEY", "sk_test_dummy")
+    customers = []
+    monkeypatch.setattr(
+        "stripe.Customer.create", lambda **params: customers.append(params) or {"id": "cus_1"}
+    )
+    monkeypatch.setattr("stripe.PaymentIntent.create", fake_intent_create)
+
+    # A redelivered task must not create a second PaymentIntent or Donation.
+    for _ in range(2):
+        db = SessionLocal()
+        try:
+            auto_donation.create_auto_donation(db, ride_id=ride_id)
+        finally:
+            db.close()
+
+    assert len(intents) == 1
+    assert intents[0]["amount"] == 1000
+    assert intents[0]["idempotency_key"] == auto_donation.idempotency_key(ride_id)
+    db = SessionLocal()
+    try:
+        assert db.query(Donation).filter(Donation.ride_id == ride_id).count() == 1
+        rider_id = db.query(User.id).filter(User.email == "give.rider@example.com").scalar()
+    finally:
+        db.close()
+    assert [c["idempotency_key"] for c in customers] == [f"customer-user-{rider_id}"]
+    assert any('"donation_intent_ready"' in message for _, message in fake_redis.published)
+
+    resp = client.get(f"/api/v1/rides/{ride_id}/donation-intent", headers=rider_headers)
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()["client_secret"] == "pi_auto_1_secret"
+
+
+def test_concurrent_auto_donation_returns_the_donation_recorded_first(client, monkeypatch):
+    rider_headers = _register_verified(client, "race.giver@example.com", "rider", "+15550000073")
+    driver_headers = _register_verified(client, "race.taker@example.com", "driver", "+15550000074")
+    client.put(
+        "/api/v1/users/me/donation-preferences",
+        json={
+            "auto_donation_enabled": True,
+            "auto_donation_type": "fixed",
+            "auto_donation_amount": 10,
+        },
+        headers=rider_headers,
+    )
+    ride_id = _complete_ride(client, rider_headers, driver_headers)
+
+    def intent_recorded_meanwhile(**params):
+        # Another worker passed the existence check too and recorded the intent first.
+        db = SessionLocal()
+        try:
+            rider_id = db.query(User.id).filter(User.email == "race.giver@example.com").scalar()
+            db.add(
+                Donation(
+                    ride_id=ride_id,
+                    donor_id=rider_id,
+                    recipient_id=rider_id,
+                    amount_cents=params["amount"],
+                    currency="USD",
+                    stripe_payment_intent_id="pi_race",
+                    stripe_client_secret="pi_race_secret",
+                    stripe_status="pending",
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+        return {"id": "pi_race", "client_secret": "pi_race_secret", "status": "pending"}
+
+    monkeypatch.setattr(settings, "STRIPE_SECRET_KEY", "sk_test_dummy")
+    monkeypatch.setattr("stripe.Customer.create", lambda **params: {"id": "cus_race"})
+    monkeypatch.setattr("stripe.PaymentIntent.create", intent_recorded_meanwhile)
+
+    db = SessionLocal()
+    try:
+        intent = auto_donation.create_auto_donation(db, ride_id=ride_id)
+        assert intent.payment_intent_id == "pi_race"
+        assert intent.client_secret == "pi_race_secret"
+        assert db.query(Donation).filter(Donation.ride_id == ride_id).count() == 1
+    finally:
+        db.close()
+
+
+def _intent_event(event_id: str, event_type: str, intent_status: str, **intent) -> dict:
+    return {
+        "id": event_id,
+        "type": event_type,
+        "created": 1_760_000_000,
+        "data": {"object": {"id": "pi_hook_1", "status": intent_status, **intent}},
+    }
+
+
+def test_stripe_webhook_queues_dedupes_and_batches(client, fake_redis, monkeypatch):
+    rider_headers = _register_verified(client, "hook.rider@example.com", "rider", "+15550000073")
+    driver_headers = _register_verified(client, "hook.drv@example.com", "driver", "+15550000074")
+    ride_id = _complete_ride(client, rider_headers, driver_headers)
+
+    db = SessionLocal()
+    rider_id = db.query(User.id).filter(User.email == "hook.rider@example.com").scalar()
+    db.close()
+
+    events = iter(
+        [
+            _intent_event("evt_1", "payment_intent.payment_failed", "requires_payment_method"),
+            _intent_event("evt_1", "payment_intent.payment_failed", "requires_payment_method"),
+            _intent_event(
+                "evt_2",
+                "payment_intent.succeeded",
+                "succeeded",
+                amount=2000,
+                currency="usd",
+                latest_charge="ch_1",
+                metadata={
+                    "type": "ride_donation",
+                    "ride_id": str(ride_id),
+                    "donor_id": str(rider_id),
+                },
+            ),
+            {"id": "evt_3", "type": "customer.created", "data": {"object": {}}},
+        ]
+    )
+    monkeypatch.setattr(settings, "STRIPE_SECRET_KEY", "sk_test_dummy")
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", "whsec_dummy")
+    monkeypatch.setattr("stripe.Webhook.construct_event", lambda payload, sig, secret: next(events))
+
+    for _ in range(4):
+        resp = client.post(
+            "/api/v1/webhooks/stripe", content=b"{}", headers={"Stripe-Signature": "t"}
+        )
+        assert resp.status_code == status.HTTP_200_OK
+
+    # The redelivered evt_1 and the irrelevant evt_3 never reach the stream.
+    assert len(fake_redis.store[stripe_events.EVENT_STREAM_KEY]) == 2
+
+    db = SessionLocal()
+    try:
+        assert stripe_events.process_stripe_events(db, batch_size=100) == 2
+        donation = db.query(Donation).filter(Donation.stripe_payment_intent_id == "pi_hook_1").one()
+        assert donation.ride_id == ride_id
+        assert donation.stripe_status == "succeeded"
+        assert donation.stripe_charge_id == "ch_1"
+        assert donation.amount_cents == 2000
+        assert donation.stripe_fee_cents == PaymentService.calculate_stripe_fee_cents(2000)
+        assert donation.completed_at is not None
+    finally:
+        db.close()
+    assert fake_redis.store[stripe_events.EVENT_STREAM_KEY] == []
+
+
+def test_stripe_event_with_bad_metadata_is_dead_lettered(client, fake_redis):
+    rider_headers = _register_verified(client, "dead.rider@example.com", "rider", "+15550000075")
+    driver_headers = _register_verified(client, "dead.drv@example.com", "driver", "+15550000076")
+    ride_id = _complete_ride(client, rider_headers, driver_headers)
+    db = SessionLocal()
+    rider_id = db.query(User.id).filter(User.email == "dead.rider@example.com").scalar()
+    db.close()
+
+    def succeeded(event_id: str, intent_id: str, ride: int) -> dict:
+        event = _intent_event(
+            event_id,
+            "payment_intent.succeeded",
+            "succeeded",
+            amount=1500,
+            currency="usd",
+            metadata={"type": "ride_donation", "ride_id": str(ride), "donor_id": str(rider_id)},
+        )
+        event["data"]["object"]["id"] = intent_id
+        return event
+
+    # The second event names a ride that does not exist.
+    assert stripe_events.enqueue_event(succeeded("evt_ok", "pi_ok", ride_id))
+    assert stripe_events.enqueue_event(succeeded("evt_bad", "pi_bad", ride_id + 1000))
+
+    sqlite = engine.dialect.name == "sqlite"
+    # Pin the session to one connection: the pragma is per connection.
+    with engine.connect() as connection:
+        if sqlite:
+            connection.exec_driver_sql("PRAGMA foreign_keys = ON")  # off by default on SQLite
+        db = SessionLocal(bind=connection)
+        try:
+            assert stripe_events.process_stripe_events(db, batch_size=100) == 2
+            intents = [row.stripe_payment_intent_id for row in db.query(Donation)]
+            assert intents == ["pi_ok"]
+        finally:
+            db.close()
+            if sqlite:
+                connection.rollback()
+                connection.exec_driver_sql("PRAGMA foreign_keys = OFF")
+
+    assert fake_redis.store[stripe_events.EVENT_STREAM_KEY] == []
+    dead = fake_redis.store[stripe_events.EVENT_DEAD_LETTER_KEY]
+    assert [json.loads(fields["event"])["id"] for _, fields in dead] == ["evt_bad"]
+
+
+def test_driver_stats_are_maintained_incrementally_and_reconciled(client, query_budget):
+    rider_headers = _register_verified(client, "rate.rider@example.com", "rider", "+15550000081")
+    driver_headers = _register_verified(client, "rate.drv@example.com", "driver", "+15550000082")
+    db = SessionLocal()
+    driver_id = db.query(User.id).filter(User.email == "rate.drv@example.com").scalar()
+    db.add(DriverProfile(user_id=driver_id))
+    db.commit()
+    db.close()
+
+    ride_id = _complete_ride(client, rider_headers, driver_headers)
+    # Re-sending "completed" must not count the ride twice.
+    client.patch(
+        f"/api/v1/rides/{ride_id}/status", json={"status": "completed"}, headers=driver_headers
+    )
+    with query_budget(max_queries=6):
+        resp = client.post(
+            f"/api/v1/rides/{ride_id}/review", json={"rating": 4}, headers=rider_headers
+        )
+    assert resp.status_code == status.HTTP_201_CREATED, resp.text
+
+    db = SessionLocal()
+    try:
+        profile = db.query(DriverProfile).filter(DriverProfile.user_id == driver_id).one()
+        assert (profile.total_rides, profile.rating_sum, profile.rating_count) == (1, 4, 1)
+        assert profile.average_rating == 4.0
+
+        profile.total_rides = 7
+        profile.rating_count = 0
+        db.commit()
+
+        assert driver_stats.reconcile_driver_stats(db) == 1
+        db.expire_all()
+        profile = db.query(DriverProfile).filter(DriverProfile.user_id == driver_id).one()
+        assert (profile.total_rides, profile.rating_count, profile.average_rating) == (1, 1, 4.0)
+        assert driver_stats.reconcile_driver_stats(db) == 0
+    finally:
+        db.close()
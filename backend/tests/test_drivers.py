@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from fastapi import status
+
+from app.db.session import SessionLocal
+from app.models.driver_profile import DriverProfile
+from app.models.user import User
+from app.services import location_index
+from tests.test_rides import _register_verified
+
+
+def test_available_drivers_requires_a_location(client):
+    headers = _register_verified(client, "seeker@example.com", "rider", "+15550000021")
+
+    resp = client.get("/api/v1/drivers/available", headers=headers)
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+    assert resp.json()["detail"] == "A location is required to search for drivers"
+
+    half = client.get("/api/v1/drivers/available", params={"latitude": 37.77}, headers=headers)
+    assert half.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_available_drivers_near_a_point_come_from_the_live_index(client, query_budget):
+    headers = _register_verified(client, "live.rider@example.com", "rider", "+15550000061")
+    drivers = {}
+    for name, phone, longitude in (
+        ("near", "+15550000062", -122.4194),
+        ("far", "+15550000063", -122.3194),
+        ("off", "+15550000064", -122.4184),
+    ):
+        email = f"live.{name}@example.com"
+        _register_verified(client, email, "driver", phone)
+        db = SessionLocal()
+        driver_id = db.query(User.id).filter(User.email == email).scalar()
+        db.add(DriverProfile(user_id=driver_id, is_available=name != "off"))
+        db.commit()
+        db.close()
+        # Heartbeat only: nothing is flushed to Postgres.
+        location_index.record_driver_location(driver_id, longitude=longitude, latitude=37.7749)
+        drivers[name] = driver_id
+
+    with query_budget(max_queries=2):
+        resp = client.get(
+            "/api/v1/drivers/available",
+            params={"latitude": 37.7749, "longitude": -122.4194},
+            headers=headers,
+        )
+    assert resp.status_code == status.HTTP_200_OK, resp.text
+    found = resp.json()
+    assert [d["user_id"] for d in found] == [drivers["near"], drivers["far"]]
+    assert found[0]["distance_miles"] == 0
+    assert 5 < found[1]["distance_miles"] < 6
+    assert found[0]["last_location_updated_at"] is not None
+
+    narrow = client.get(
+        "/api/v1/drivers/available",
+        params={"latitude": 37.7749, "longitude": -122.4194, "radius_miles": 1},
+        headers=headers,
+    )
+    assert [d["user_id"] for d in narrow.json()] == [drivers["near"]]
+
+
+def test_available_drivers_near_the_stored_location_take_one_query(client, query_budget):
+    headers = _register_verified(client, "stored.rider@example.com", "rider", "+15550000065")
+    _register_verified(client, "stored.driver@example.com", "driver", "+15550000066")
+    db = SessionLocal()
+    driver = db.query(User).filter(User.email == "stored.driver@example.com").one()
+    db.add(DriverProfile(user_id=driver.id, is_available=True))
+    driver.last_known_location = "SRID=4326;POINT(-122.4194 37.7749)"
+    driver.last_location_updated_at = datetime.utcnow()
+    db.query(User).filter(User.email == "stored.rider@example.com").update(
+        {User.last_known_location: "SRID=4326;POINT(-122.4094 37.7749)"}
+    )
+    db.commit()
+    driver_id = driver.id
+    db.close()
+
+    with query_budget(max_queries=2):
+        resp = client.get("/api/v1/drivers/available", headers=headers)
+    assert resp.status_code == status.HTTP_200_OK, resp.text
+    assert [d["user_id"] for d in resp.json()] == [driver_id]
+    assert 0.5 < resp.json()[0]["distance_miles"] < 0.6
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from starlette.websockets import WebSocketDisconnect
+
+from tests.test_rides import _register_verified
+
+
+def test_websocket_rejects_invalid_token(client):
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/api/v1/events/ws?token=bogus") as ws:
+            ws.receive_json()
+
+
+def test_rider_receives_acceptance_and_status_updates(client):
+    rider_headers = _register_verified(client, "ws.rider@example.com", "rider", "+15550000061")
+    driver_headers = _register_verified(client, "ws.driver@example.com", "driver", "+15550000062")
+    rider_token = rider_headers["Authorization"].split()[1]
+
+    create_resp = client.post(
+        "/api/v1/rides/",
+        json={
+            "pickup": {"latitude": 37.7749, "longitude": -122.4194},
+            "dropoff": {"latitude": 37.7849, "longitude": -122.4094},
+            "destination_type": "mass",
+            "requested_datetime": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
+        },
+        headers=rider_headers,
+    )
+    ride_request_id = create_resp.json()["id"]
+
+    with client.websocket_connect(f"/api/v1/events/ws?token={rider_token}") as ws:
+        accept = client.post(f"/api/v1/rides/{ride_request_id}/accept", headers=driver_headers)
+        assert accept.status_code == status.HTTP_201_CREATED
+        ride_id = accept.json()["id"]
+
+        accepted = ws.receive_json()
+        assert accepted["event"] == "ride_accepted"
+        assert accepted["ride_id"] == ride_id
+
+        ws.send_json({"action": "subscribe", "ride_id": ride_id})
+        assert ws.receive_json() == {"event": "subscribed", "ride_id": ride_id}
+
+        ws.send_json({"action": "subscribe", "ride_id": ride_id + 1000})
+        assert ws.receive_json()["event"] == "error"
+
+        enroute = client.patch(
+            f"/api/v1/rides/{ride_id}/status",
+            json={"status": "driver_enroute"},
+            headers=driver_headers,
+        )
+        assert enroute.status_code == status.HTTP_200_OK
+
+        update = ws.receive_json()
+        assert update == {"event": "ride_status", "ride_id": ride_id, "status": "driver_enroute"}
@@ -1,11 +1,12 @@
-from fastapi.testclient import TestClient
+from sqlalchemy.pool import NullPool
 
-from app.main import app
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.session import SessionLocal, engine_options
+from app.models.user import User, UserRole
 
-client = TestClient(app)
 
-
-def test_root():
+def test_root(client):
     response = client.get("/")
     assert response.status_code == 200
     body = response.json()
@@ -13,7 +14,158 @@ def test_root():
     assert "version" in body
 
 
-def test_health():
+def test_health(client):
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
+
+
+def test_pool_health_reports_checkout_metrics_to_admins(client):
+    client.get("/api/v1/parishes/")
+    assert client.get("/health/pools").status_code == 401
+
+    db = SessionLocal()
+    admin = User(
+        email="pools.admin@example.com",
+        password_hash="unused",
+        first_name="Pool",
+        last_name="Admin",
+        role=UserRole.ADMIN,
+        is_verified=True,
+    )
+    rider = User(
+        email="pools.rider@example.com",
+        password_hash="unused",
+        first_name="Pool",
+        last_name="Rider",
+        is_verified=True,
+    )
+    db.add_all([admin, rider])
+    db.commit()
+    admin_token = create_access_token(subject=str(admin.id))
+    rider_token = create_access_token(subject=str(rider.id))
+    db.close()
+
+    forbidden = client.get("/health/pools", headers={"Authorization": f"Bearer {rider_token}"})
+    assert forbidden.status_code == 403
+
+    response = client.get("/health/pools", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert set(response.json()["database"]) == {"primary", "primary_async"}
+    database = response.json()["database"]["primary"]
+    assert database["pool_class"] == "InstrumentedQueuePool"
+    assert database["size"] == settings.DB_POOL_SIZE
+    assert database["checkouts_total"] >= 1
+    assert database["checkout_timeouts_total"] == 0
+    assert "queue_depth" in response.json()["password_hashing"]
+
+
+def test_postgres_engine_options_follow_settings(monkeypatch):
+    url = "postgresql://user:pw@db:5432/app"
+    options = engine_options(url)
+    assert options["pool_size"] == settings.DB_POOL_SIZE
+    assert options["pool_pre_ping"] is True
+    assert "statement_timeout" in options["connect_args"]["options"]
+
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+    options = engine_options(url)
+    assert options["poolclass"] is NullPool
+    assert "options" not in options["connect_args"]
+
+
+def test_read_replica_routing(client, fake_redis, monkeypatch):
+    from app.db import replica
+
+    # Without a replica every read goes to the primary and no markers are written.
+    replica.mark_user_wrote(1)
+    assert not replica.use_replica(1)
+    assert fake_redis.get(f"{replica.STICKY_PREFIX}:1") is None
+
+    monkeypatch.setattr(settings, "DATABASE_READ_URL", "postgresql://reader@replica/app")
+    lag = {"seconds": 0.5}
+    monkeypatch.setattr(replica, "replica_lag_seconds", lambda: lag["seconds"])
+    assert replica.use_replica(1)
+
+    # Read-your-writes: a successful write pins that user (only) to the primary.
+    replica.mark_user_wrote(1)
+    assert not replica.use_replica(1)
+    assert replica.use_replica(2)
+
+    lag["seconds"] = settings.READ_REPLICA_MAX_LAG_SECONDS + 1
+    assert not replica.use_replica(2)
+    lag["seconds"] = None
+    assert not replica.use_replica(None)
+
+
+def test_get_read_db_is_sync_and_skips_routing_without_replica(monkeypatch):
+    import inspect
+
+    from starlette.requests import Request
+
+    from app.api.deps import db as db_deps
+
+    # A plain generator: FastAPI runs it (and its close) on the threadpool.
+    assert inspect.isgeneratorfunction(db_deps.get_read_db)
+
+    def no_routing(*_args):
+        raise AssertionError("routing checked without a replica")
+
+    monkeypatch.setattr(db_deps, "request_user_id", no_routing)
+    monkeypatch.setattr(db_deps.replica, "use_replica", no_routing)
+    request = Request({"type": "http", "headers": [(b"authorization", b"Bearer token")]})
+    dependency = db_deps.get_read_db(request)
+    session = next(dependency)
+    assert session.get_bind() is SessionLocal.kw["bind"]
+    dependency.close()
+
+
+def test_metrics_attribute_db_work_to_route_templates(client):
+    from app.core import metrics
+
+    def sample(name: str, route: str, method: str = "GET") -> float:
+        labels = {"method": method, "route": route}
+        return metrics.registry.get_sample_value(name, labels) or 0.0
+
+    def queries_per_request(route: str, method: str = "GET") -> tuple[float, float]:
+        return (
+            sample("http_request_db_queries_sum", route, method),
+            sample("http_request_db_queries_count", route, method),
+        )
+
+    async_route = "/api/v1/rides/mine"  # AsyncSession (aiosqlite)
+    sync_route = "/api/v1/auth/register"  # Session in the threadpool
+    before = queries_per_request(async_route), queries_per_request(sync_route, "POST")
+
+    resp = client.post(
+        "/api/v1/auth/register",
+        json={
+            "email": "metrics@example.com",
+            "password": "StrongPass123!",
+            "first_name": "Metrics",
+            "last_name": "User",
+            "role": "rider",
+        },
+    )
+    assert resp.status_code == 201
+    db = SessionLocal()
+    user = db.query(User).filter(User.email == "metrics@example.com").one()
+    user.is_verified = True
+    db.commit()
+    token = create_access_token(subject=str(user.id))
+    db.close()
+    mine = client.get("/api/v1/rides/mine", headers={"Authorization": f"Bearer {token}"})
+    assert mine.status_code == 200
+    client.get("/api/v1/no-such-route")
+
+    sync_sum, sync_count = queries_per_request(sync_route, "POST")
+    assert sync_count == before[1][1] + 1
+    assert sync_sum >= before[1][0] + 2  # duplicate-email check and the insert
+    async_sum, async_count = queries_per_request(async_route)
+    assert async_count == before[0][1] + 1
+    assert async_sum > before[0][0]
+
+    body = client.get("/metrics").text
+    assert 'route="/api/v1/rides/mine"' in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"}' in body
+    assert 'db_pool_checkouts_total{pool="primary"}' in body
+    assert 'password_hashing_queue_depth{pool="bcrypt"}' in body
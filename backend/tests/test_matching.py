@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta
+
+from fastapi import status
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.driver_profile import DriverProfile
+from app.models.ride_offer import RideOffer
+from app.models.user import User
+from app.services import matching
+from app.services.driver_search import DriverCandidate
+from tests.test_rides import _register_verified
+
+
+def _create_request(client, headers) -> int:
+    resp = client.post(
+        "/api/v1/rides/",
+        json={
+            "pickup": {"latitude": 37.7749, "longitude": -122.4194},
+            "dropoff": {"latitude": 37.7849, "longitude": -122.4094},
+            "destination_type": "mass",
+            "requested_datetime": (datetime.utcnow() + timedelta(hours=2)).isoformat(),
+        },
+        headers=headers,
+    )
+    assert resp.status_code == status.HTTP_201_CREATED, resp.text
+    return resp.json()["id"]
+
+
+def _offer(ride_request_id: int, driver_email: str, *, expires_in_minutes: int = 15) -> int:
+    db = SessionLocal()
+    driver = db.query(User).filter(User.email == driver_email).first()
+    offer = RideOffer(
+        ride_request_id=ride_request_id,
+        driver_id=driver.id,
+        score=0.9,
+        status="pending",
+        expires_at=datetime.utcnow() + timedelta(minutes=expires_in_minutes),
+    )
+    db.add(offer)
+    db.commit()
+    offer_id = offer.id
+    db.close()
+    return offer_id
+
+
+def test_score_prefers_closer_better_fitting_parish_drivers():
+    base = dict(radius_meters=16_000, passenger_count=2, average_rating=4.5)
+    near = matching.score_candidate(
+        distance_meters=1_000, vehicle_capacity=4, same_parish=False, **base
+    )
+    far = matching.score_candidate(
+        distance_meters=12_000, vehicle_capacity=4, same_parish=False, **base
+    )
+    van = matching.score_candidate(
+        distance_meters=1_000, vehicle_capacity=8, same_parish=False, **base
+    )
+    parishioner = matching.score_candidate(
+        distance_meters=1_000, vehicle_capacity=4, same_parish=True, **base
+    )
+
+    assert near > far
+    assert near > van
+    assert parishioner > near
+
+
+def test_creating_a_request_enqueues_matching(client, celery_calls):
+    headers = _register_verified(client, "match.rider@example.com", "rider", "+15550000041")
+    ride_request_id = _create_request(client, headers)
+
+    assert ("matching.match_ride_request", (ride_request_id,), {}) in celery_calls
+
+
+def test_matcher_offers_the_best_drivers_up_to_the_fanout(client, monkeypatch):
+    rider_headers = _register_verified(client, "fan.rider@example.com", "rider", "+15550000047")
+    emails = [f"fan.d{n}@example.com" for n in range(4)]
+    for n, email in enumerate(emails):
+        _register_verified(client, email, "driver", f"+1555000005{n}")
+    ride_request_id = _create_request(client, rider_headers)
+    monkeypatch.setattr(settings, "MATCHING_OFFER_FANOUT", 2)
+
+    searches = []
+
+    def nearest(db, *, exclude_user_ids, **_options):
+        # PostGIS search; stand in with the drivers at 1, 2, 3 and 4 km.
+        searches.append(set(exclude_user_ids))
+        drivers = db.query(User).filter(User.email.in_(emails)).order_by(User.email)
+        return [
+            DriverCandidate(
+                user=driver,
+                profile=DriverProfile(vehicle_capacity=4, average_rating=4.5),
+                distance_meters=1_000.0 * (n + 1),
+            )
+            for n, driver in enumerate(drivers)
+            if driver.id not in exclude_user_ids
+        ]
+
+    monkeypatch.setattr(matching, "find_nearest_available_drivers", nearest)
+
+    db = SessionLocal()
+    driver_ids = [db.query(User.id).filter(User.email == email).scalar() for email in emails]
+    offers = matching.match_ride_request(db, ride_request_id=ride_request_id)
+    assert [offer.driver_id for offer in offers] == driver_ids[:2]
+    assert offers[0].score > offers[1].score
+
+    # Both slots are taken: no search, no new offers.
+    assert matching.match_ride_request(db, ride_request_id=ride_request_id) == []
+    assert len(searches) == 1
+
+    # A declined offer frees a slot, and its driver is not asked again.
+    db.query(RideOffer).filter(RideOffer.id == offers[0].id).update({"status": "declined"})
+    db.commit()
+    again = matching.match_ride_request(db, ride_request_id=ride_request_id)
+    assert [offer.driver_id for offer in again] == [driver_ids[2]]
+    assert set(driver_ids[:2]) <= searches[-1]
+    assert db.query(RideOffer).filter(RideOffer.ride_request_id == ride_request_id).count() == 3
+    db.close()
+
+
+def test_driver_lists_declines_and_accept_closes_offers(client, celery_calls):
+    rider_headers = _register_verified(client, "offer.rider@example.com", "rider", "+15550000042")
+    first_headers = _register_verified(client, "offer.d1@example.com", "driver", "+15550000043")
+    second_headers = _register_verified(client, "offer.d2@example.com", "driver", "+15550000044")
+
+    ride_request_id = _create_request(client, rider_headers)
+    first_offer = _offer(ride_request_id, "offer.d1@example.com")
+    second_offer = _offer(ride_request_id, "offer.d2@example.com")
+
+    offers = client.get("/api/v1/rides/offers", headers=first_headers)
+    assert offers.status_code == status.HTTP_200_OK
+    assert [o["id"] for o in offers.json()] == [first_offer]
+    assert offers.json()[0]["ride_request"]["id"] == ride_request_id
+
+    celery_calls.clear()
+    declined = client.post(f"/api/v1/rides/offers/{first_offer}/decline", headers=first_headers)
+    assert declined.status_code == status.HTTP_200_OK
+    assert declined.json()["status"] == "declined"
+    assert celery_calls == [("matching.match_ride_request", (ride_request_id,), {})]
+
+    again = client.post(f"/api/v1/rides/offers/{first_offer}/decline", headers=first_headers)
+    assert again.status_code == status.HTTP_400_BAD_REQUEST
+
+    accepted = client.post(f"/api/v1/rides/{ride_request_id}/accept", headers=second_headers)
+    assert accepted.status_code == status.HTTP_201_CREATED, accepted.text
+
+    db = SessionLocal()
+    assert db.get(RideOffer, second_offer).status == "accepted"
+    db.close()
+    assert client.get("/api/v1/rides/offers", headers=second_headers).json() == []
+
+
+def test_expire_stale_offers_returns_requests_needing_rematch(client):
+    rider_headers = _register_verified(client, "stale.rider@example.com", "rider", "+15550000045")
+    _register_verified(client, "stale.driver@example.com", "driver", "+15550000046")
+
+    ride_request_id = _create_request(client, rider_headers)
+    offer_id = _offer(ride_request_id, "stale.driver@example.com", expires_in_minutes=-1)
+
+    db = SessionLocal()
+    assert matching.expire_stale_offers(db) == [ride_request_id]
+    assert db.get(RideOffer, offer_id).status == "expired"
+    assert matching.expire_stale_offers(db) == []
+    db.close()
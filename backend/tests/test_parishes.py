@@ -1,13 +1,26 @@
-from app.db.session import SessionLocal
+from sqlalchemy import create_engine, create_mock_engine, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal, engine
 from app.models.parish import Parish
+from app.services import parish_cache, parish_search
 
 
-def _create_parish(name: str) -> Parish:
+def _dialect() -> str:
+    db = SessionLocal()
+    try:
+        return db.get_bind().dialect.name
+    finally:
+        db.close()
+
+
+def _create_parish(name: str, city: str = "Springfield") -> Parish:
     db = SessionLocal()
     parish = Parish(
         name=name,
         address_line1="123 Church St",
-        city="Springfield",
+        city=city,
         state="IL",
         zip_code="62701",
     )
@@ -34,3 +47,134 @@ def test_list_and_get_parishes(client):
     detail = detail_resp.json()
     assert detail["id"] == parish.id
     assert detail["name"] == parish.name
+
+
+def test_parish_search_is_cursor_paginated(client):
+    for name in ["St. Mary Parish", "St. Joseph Parish", "Holy Family", "St. Mark Parish"]:
+        _create_parish(name)
+    _create_parish("Cathedral of St. Paul", city="Saint Paul")
+
+    if _dialect() == "postgresql":
+        # Trigram relevance: both names match "st. ma" equally well, so ties go by id.
+        expected = ["St. Mary Parish", "St. Mark Parish"]
+    else:
+        # ILIKE fallback, ordered by name.
+        expected = ["St. Mark Parish", "St. Mary Parish"]
+    first = client.get("/api/v1/parishes/", params={"q": "st. ma", "limit": 1})
+    assert first.status_code == 200
+    assert [p["name"] for p in first.json()] == expected[:1]
+    second = client.get(
+        "/api/v1/parishes/",
+        params={"q": "st. ma", "limit": 1, "cursor": first.headers["X-Next-Cursor"]},
+    )
+    assert [p["name"] for p in second.json()] == expected[1:]
+    assert "X-Next-Cursor" not in second.headers
+
+    # The exact name ranks first on either path.
+    best = client.get("/api/v1/parishes/", params={"q": "st. mary"}).json()
+    assert best[0]["name"] == "St. Mary Parish"
+
+    by_city = client.get("/api/v1/parishes/", params={"q": "saint paul"})
+    assert [p["name"] for p in by_city.json()] == ["Cathedral of St. Paul"]
+
+    assert client.get("/api/v1/parishes/", params={"cursor": "bogus"}).status_code == 400
+    assert client.get("/api/v1/parishes/", params={"latitude": 40}).status_code == 400
+
+
+def test_parish_autocomplete_caches_short_prefixes(client, fake_redis):
+    _create_parish("St. Mary Parish")
+    _create_parish("Mary Queen of Peace")
+    _create_parish("Holy Family")
+
+    resp = client.get("/api/v1/parishes/autocomplete", params={"prefix": "Mar"})
+    assert resp.status_code == 200
+    assert [s["name"] for s in resp.json()] == ["Mary Queen of Peace", "St. Mary Parish"]
+    cached = [key for key in fake_redis.store if key.startswith(parish_search.AUTOCOMPLETE_PREFIX)]
+    assert len(cached) == 1 and cached[0].endswith(":mar")
+
+    # Longer prefixes are selective enough to go straight to the index.
+    client.get("/api/v1/parishes/autocomplete", params={"prefix": "holy f"})
+    assert not any(key.endswith(":holy f") for key in fake_redis.store)
+
+
+def test_parish_responses_are_cached_and_revalidated(client, fake_redis):
+    parish = _create_parish("St. Anne Parish")
+
+    first = client.get(f"/api/v1/parishes/{parish.id}")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"].startswith("public, max-age=")
+    assert "Last-Modified" in first.headers
+
+    not_modified = client.get(f"/api/v1/parishes/{parish.id}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    listing = client.get("/api/v1/parishes/")
+    assert listing.json()[0]["name"] == "St. Anne Parish"
+    assert client.get("/api/v1/parishes/").headers["ETag"] == listing.headers["ETag"]
+
+    # Committing a parish change starts a new cache generation.
+    db = SessionLocal()
+    db.query(Parish).filter(Parish.id == parish.id).one().name = "St. Anne Shrine"
+    db.commit()
+    db.close()
+
+    changed = client.get(f"/api/v1/parishes/{parish.id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["name"] == "St. Anne Shrine"
+    assert changed.headers["ETag"] != etag
+    assert client.get("/api/v1/parishes/").json()[0]["name"] == "St. Anne Shrine"
+
+
+def test_parish_bulk_writes_start_a_new_cache_generation(fake_redis):
+    parish = _create_parish("St. Clare Parish")
+    version = parish_cache.cache_version()
+
+    db = SessionLocal()
+    try:
+        # Bulk statements bypass the mapper events; a rollback leaves the cache alone.
+        db.execute(update(Parish).where(Parish.id == parish.id).values(city="Peoria"))
+        db.rollback()
+        assert parish_cache.cache_version() == version
+
+        db.execute(update(Parish).where(Parish.id == parish.id).values(city="Peoria"))
+        db.commit()
+        assert parish_cache.cache_version() == version + 1
+
+        db.execute(update(Parish.__table__).values(state="IN"))
+        db.commit()
+        assert parish_cache.cache_version() == version + 2
+    finally:
+        db.close()
+
+
+def test_parish_cache_misses_are_built_on_the_primary():
+    replica_db = Session(bind=create_engine("sqlite://"))
+    built_on = []
+
+    def build(session):
+        built_on.append(session.get_bind())
+        return parish_cache.build_response(b"[]", last_modified=None)
+
+    try:
+        parish_cache.get_or_build("detail", {"id": 1}, build, replica_db)
+        # A hit needs no session at all.
+        parish_cache.get_or_build("detail", {"id": 1}, build, replica_db)
+    finally:
+        replica_db.close()
+    assert built_on == [engine]
+
+
+def test_parish_schema_creates_pg_trgm_before_its_trigram_indexes():
+    statements = []
+    mock = create_mock_engine(
+        "postgresql://",
+        lambda sql, *_args, **_kw: statements.append(
+            str(sql.compile(dialect=postgresql.dialect()))
+        ),
+    )
+    Parish.__table__.create(mock)
+
+    trgm = next(i for i, sql in enumerate(statements) if "gin_trgm_ops" in sql)
+    assert "CREATE EXTENSION IF NOT EXISTS pg_trgm" in statements[:trgm]
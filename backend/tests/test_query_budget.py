@@ -0,0 +1,40 @@
+import logging
+
+import pytest
+
+from app.db.query_budget import QueryBudgetExceeded, statement_shape
+from app.db.session import SessionLocal
+from app.models.user import User
+
+
+def test_statement_shape_ignores_values():
+    assert statement_shape("SELECT * FROM users WHERE id = 7") == statement_shape(
+        "SELECT *\n  FROM users WHERE id = :id_1"
+    )
+    assert statement_shape("SELECT 1 WHERE x IN (?, ?, ?)") == "SELECT ? WHERE x IN (?)"
+
+
+def test_query_budget_flags_n_plus_one_and_explains_slow_queries(query_budget, caplog):
+    db = SessionLocal()
+    try:
+        with pytest.raises(QueryBudgetExceeded, match="N\\+1: 3x SELECT"):
+            with query_budget():
+                for user_id in (1, 2, 3):
+                    db.get(User, user_id)
+
+        with pytest.raises(QueryBudgetExceeded, match="2 statements \\(budget 1\\)"):
+            with query_budget(max_queries=1):
+                db.query(User).filter(User.email == "a@example.com").first()
+                db.query(User).count()
+
+        with caplog.at_level(logging.WARNING, logger="app.db.query_budget"):
+            with query_budget(max_queries=1, slow_ms=0) as queries:
+                db.query(User).filter(User.email == "a@example.com").first()
+        assert queries.count == 1
+        [slow] = [r.getMessage() for r in caplog.records if "Slow query" in r.getMessage()]
+        # The statement is followed by its plan (text differs per database).
+        statement, plan = slow.split("\n", 1)
+        assert "FROM users" in statement
+        assert plan.strip() and "EXPLAIN failed" not in plan
+    finally:
+        db.close()
@@ -1,9 +1,15 @@
+import json
+import time
 from datetime import datetime, timedelta
 
 from fastapi import status
+from sqlalchemy import func, select
 
-from app.db.session import SessionLocal
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.models.ride import Ride
 from app.models.user import User
+from app.services import location_index, ride_tracking
 
 
 def _verify_user(email: str) -> None:
@@ -15,6 +21,13 @@ def _verify_user(email: str) -> None:
     db.close()
 
 
+def _point_wkt(db, column, *criteria) -> str:
+    """WKT of a stored point; SQLite keeps geography columns as plain text."""
+    expression = column if db.get_bind().dialect.name == "sqlite" else func.ST_AsText(column)
+    wkt = db.scalar(select(expression).where(*criteria))
+    return wkt.split(";")[-1]  # drop an EWKT "SRID=4326;" prefix
+
+
 def _login(client, email: str, password: str) -> str:
     resp = client.post(
         "/api/v1/auth/login",
@@ -25,7 +38,7 @@ def _login(client, email: str, password: str) -> str:
     return resp.json()["access_token"]
 
 
-def test_rider_creates_and_driver_accepts_ride(client):
+def test_rider_creates_and_driver_accepts_ride(client, query_budget):
     rider_email = "rider@example.com"
     driver_email = "driver@example.com"
     password = "StrongPass123!"
@@ -76,12 +89,18 @@ def test_rider_creates_and_driver_accepts_ride(client):
     ride_request_id = ride_request["id"]
     assert ride_request["status"] == "pending"
 
-    open_resp = client.get("/api/v1/rides/open", headers=driver_headers)
+    with query_budget(max_queries=2):
+        open_resp = client.get(
+            "/api/v1/rides/open",
+            params={"latitude": 37.7749, "longitude": -122.4194},
+            headers=driver_headers,
+        )
     assert open_resp.status_code == status.HTTP_200_OK
     open_ids = [r["id"] for r in open_resp.json()]
     assert ride_request_id in open_ids
 
-    accept_resp = client.post(f"/api/v1/rides/{ride_request_id}/accept", headers=driver_headers)
+    with query_budget(max_queries=3):
+        accept_resp = client.post(f"/api/v1/rides/{ride_request_id}/accept", headers=driver_headers)
     assert accept_resp.status_code == status.HTTP_201_CREATED, accept_resp.text
     ride = accept_resp.json()
     ride_id = ride["id"]
@@ -92,23 +111,349 @@ def test_rider_creates_and_driver_accepts_ride(client):
     assigned_ids = [r["id"] for r in assigned.json()]
     assert ride_id in assigned_ids
 
-    in_progress = client.patch(
-        f"/api/v1/rides/{ride_id}/status",
-        json={"status": "in_progress"},
-        headers=driver_headers,
-    )
+    # The ride and its request move in one CTE on PostgreSQL; SQLite needs two UPDATEs.
+    transition_statements = 1 if engine.dialect.name == "postgresql" else 2
+    with query_budget(max_queries=transition_statements):
+        in_progress = client.patch(
+            f"/api/v1/rides/{ride_id}/status",
+            json={"status": "in_progress"},
+            headers=driver_headers,
+        )
     assert in_progress.status_code == status.HTTP_200_OK
     assert in_progress.json()["status"] == "in_progress"
 
-    completed = client.patch(
-        f"/api/v1/rides/{ride_id}/status",
-        json={"status": "completed"},
-        headers=driver_headers,
-    )
+    # Plus the driver's completed-ride count.
+    with query_budget(max_queries=transition_statements + 1):
+        completed = client.patch(
+            f"/api/v1/rides/{ride_id}/status",
+            json={"status": "completed"},
+            headers=driver_headers,
+        )
     assert completed.status_code == status.HTTP_200_OK
     assert completed.json()["status"] == "completed"
 
-    rider_rides = client.get("/api/v1/rides/mine", headers=rider_headers)
+    db = SessionLocal()
+    ride_row = db.query(Ride).filter(Ride.id == ride_id).one()
+    assert ride_row.pickup_time is not None
+    assert ride_row.dropoff_time == ride_row.completed_at is not None
+    db.close()
+
+    # Completed rides are terminal; re-sending the current status is a no-op.
+    backwards = client.patch(
+        f"/api/v1/rides/{ride_id}/status", json={"status": "accepted"}, headers=driver_headers
+    )
+    assert backwards.status_code == status.HTTP_409_CONFLICT
+    assert backwards.json()["detail"] == "Cannot move a completed ride to accepted"
+    again = client.patch(
+        f"/api/v1/rides/{ride_id}/status", json={"status": "completed"}, headers=driver_headers
+    )
+    assert again.status_code == status.HTTP_200_OK
+    assert again.json()["status"] == "completed"
+
+    with query_budget(max_queries=1):
+        rider_rides = client.get("/api/v1/rides/mine", headers=rider_headers)
     assert rider_rides.status_code == status.HTTP_200_OK
     mine = rider_rides.json()
     assert mine[0]["status"] == "completed"
+
+
+def _register_verified(client, email: str, role: str, phone: str) -> dict[str, str]:
+    password = "StrongPass123!"
+    resp = client.post(
+        "/api/v1/auth/register",
+        json={
+            "email": email,
+            "phone": phone,
+            "password": password,
+            "first_name": role.title(),
+            "last_name": "User",
+            "role": role,
+        },
+    )
+    assert resp.status_code == status.HTTP_201_CREATED, resp.text
+    _verify_user(email)
+    return {"Authorization": f"Bearer {_login(client, email, password)}"}
+
+
+def test_open_requests_are_cursor_paginated(client):
+    rider_headers = _register_verified(client, "pager.rider@example.com", "rider", "+15550000011")
+    driver_headers = _register_verified(
+        client, "pager.driver@example.com", "driver", "+15550000012"
+    )
+
+    base = datetime.utcnow() + timedelta(hours=1)
+    created_ids = []
+    for offset in (3, 1, 2):
+        resp = client.post(
+            "/api/v1/rides/",
+            json={
+                "pickup": {"latitude": 37.7749, "longitude": -122.4194},
+                "dropoff": {"latitude": 37.7849, "longitude": -122.4094},
+                "destination_type": "mass",
+                "requested_datetime": (base + timedelta(hours=offset)).isoformat(),
+            },
+            headers=rider_headers,
+        )
+        assert resp.status_code == status.HTTP_201_CREATED, resp.text
+        created_ids.append(resp.json()["id"])
+
+    params = {
+        "latitude": 37.7749,
+        "longitude": -122.4194,
+        "order_by": "requested_datetime",
+        "limit": 2,
+    }
+    first = client.get("/api/v1/rides/open", params=params, headers=driver_headers)
+    assert first.status_code == status.HTTP_200_OK, first.text
+    assert [r["id"] for r in first.json()] == [created_ids[1], created_ids[2]]
+    next_cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(
+        "/api/v1/rides/open",
+        params={**params, "cursor": next_cursor},
+        headers=driver_headers,
+    )
+    assert second.status_code == status.HTTP_200_OK
+    assert [r["id"] for r in second.json()] == [created_ids[0]]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_open_requests_near_the_stored_driver_location_page_by_distance(client, query_budget):
+    rider_headers = _register_verified(client, "near.rider@example.com", "rider", "+15550000014")
+    driver_headers = _register_verified(client, "near.driver@example.com", "driver", "+15550000015")
+    db = SessionLocal()
+    db.query(User).filter(User.email == "near.driver@example.com").update(
+        {User.last_known_location: "SRID=4326;POINT(-122.4194 37.7749)"}
+    )
+    db.commit()
+    db.close()
+
+    base = datetime.utcnow() + timedelta(hours=1)
+    created_ids = []
+    # ~0 km, ~11 km, ~2 km and ~110 km (out of range) from the driver.
+    for offset, latitude in enumerate((37.7749, 37.8749, 37.7929, 38.7749)):
+        resp = client.post(
+            "/api/v1/rides/",
+            json={
+                "pickup": {"latitude": latitude, "longitude": -122.4194},
+                "dropoff": {"latitude": 37.7849, "longitude": -122.4094},
+                "destination_type": "mass",
+                "requested_datetime": (base + timedelta(hours=offset)).isoformat(),
+            },
+            headers=rider_headers,
+        )
+        assert resp.status_code == status.HTTP_201_CREATED, resp.text
+        created_ids.append(resp.json()["id"])
+
+    with query_budget(max_queries=2):
+        first = client.get("/api/v1/rides/open", params={"limit": 2}, headers=driver_headers)
+    assert [r["id"] for r in first.json()] == [created_ids[0], created_ids[2]]
+    assert first.json()[0]["distance_miles"] == 0
+
+    second = client.get(
+        "/api/v1/rides/open",
+        params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+        headers=driver_headers,
+    )
+    assert [r["id"] for r in second.json()] == [created_ids[1]]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_open_requests_reject_bad_cursor_and_drivers_without_location(client, query_budget):
+    rider_headers = _register_verified(client, "lost.rider@example.com", "rider", "+15550000016")
+    driver_headers = _register_verified(client, "lost.driver@example.com", "driver", "+15550000013")
+    resp = client.post(
+        "/api/v1/rides/",
+        json={
+            "pickup": {"latitude": 37.7749, "longitude": -122.4194},
+            "dropoff": {"latitude": 37.7849, "longitude": -122.4094},
+            "destination_type": "mass",
+            "requested_datetime": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
+        },
+        headers=rider_headers,
+    )
+    assert resp.status_code == status.HTTP_201_CREATED, resp.text
+
+    bad_cursor = client.get(
+        "/api/v1/rides/open", params={"cursor": "not-a-cursor"}, headers=driver_headers
+    )
+    assert bad_cursor.status_code == status.HTTP_400_BAD_REQUEST
+    assert bad_cursor.json()["detail"] == "Invalid cursor"
+
+    # With no stored or explicit location the feed is refused, not served unfiltered.
+    for order_by in (None, "distance", "requested_datetime"):
+        params = {"order_by": order_by} if order_by else {}
+        with query_budget(max_queries=2):
+            unlocated = client.get("/api/v1/rides/open", params=params, headers=driver_headers)
+        assert unlocated.status_code == status.HTTP_409_CONFLICT
+        assert "location" in unlocated.json()["detail"]
+
+    located = client.get(
+        "/api/v1/rides/open",
+        params={"latitude": 37.7749, "longitude": -122.4194},
+        headers=driver_headers,
+    )
+    assert [r["id"] for r in located.json()] == [resp.json()["id"]]
+
+
+def test_accept_is_first_come_first_served(client):
+    rider_headers = _register_verified(client, "race.rider@example.com", "both", "+15550000051")
+    winner_headers = _register_verified(client, "race.win@example.com", "driver", "+15550000052")
+    loser_headers = _register_verified(client, "race.lose@example.com", "driver", "+15550000053")
+
+    create_resp = client.post(
+        "/api/v1/rides/",
+        json={
+            "pickup": {"latitude": 37.7749, "longitude": -122.4194},
+            "dropoff": {"latitude": 37.7849, "longitude": -122.4094},
+            "destination_type": "confession",
+            "requested_datetime": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
+        },
+        headers=rider_headers,
+    )
+    ride_request_id = create_resp.json()["id"]
+
+    own = client.post(f"/api/v1/rides/{ride_request_id}/accept", headers=rider_headers)
+    assert own.status_code == status.HTTP_400_BAD_REQUEST
+
+    won = client.post(f"/api/v1/rides/{ride_request_id}/accept", headers=winner_headers)
+    assert won.status_code == status.HTTP_201_CREATED, won.text
+    assert won.json()["ride_request_id"] == ride_request_id
+
+    lost = client.post(f"/api/v1/rides/{ride_request_id}/accept", headers=loser_headers)
+    assert lost.status_code == status.HTTP_409_CONFLICT
+    assert lost.json()["detail"] == "Ride request is no longer available"
+
+    missing = client.post("/api/v1/rides/999999/accept", headers=loser_headers)
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_driver_location_stream_is_buffered_and_compacted(client, fake_redis):
+    rider_headers = _register_verified(client, "trail.rider@example.com", "rider", "+15550000061")
+    driver_headers = _register_verified(client, "trail.drv@example.com", "driver", "+15550000062")
+
+    create_resp = client.post(
+        "/api/v1/rides/",
+        json={
+            "pickup": {"latitude": 37.7749, "longitude": -122.4194},
+            "dropoff": {"latitude": 37.7849, "longitude": -122.4094},
+            "destination_type": "mass",
+            "requested_datetime": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
+        },
+        headers=rider_headers,
+    )
+    ride_id = client.post(
+        f"/api/v1/rides/{create_resp.json()['id']}/accept", headers=driver_headers
+    ).json()["id"]
+
+    recorded_at = datetime.utcnow().replace(microsecond=0) - timedelta(seconds=30)
+
+    def _stream(*points):
+        return client.post(
+            f"/api/v1/rides/{ride_id}/locations",
+            json={
+                "samples": [
+                    {"latitude": lat, "longitude": lon, "recorded_at": recorded_at.isoformat()}
+                    for lat, lon in points
+                ]
+            },
+            headers=driver_headers,
+        )
+
+    # Not streaming until the driver is on the way.
+    assert _stream((37.70, -122.40)).status_code == status.HTTP_409_CONFLICT
+
+    for ride_status, points in [
+        ("driver_enroute", [(37.70, -122.40), (37.72, -122.41)]),
+        ("picked_up", [(37.7750, -122.4190), (37.78, -122.415)]),
+        ("in_progress", [(37.7848, -122.4095)]),
+    ]:
+        resp = client.patch(
+            f"/api/v1/rides/{ride_id}/status", json={"status": ride_status}, headers=driver_headers
+        )
+        assert resp.status_code == status.HTTP_200_OK, resp.text
+        resp = _stream(*points)
+        assert resp.status_code == status.HTTP_202_ACCEPTED
+        assert resp.json() == {"accepted": len(points)}
+
+    # Only the newest sample of each batch is fanned out to the ride channel.
+    pushed = [
+        json.loads(message)
+        for channel, message in fake_redis.published
+        if channel == f"events:ride:{ride_id}" and '"driver_location"' in message
+    ]
+    assert [(p["latitude"], p["longitude"]) for p in pushed] == [
+        (37.72, -122.41),
+        (37.78, -122.415),
+        (37.7848, -122.4095),
+    ]
+
+    trail = client.get(f"/api/v1/rides/{ride_id}/locations", headers=rider_headers)
+    assert trail.status_code == status.HTTP_200_OK
+    assert len(trail.json()) == 5
+    assert {sample["recorded_at"] for sample in trail.json()} == {recorded_at.isoformat()}
+
+    resp = client.patch(
+        f"/api/v1/rides/{ride_id}/status", json={"status": "completed"}, headers=driver_headers
+    )
+    assert resp.status_code == status.HTTP_200_OK
+
+    db = SessionLocal()
+    try:
+        in_ride = Ride.id == ride_id
+        assert _point_wkt(db, Ride.actual_pickup_location, in_ride) == "POINT(-122.419 37.775)"
+        assert _point_wkt(db, Ride.actual_dropoff_location, in_ride) == "POINT(-122.4095 37.7848)"
+    finally:
+        db.close()
+    assert f"ride_trail:{ride_id}" not in fake_redis.store
+    assert ride_tracking.pickup_key(ride_id) not in fake_redis.store
+
+
+def test_trail_sample_times_are_clamped_sorted_and_pickup_outlives_the_trim(
+    fake_redis, monkeypatch
+):
+    monkeypatch.setattr(settings, "RIDE_TRAIL_MAX_SAMPLES", 3)
+    now = datetime.utcnow()
+
+    def append(ride_status, *samples):
+        return ride_tracking.append_samples(
+            ride_id=7, driver_id=9, ride_status=ride_status, samples=samples
+        )
+
+    append("driver_enroute", (37.70, -122.40, now - timedelta(seconds=20)))
+    # Out of order, and the device clock is a day ahead.
+    append(
+        "picked_up",
+        (37.7760, -122.4180, now + timedelta(days=1)),
+        (37.7750, -122.4190, now - timedelta(seconds=10)),
+    )
+    latest = json.loads(fake_redis.published[-1][1])
+    assert (latest["latitude"], latest["longitude"]) == (37.7760, -122.4180)
+    assert latest["recorded_at"] <= time.time()
+    # The live index runs on server time, not the device's.
+    assert fake_redis.store[location_index.DRIVER_SEEN_KEY]["9"] <= time.time()
+
+    # A week-old sample is clamped into the accepted window.
+    append("in_progress", (37.78, -122.415, now - timedelta(days=7)))
+    oldest = time.time() - settings.RIDE_SAMPLE_MAX_AGE_SECONDS - 1
+    assert ride_tracking.get_trail(7)[-1].recorded_at >= oldest
+
+    for n in range(5):
+        append("in_progress", (37.78 + n / 1000, -122.415, now))
+    assert len(ride_tracking.get_trail(7)) == 3
+
+    pickup, dropoff = ride_tracking.compact_trail(7)
+    assert (pickup.latitude, pickup.longitude) == (37.7750, -122.4190)
+    assert (dropoff.latitude, dropoff.longitude) == (37.784, -122.415)
+
+
+def test_naive_sample_times_are_read_as_utc(monkeypatch):
+    monkeypatch.setenv("TZ", "America/Los_Angeles")
+    time.tzset()
+    try:
+        recorded_at = datetime(2026, 1, 1, 12, 0, 0)
+        epoch = ride_tracking._epoch_seconds(recorded_at)
+        assert datetime.utcfromtimestamp(epoch) == recorded_at
+    finally:
+        monkeypatch.undo()
+        time.tzset()
@@ -0,0 +1,50 @@
+from sqlalchemy import func, select
+
+from app.db.session import SessionLocal
+from app.models.donation import Donation
+from app.models.ride import Ride
+from app.models.ride_request import RideRequest
+from app.models.ride_review import RideReview
+from app.models.user import User
+from app.seed_scale import PASSWORD, ScaleConfig, generate
+from app.services.driver_stats import reconcile_driver_stats
+
+
+def test_scale_seed_generates_consistent_linked_rows(client):
+    config = ScaleConfig(parishes=4, riders=30, drivers=6, ride_requests=200, batch_size=50)
+    summary = generate(config)
+
+    assert summary.rows["parishes"] == 4
+    assert summary.rows["users"] == 36
+    assert summary.rows["driver_profiles"] == 6
+    assert summary.rows["ride_requests"] == 200
+    assert len(summary.parish_locations) == 4
+
+    db = SessionLocal()
+    try:
+        completed = db.scalar(
+            select(func.count()).select_from(Ride).where(Ride.status == "completed")
+        )
+        assert 0 < completed < summary.rows["rides"] <= 200
+        assert summary.rows["ride_reviews"] == db.scalar(select(func.count(RideReview.id)))
+        assert summary.rows["donations"] == db.scalar(select(func.count(Donation.id)))
+        assert db.scalar(select(func.count(RideRequest.id)).where(RideRequest.status == "pending"))
+        # Every ride belongs to its request's rider, and aggregates need no repair.
+        mismatched = db.scalar(
+            select(func.count())
+            .select_from(Ride)
+            .join(RideRequest, RideRequest.id == Ride.ride_request_id)
+            .where(RideRequest.rider_id != Ride.rider_id)
+        )
+        assert mismatched == 0
+        assert reconcile_driver_stats(db) == 0
+        email = db.scalar(select(User.email).where(User.role == "driver").limit(1))
+    finally:
+        db.close()
+
+    # A second run appends after the existing ids, and the accounts can log in.
+    assert (
+        generate(ScaleConfig(parishes=1, riders=2, drivers=1, ride_requests=3)).rows["users"] == 3
+    )
+    resp = client.post("/api/v1/auth/login", data={"username": email, "password": PASSWORD})
+    assert resp.status_code == 200, resp.text
@@ -0,0 +1,114 @@
+from io import BytesIO
+
+from fastapi import status
+from PIL import Image
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.user import User
+from app.services import location_index, profile_photos, storage
+from tests.test_rides import _point_wkt, _register_verified
+
+
+def test_driver_location_is_buffered_then_flushed(client, fake_redis, query_budget):
+    headers = _register_verified(client, "pinger@example.com", "driver", "+15550000031")
+
+    resp = client.post(
+        "/api/v1/users/location",
+        json={"latitude": 37.7749, "longitude": -122.4194},
+        headers=headers,
+    )
+    assert resp.status_code == status.HTTP_200_OK, resp.text
+    assert (resp.json()["latitude"], resp.json()["longitude"]) == (37.7749, -122.4194)
+
+    # With the principal cached, a heartbeat never touches the database.
+    with query_budget(max_queries=0):
+        resp = client.post(
+            "/api/v1/users/location",
+            json={"latitude": 37.7749, "longitude": -122.4194},
+            headers=headers,
+        )
+    assert resp.status_code == status.HTTP_200_OK, resp.text
+
+    db = SessionLocal()
+    user = db.query(User).filter(User.email == "pinger@example.com").first()
+    # The heartbeat only touched Redis.
+    assert user.last_location_updated_at is None
+    assert str(user.id) in fake_redis.get(location_index.DRIVER_DIRTY_KEY)
+    assert str(user.id) in fake_redis.get(location_index.DRIVER_GEO_KEY)
+
+    assert location_index.flush_driver_locations(db) == 1
+    db.expire_all()
+    user = db.query(User).filter(User.email == "pinger@example.com").first()
+    assert user.last_location_updated_at is not None
+    assert _point_wkt(db, User.last_known_location, User.id == user.id) == (
+        "POINT(-122.4194 37.7749)"
+    )
+    assert fake_redis.get(location_index.DRIVER_FLUSHING_KEY) is None
+    db.close()
+
+
+def test_profile_photo_is_processed_off_the_request_path(
+    client, fake_redis, celery_calls, monkeypatch
+):
+    headers = _register_verified(client, "selfie@example.com", "rider", "+15550000032")
+    monkeypatch.setattr(settings, "AWS_S3_BUCKET", "photos")
+
+    objects: dict[str, bytes] = {}
+
+    def fake_upload_file_obj(file_obj, bucket, key, content_type=None):
+        objects[key] = file_obj.read()
+        return storage.public_url(bucket, key)
+
+    def fake_upload_bytes(data, bucket, key, content_type):
+        objects[key] = data
+        return storage.public_url(bucket, key)
+
+    def fake_delete_files(bucket, keys):
+        for key in keys:
+            objects.pop(key, None)
+
+    monkeypatch.setattr("app.api.endpoints.users.upload_file_obj", fake_upload_file_obj)
+    monkeypatch.setattr(storage, "upload_bytes", fake_upload_bytes)
+    monkeypatch.setattr(storage, "download_bytes", lambda bucket, key: objects[key])
+    monkeypatch.setattr(storage, "delete_files", fake_delete_files)
+    monkeypatch.setattr(
+        storage, "delete_file", lambda bucket, key: fake_delete_files(bucket, [key])
+    )
+
+    def upload() -> tuple[int, str]:
+        image = BytesIO()
+        Image.new("RGB", (800, 600), "navy").save(image, format="PNG")
+        resp = client.post(
+            "/api/v1/users/me/photo",
+            files={"file": ("me.png", image.getvalue(), "image/png")},
+            headers=headers,
+        )
+        assert resp.status_code == status.HTTP_202_ACCEPTED, resp.text
+        photo_tasks = [args for name, args, _ in celery_calls if name.startswith("photos.")]
+        user_id, prefix = photo_tasks[-1]
+        return user_id, prefix
+
+    bad = client.post(
+        "/api/v1/users/me/photo",
+        files={"file": ("me.png", b"not an image", "image/png")},
+        headers=headers,
+    )
+    assert bad.status_code == status.HTTP_400_BAD_REQUEST
+
+    user_id, first = upload()
+    user_id, second = upload()
+
+    db = SessionLocal()
+    try:
+        # The older upload was superseded before its task ran.
+        assert profile_photos.process_profile_photo(db, user_id, first) is None
+        url = profile_photos.process_profile_photo(db, user_id, second)
+        assert url.endswith(f"{second}/500.jpg")
+        assert db.get(User, user_id).profile_photo_url == url
+    finally:
+        db.close()
+
+    assert sorted(objects) == sorted(f"{second}/{name}" for name in profile_photos.variant_names())
+    with Image.open(BytesIO(objects[f"{second}/64.webp"])) as thumb:
+        assert thumb.size == (64, 64)